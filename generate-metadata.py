@@ -8,6 +8,9 @@ You can adapt the parameters in a number of ways:
   (restore default by running `python generate-metadata.py -d`)
 * by providing a custom config file:
   `python generate-metadata.py -c D:/OpenITI/RELEASE_config.py`
+  (repeat the -c option to generate the metadata for several profiles,
+  e.g., with and without a collection, from a single corpus scan;
+  see utility/profiles.py)
 * by specifying command-line arguments (see example below)
 * by running the script with default configurations
   (`python generate-metadata.py`)
@@ -51,12 +54,27 @@ Examples:
                                 => sets meta_header_fp variable
     -x, --exclude : (list) list of folder names to exclude from metadata
     -c, --config : (str) name of a python file with custom configuration variables
-                         (default: ./utility/config.py)
+                         (default: ./utility/config.py);
+                         additional -c options define additional profiles
+    -k, --cache : (str) path to the extraction cache file
+                        (metadata of unchanged files is taken from this cache)
+                        => sets extraction_cache_fp variable
+    -n, --n_processes : (int) number of processes used to collect metadata
+                              (the 25-years repos are processed in parallel)
+                              => sets n_processes variable
+    -e, --prefetch_depth : (int) number of versions whose files are read ahead
+                                 in background threads (0: no prefetching)
+                                 => sets prefetch_depth variable
 
     # run the script with custom config file (model: utility/config.py):
     
     $ python3 generate-metadata.py -c utility/config_RELEASE.py
 
+    # generate the metadata with and without the Noorlib texts
+    # from a single scan of the corpus:
+
+    $ python3 generate-metadata.py -c utility/config_RELEASE_2021_w_Noorlib.py -c utility/config_RELEASE_2021_wo_Noorlib.py
+
     # run the script with default configuration and add variables:
     
     $ python3 generate-metadata.py -i ../RELEASE/data_temp -f -r -t -l
@@ -121,6 +139,9 @@ import time
 import getopt
 from datetime import datetime
 import copy
+import multiprocessing
+import contextlib
+import collections
 
 
 # (in a later stage to be imported from the openiti python library):
@@ -131,18 +152,45 @@ import copy
 #from utility.uri import URI, check_yml_files
 #from utility import get_issues
 
-from openiti.helper.uri import URI, check_yml_files
+import openiti
+from openiti.helper.uri import URI
 from openiti.git import get_issues
-from openiti.helper.yml import readYML, dicToYML, fix_broken_yml
+from openiti.helper.yml import readYML, ymlToDic, dicToYML, fix_broken_yml
 from openiti.helper.ara import deNoise, ar_cnt_file
 from openiti.helper.funcs import read_text
-from utility.betaCode import betaCodeToArSimple
+from utility.betaCode import betaCodeToArSimple, betaCodeToArBatch, ConversionCache
+from utility.yml_check import check_yml_files
+from utility.extraction_cache import ExtractionCache
+from utility.inventory import CorpusInventory
+from utility.yml_cache import YmlCache
+from utility.stream_writer import JoinedWriter, write_jsonl, dict_lines
+from utility.header_index import HeaderIndex
+from utility.run_report import RunReport
+from utility.issue_store import IssueStore
+from utility.get_issues import define_text_uris
+from utility.srt_index import SrtIndex, build_srt_dict
+from utility.sqlite_output import save_as_sqlite
+from utility.columnar_export import save_columnar
+from utility.master_yml import CompactYmlWriter, make_shared_record, make_compact_record
+from utility.prefetch import Prefetcher, ReadAhead
+from utility.unique_list import UniqueList
+from utility.book_relations import BookRelations
+from utility.parsed_uri import parse_uri
+from utility.profiles import make_profile, ignored_variables, shared_exclude, duplicate_output_fps
 
 
 splitter = "##RECORD"+"#"*64+"\n"
 all_header_meta = dict()
 version_ids = dict()
 geo_URIs = dict()
+shard_cache = None  # extraction cache of a parallel worker process
+corpus_inventory = None  # index of all files in the corpus (see collectMetadata)
+yml_cache = None  # yml files loaded in the current run (see load_yml_once)
+header_index = None  # position of the header end in text files (see read_body)
+run_report = None  # timing and memory measurements of the run (see measure)
+json_output_format = "json"  # "json", "jsonl" or "jsonl.gz" (see save_json_dict)
+prefetcher = None  # reads the files of the next versions ahead (see prefetch_walk)
+conversion_cache = None  # betaCode strings converted into Arabic script (see betaCodeToArBatch)
 VERBOSE = False
 
 # regex patterns to ignore tokens that contain letters and numbers
@@ -214,7 +262,7 @@ phen are counted as a single token'''
         6
     """
     if os.path.isfile(text):
-        text = read_text(text, remove_header=True)
+        text = read_body(text)
 
     all_toks = re.split(tok_splitter, text)
 
@@ -242,6 +290,100 @@ phen are counted as a single token'''
         else:
             return n_toks
 
+def read_body(fp):
+    """Read the text of a file without the metadata header
+    (from the header end position stored in the header index, if one is used)"""
+    if header_index is not None:
+        text = header_index.read_body(fp)
+        if text is not None:
+            return text
+    return read_text(fp, remove_header=True)
+
+# precompiled patterns for count_toks_compiled:
+tok_splitter_re = re.compile(tok_splitter)
+do_not_count_re = re.compile(do_not_count)
+word_char_re = re.compile(r"\w")
+
+def count_toks_compiled(text, incl_chars=False, return_tok_set=False):
+    """Count non-tag tokens in text; faster version of count_toks
+    (with the default tok_splitter and do_not_count patterns),
+    which returns the same counts.
+
+    Instead of running several regex searches on every token,
+    tokens that consist only of letters (i.e., most tokens) are recognized
+    with str.isalpha: all their characters are word characters,
+    and of the do_not_count patterns only the page number tags
+    can match them.
+
+    Args:
+        text (str): text or path to text
+        incl_chars (bool): if True, both tokens and characters will be counted.
+           Defaults to False (count only tokens).
+
+    Returns: int or (int, int)
+
+    Examples:
+        >>> text = 'This contains 4 tokens'
+        >>> count_toks_compiled(text)
+        4
+        >>> count_toks_compiled(text, incl_chars=True)
+        (4, 19)
+        >>> text = 'Tags are not counted: PageV01P234 @P02 @TOP2 YB1234'
+        >>> count_toks_compiled(text)
+        4
+        >>> text = 'words split with hy-\\nphen are counted as a single token'
+        >>> count_toks_compiled(text)
+        10
+        >>> text = '1. list numbers and footnote references (2) are not counted [3].'
+        >>> count_toks_compiled(text)
+        8
+        >>> text = '|Tables|should not|\\n|be a | problem|'
+        >>> count_toks_compiled(text)
+        6
+    """
+    if os.path.isfile(text):
+        text = read_body(text)
+
+    n_toks = 0
+    n_chars = 0
+    tok_set = set()
+    for tok in tok_splitter_re.split(text):
+        if tok.isalpha():
+            if ("Page" in tok or "Folio" in tok) and do_not_count_re.search(tok):
+                continue
+            n_toks += 1
+            n_chars += len(tok)
+        elif word_char_re.search(tok) and not do_not_count_re.search(tok):
+            # do not count first half of hyphenated token at end of line:
+            if not tok.endswith("-"):
+                n_toks += 1
+            if incl_chars:
+                n_chars += len(word_char_re.findall(tok))
+        else:
+            continue
+        if return_tok_set:
+            tok_set.add(tok)
+
+    if incl_chars:
+        if return_tok_set:
+            return n_toks, n_chars, tok_set
+        else:
+            return n_toks, n_chars
+    else:
+        if return_tok_set:
+            return n_toks, tok_set
+        else:
+            return n_toks
+
+# functions that can be used to count the tokens in extract_version_meta:
+tok_count_engines = {"regex": count_toks, "compiled": count_toks_compiled}
+
+def count_file_toks(fp, tok_count_engine="compiled", incl_chars=False):
+    """Count the tokens (and characters) in a text file
+    with one of the tok_count_engines (measured in the run report)"""
+    with measure("token_counting", fp):
+        return tok_count_engines[tok_count_engine](fp, incl_chars=incl_chars)
+
 def LoadTags():
     """Load tags from the tags/genre file created by Maxim."""
     mapping_file = "./utility/ID_TAGS.txt"
@@ -354,33 +496,10 @@ def load_srt_meta(srt_folder, passim_runs):
               value: list (each item is a list with two items:
                            date of the passim run, link to the relevant srt folder)
     """
-    srt_d = dict()
-    u = "http://dev.kitab-project.org"
-    runs = {item[1]: item[0] for item in passim_runs}
-    for fn in os.listdir(srt_folder):
-        if fn[:-5] in runs:
-
-            # extract text ids from html file and add their links to `srt_d`
-            fp = os.path.join(srt_folder, fn)
-            with open(fp, mode="r", encoding="utf-8") as file:
-                html = file.read()
-            ids = re.findall(r'<a href="(?:http://dev.kitab-project.org/passim\d+/)?([^\-"]+-[^"]+)"', html)
-            #print(len(ids))
-            for id_ in ids:
-                #id_ = re.sub(r"Vols[A-Z]*|BK\d+", "", id_)
-                bare_id = id_.split("-")[0]
-                if not bare_id in srt_d:
-                    srt_d[bare_id] = []
-                srt_d[bare_id].append([runs[fn[:-5]], "/".join([u, fn[:-5], id_])])
-
-    # sort by year and month:
-    year_regex = r"(?<=passim\d{4})\d{4}"
-    month_regex = r"(?<=passim\d{2})\d{2}"
-    srt_d = {k: sorted(v, key = lambda x: (re.findall(year_regex, x[1]), re.findall(month_regex, x[1]))) for k,v in srt_d.items()}
-    return srt_d
-
-
-def createJsonFile(csv_fp, out_fp, passim_runs, issues_uri_dict):
+    return build_srt_dict(srt_folder, passim_runs)
+
+
+def createJsonFile(csv_fp, out_fp, passim_runs, issues_uri_dict, srt_index_fp=None):
     """Convert the csv file into a json file,
     adding passim data and Github issues.
 
@@ -395,13 +514,17 @@ def createJsonFile(csv_fp, out_fp, passim_runs, issues_uri_dict):
             GitHub issues, sorted by URI:
                 - key: uri
                 - value: a list of GitHub issue objects
+        srt_index_fp (str): path to the file in which the srt links
+            are stored (see SrtIndex); if None, the links are extracted
+            from the html files in the utility/srt folder
 
     Returns:
         None
     """
     json_objects = []
 ##    webserver_url = 'http://dev.kitab-project.org'
-    srt_d = load_srt_meta("./utility/srt/", passim_runs)
+    with measure("srt_linking"):
+        srt_index = SrtIndex.load("./utility/srt/", passim_runs, index_fp=srt_index_fp)
 
     with open(csv_fp, mode="r", encoding="utf-8") as csvfile:
         reader = csv.DictReader(csvfile, delimiter='\t')
@@ -409,31 +532,90 @@ def createJsonFile(csv_fp, out_fp, passim_runs, issues_uri_dict):
 
         for row in reader:
             record = row
+            with measure("srt_linking"):
+                add_srts_and_issues(record, parse_uri(row['url']), parse_uri(row["versionUri"]),
+                                    srt_index, issues_uri_dict)
+            json_objects.append(record)
 
-            # Create a URL for KITAB Web Server for SRT Files
+    with measure("json_writing"):
+        save_json_records(json_objects, out_fp)
 
-            #new_id = row['url'].split('/')[-1].split('.')[-1] # may get the extension!
-            uri = URI(row['url'])
-            if "version" in uri.uri_type:
-                v_id = uri("version", ext="").split(".")[-1]
-            else:
-                v_id = uri("transcription", ext="").split(".")[-1]
+
+def createJsonFileFromMeta(meta, out_fp, passim_runs, issues_uri_dict,
+                           split_ar_lat=False, incl_char_length=False,
+                           srt_index_fp=None):
+    """Create the json file directly from the metadata collected
+    by collectMetadata, adding passim data and Github issues.
+
+    The json records have the same keys and values as those created
+    by createJsonFile from the csv file, but they are built from the
+    cells of the rows instead of the parsed csv file (so that values
+    that contain a tab are not split over several keys).
+
+    Args:
+        meta (dict): the metadata dictionaries returned by collectMetadata
+        out_fp (str): the filepath of the output json file
+        passim_runs (list): a list of 2-item lists of the
+            text reuse detection algorithm passim (see createJsonFile)
+        issues_uri_dict (dict): a dictionary mapping containing the
+            GitHub issues, sorted by URI (see createJsonFile)
+        split_ar_lat (bool): the value used for the csv file
+        incl_char_length (bool): the value used for the csv file
+        srt_index_fp (str): path to the srt index file (see createJsonFile)
+
+    Returns:
+        list (the json records)
+    """
+    json_objects = []
+    with measure("srt_linking"):
+        srt_index = SrtIndex.load("./utility/srt/", passim_runs, index_fp=srt_index_fp)
+    header = make_tsv_columns(split_ar_lat, incl_char_length)
+
+    for text_uri, cells in generate_tsv_cells(meta["all_vers_meta_d"],
+                                              meta["all_book_meta_d"],
+                                              meta["all_auth_meta_d"],
+                                              meta["all_transcr_meta_d"],
+                                              meta["all_manuscr_meta_d"],
+                                              meta["all_loc_meta_d"],
+                                              split_ar_lat, incl_char_length):
+        record = dict(zip(header, cells))
+        uri = parse_uri(text_uri)
+        with measure("srt_linking"):
+            add_srts_and_issues(record, uri, uri, srt_index, issues_uri_dict)
+        json_objects.append(record)
+
+    with measure("json_writing"):
+        save_json_records(json_objects, out_fp)
+    return json_objects
+
+
+def add_srts_and_issues(record, uri, text_uri, srt_index, issues_uri_dict):
+    """Add the links to the srt files and the GitHub issues
+    to the json record of a version or transcription.
+
+    Args:
+        record (dict): the json record
+        uri (ParsedURI): URI object of the text file (built from its url)
+        text_uri (ParsedURI): URI object of the version/transcription
+        srt_index (SrtIndex): links to the srt folders for every text id
+        issues_uri_dict (dict): GitHub issues for every URI
+    """
+    # Create a URL for KITAB Web Server for SRT Files
+
+    #new_id = row['url'].split('/')[-1].split('.')[-1] # may get the extension!
+    if "version" in uri.uri_type:
+        v_id = uri("version", ext="").split(".")[-1]
+    else:
+        v_id = uri("transcription", ext="").split(".")[-1]
 ##            bare_id = re.sub(r"Vols[A-Z]*|BK\d+", "", v_id)
 ##            bare_id = bare_id.split("-")[0]
 
-            srts = []
-
-            # get all srt files connected to the current version ID:
-            bare_id = v_id.split("-")[0]
-            if bare_id in srt_d:
-                srts += srt_d[bare_id]
-            # add srt files connected to previous versions of this text,
-            # before it was split into different parts or joined with other texts:
-            bare_id = re.sub(r"Vols[A-Z]*|BK\d+", "", bare_id)
-            if bare_id in srt_d:
-                old_srts = [x for x in srt_d[bare_id] if x not in srts]
-                srts = old_srts + srts
-            record["srts"] = srts
+    # get all srt files connected to the current version ID,
+    # preceded by the srt files connected to previous versions of this text,
+    # before it was split into different parts or joined with other texts:
+    bare_id = v_id.split("-")[0]
+    srts = srt_index.lookup(bare_id)
+    record["srts"] = srts
 ##            try:
 ##                record["srts"] = srt_d[bare_id]
 ##            except:
@@ -448,52 +630,75 @@ def createJsonFile(csv_fp, out_fp, passim_runs, issues_uri_dict):
 ##                        srt_link = "/".join([webserver_url, run_id, v_id])
 ##                    record['srts'].append([descr, srt_link])
 
-            # get issues related to the current book/version:
-            if "version" in uri.uri_type:
-                uri = URI(row["versionUri"])
-                book_issues = []
-                if uri("book") in issues_uri_dict:
-                    book_issues = issues_uri_dict[uri("book")]
-                    book_issues = [[x.number, x.labels[0].name] for x in book_issues]
-                    print(uri("book"), book_issues)
-                author_issues = []
-                if uri("author") in issues_uri_dict:
-                    author_issues += issues_uri_dict[uri("author")]
-                    author_issues = [[x.number, x.labels[0].name] for x in author_issues]
-                    print(uri("author"), author_issues)
-                version_issues = []
-                if uri("version") in issues_uri_dict:
-                    version_issues = issues_uri_dict[uri("version")]
-                    version_issues = [[x.number, x.labels[0].name] for x in version_issues]
-                    print(uri("version"), version_issues)
-                record["author_issues"] = author_issues
-                record["book_issues"] = book_issues
-                record["version_issues"] = version_issues
-                json_objects.append(record)
-            else:
-                uri = URI(row["versionUri"])
-                manuscr_issues = []
-                if uri("manuscript") in issues_uri_dict:
-                    manuscr_issues = issues_uri_dict[uri("manuscript")]
-                    manuscr_issues = [[x.number, x.labels[0].name] for x in manuscr_issues]
-                    print(uri("manuscript"), manuscr_issues)
-                loc_issues = []
-                if uri("location") in issues_uri_dict:
-                    loc_issues += issues_uri_dict[uri("location")]
-                    loc_issues = [[x.number, x.labels[0].name] for x in loc_issues]
-                    print(uri("location"), loc_issues)
-                transcr_issues = []
-                if uri("transcription") in issues_uri_dict:
-                    transcr_issues = issues_uri_dict[uri("transcription")]
-                    transcr_issues = [[x.number, x.labels[0].name] for x in transcr_issues]
-                    print(uri("transcription"), transcr_issues)
-                record["location_issues"] = loc_issues
-                record["manuscript_issues"] = manuscr_issues
-                record["transcription_issues"] = transcr_issues
-                json_objects.append(record)
-
-
+    # get issues related to the current book/version:
+    if "version" in uri.uri_type:
+        book_issues = []
+        if text_uri("book") in issues_uri_dict:
+            book_issues = issues_uri_dict[text_uri("book")]
+            book_issues = [[x.number, x.labels[0].name] for x in book_issues]
+            print(text_uri("book"), book_issues)
+        author_issues = []
+        if text_uri("author") in issues_uri_dict:
+            author_issues += issues_uri_dict[text_uri("author")]
+            author_issues = [[x.number, x.labels[0].name] for x in author_issues]
+            print(text_uri("author"), author_issues)
+        version_issues = []
+        if text_uri("version") in issues_uri_dict:
+            version_issues = issues_uri_dict[text_uri("version")]
+            version_issues = [[x.number, x.labels[0].name] for x in version_issues]
+            print(text_uri("version"), version_issues)
+        record["author_issues"] = author_issues
+        record["book_issues"] = book_issues
+        record["version_issues"] = version_issues
+    else:
+        manuscr_issues = []
+        if text_uri("manuscript") in issues_uri_dict:
+            manuscr_issues = issues_uri_dict[text_uri("manuscript")]
+            manuscr_issues = [[x.number, x.labels[0].name] for x in manuscr_issues]
+            print(text_uri("manuscript"), manuscr_issues)
+        loc_issues = []
+        if text_uri("location") in issues_uri_dict:
+            loc_issues += issues_uri_dict[text_uri("location")]
+            loc_issues = [[x.number, x.labels[0].name] for x in loc_issues]
+            print(text_uri("location"), loc_issues)
+        transcr_issues = []
+        if text_uri("transcription") in issues_uri_dict:
+            transcr_issues = issues_uri_dict[text_uri("transcription")]
+            transcr_issues = [[x.number, x.labels[0].name] for x in transcr_issues]
+            print(text_uri("transcription"), transcr_issues)
+        record["location_issues"] = loc_issues
+        record["manuscript_issues"] = manuscr_issues
+        record["transcription_issues"] = transcr_issues
+
+
+def save_json_dict(d, out_fp, indent=2, sort_keys=True):
+    """Save a dictionary in a json file, or (depending on the
+    json_output_format global variable) in a JSON Lines file with one
+    {"key": ..., "value": ...} object per line, sorted by key
+    (see utility/stream_writer.py).
 
+    Args:
+        d (dict): the dictionary to be saved
+        out_fp (str): path to the json file
+        indent (int): indentation of the json file
+        sort_keys (bool): sort the keys in the json file
+    """
+    if json_output_format.startswith("jsonl"):
+        write_jsonl(dict_lines(d), out_fp,
+                    compress=json_output_format.endswith(".gz"))
+        return
+    with open(out_fp, mode="w", encoding="utf-8") as outfile:
+        json.dump(d, outfile, indent=indent, ensure_ascii=False, sort_keys=sort_keys)
+
+
+def save_json_records(json_objects, out_fp):
+    """Save the json records in the json file, with the date and time
+    (or, depending on the json_output_format global variable, in a JSON Lines
+    file with one record per line, without the date and time)"""
+    if json_output_format.startswith("jsonl"):
+        write_jsonl(json_objects, out_fp,
+                    compress=json_output_format.endswith(".gz"))
+        return
     # The required format for json file is data:[{jsonobjects}]
     first_json_key = {}
     first_json_key['data'] = json_objects
@@ -514,6 +719,14 @@ def read_header(fp):
     Returns:
         header (list): A list of all metadata lines in the header
     """
+    if prefetcher is not None:
+        header = read_prefetched_header(fp)
+        if header is not None:
+            return header
+    if header_index is not None:
+        lines = header_index.read_header(fp, max_lines=100)
+        if lines is not None:
+            return [line for line in lines if "#META#" in line or "#NewRec#" in line]
     with open(fp, mode="r", encoding="utf-8") as file:
         header = []
         line = file.readline()
@@ -525,6 +738,24 @@ def read_header(fp):
             i += 1
     return header
 
+def read_prefetched_header(fp):
+    """Read the OpenITI header of a file from the bytes read by the prefetcher
+    (the same lines as read_header). Returns None if the file was not
+    prefetched, or if the header end is not in the prefetched bytes."""
+    prefetched = prefetcher.get_lines(fp)
+    if prefetched is None:
+        return None
+    lines, complete = prefetched
+    header = []
+    for i, line in enumerate(lines):
+        if "#META#Header#End" in line or i == 100:
+            return header
+        if "#META#" in line or "#NewRec#" in line:
+            header.append(line)
+    if complete:
+        return header
+    return None
+
 
 def extract_metadata_from_header(fp):
     """Extract the metadata from the headers of the text files.
@@ -590,11 +821,52 @@ def get_name_el(d, k):
     return ""
 
 
+def file_exists(fp):
+    """Check whether a file exists
+    (in the corpus inventory, if one was made; otherwise, on disk)"""
+    if corpus_inventory is not None:
+        return corpus_inventory.isfile(fp)
+    return os.path.exists(fp)
+
+def register_file(fp):
+    """Add a file that was created or changed by the script to the corpus inventory"""
+    if corpus_inventory is not None:
+        corpus_inventory.update(fp)
+    if prefetcher is not None:
+        prefetcher.discard(fp)
+
+def measure(phase, fp=None):
+    """Measure (a part of) a phase of the run in the run report, if one is made
+    (see utility/run_report.py); use as `with measure("yml_parsing", fp):`
+
+    Args:
+        phase (str): name of the phase
+        fp (str): path to the file processed in this part of the phase (if any)
+    """
+    if run_report is None:
+        return contextlib.nullcontext()
+    if fp is None:
+        return run_report.measure(phase)
+    try:
+        if corpus_inventory is not None:
+            n_bytes = corpus_inventory.getsize(fp)
+        else:
+            n_bytes = os.path.getsize(fp)
+    except OSError:
+        n_bytes = 0
+    return run_report.measure(phase, fp=fp, n_bytes=n_bytes)
+
 def extract_version_meta(uri, vers_yml_d, vers_yml_pth,
                          output_files_path, start_folder,
                          status_dic, incl_char_length,
-                         remove_from_path=None, recalculate_lengths=False):
-    """Extract the version-related metadata"""
+                         remove_from_path=None, recalculate_lengths=False,
+                         tok_count_engine="compiled"):
+    """Extract the version-related metadata
+
+    tok_count_engine (str): name of the function used to (re)count
+        the tokens in the text file (see tok_count_engines):
+        "compiled" (default; fast) or "regex" (the original count_toks)
+    """
 
     vers_uri = uri.build_uri("version")
 
@@ -633,12 +905,11 @@ def extract_version_meta(uri, vers_yml_d, vers_yml_pth,
 
     # recalculate the token length and character length if needed:
     if recalc:
-        uri.extension = ""
         #pth = uri.build_pth(uri_type="version_file")
         pth = vers_yml_pth[:-4]
         for ext in [".mARkdown", ".completed", ".inProgress", ""]:
             version_fp = pth + ext
-            if os.path.exists(version_fp):
+            if file_exists(version_fp):
                 #if incl_char_length:
                 #    char_length = ar_cnt_file(version_fp, mode="char")
                 #    if str(char_length) == "0":
@@ -651,17 +922,18 @@ def extract_version_meta(uri, vers_yml_d, vers_yml_pth,
                 #length = str(length)
                 #vers_yml_d["00#VERS#LENGTH###:"] = length
                 if incl_char_length:
-                    length, char_length = count_toks(version_fp, incl_chars=True)
+                    length, char_length = count_file_toks(version_fp, tok_count_engine, incl_chars=True)
                     char_length = str(char_length)
                     vers_yml_d["00#VERS#CLENGTH##:"] = char_length
                 else:
-                    length = count_toks(version_fp, incl_chars=False)
+                    length = count_file_toks(version_fp, tok_count_engine, incl_chars=False)
                 length = str(length)
                 vers_yml_d["00#VERS#LENGTH###:"] = length
 
                 ymlS = dicToYML(vers_yml_d, reflow=False)
                 with open(vers_yml_pth, mode="w", encoding="utf-8") as file:
                     file.write(ymlS)
+                register_file(vers_yml_pth)
                 break
 
     # - edition information:
@@ -678,14 +950,14 @@ def extract_version_meta(uri, vers_yml_d, vers_yml_pth,
     # - get the most advanced text file of this version
     #   (if different text files with the same extension exist in the folder)
     #   and give it a temporary secondary status:
-    local_pth, status_score = give_status_score(vers_yml_pth, uri, length)
+    local_pth, status_score = give_status_score(vers_yml_pth, length)
 
     # - build the link/path to the text file in the output file:
     fullTextURL = local_pth_to_fullTextURL(local_pth, start_folder,
                                            output_files_path,remove_from_path=remove_from_path)
 
     # - add the uri to the status_dic if the file is not missing:
-    if os.path.exists(local_pth):
+    if file_exists(local_pth):
         book_uri = uri.build_uri("book")
         if book_uri not in status_dic:
             status_dic[book_uri] = []
@@ -723,8 +995,12 @@ def extract_version_meta(uri, vers_yml_d, vers_yml_pth,
 def extract_transcr_meta(uri, transcr_yml_d, transcr_yml_pth,
                          output_files_path, start_folder,
                          status_dic, incl_char_length,
-                         remove_from_path=None, recalculate_lengths=False):
-    """Extract transcription-related metadata"""
+                         remove_from_path=None, recalculate_lengths=False,
+                         tok_count_engine="compiled"):
+    """Extract transcription-related metadata
+
+    tok_count_engine (str): see extract_version_meta
+    """
 
     transcr_uri = uri.build_uri("transcription")
 
@@ -771,11 +1047,10 @@ def extract_transcr_meta(uri, transcr_yml_d, transcr_yml_pth,
 
     # recalculate the token length and character length if needed:
     if recalc:
-        uri.extension = ""
         pth = transcr_yml_pth[:-4]
         for ext in [".mARkdown", ".completed", ".inProgress", ""]:
             transcr_fp = pth + ext
-            if os.path.exists(transcr_fp):
+            if file_exists(transcr_fp):
                 #if incl_char_length:
                 #    char_length = ar_cnt_file(transcr_fp, mode="char")
                 #    if str(char_length) == "0":
@@ -788,11 +1063,11 @@ def extract_transcr_meta(uri, transcr_yml_d, transcr_yml_pth,
                 #tok_length = str(length)
                 #transcr_yml_d["00#TRNS#LENGTH###:"] = str(length)
                 if incl_char_length:
-                    length, char_length = count_toks(transcr_fp, incl_chars=True)
+                    length, char_length = count_file_toks(transcr_fp, tok_count_engine, incl_chars=True)
                     char_length = str(char_length)
                     transcr_yml_d["00#TRNS#CLENGTH##:"] = char_length
                 else:
-                    length = count_toks(transcr_fp, incl_chars=False)
+                    length = count_file_toks(transcr_fp, tok_count_engine, incl_chars=False)
                 tok_length = str(length)
                 transcr_yml_d["00#TRNS#LENGTH###:"] = tok_length
 
@@ -800,6 +1075,7 @@ def extract_transcr_meta(uri, transcr_yml_d, transcr_yml_pth,
                 ymlS = dicToYML(transcr_yml_d, reflow=False)
                 with open(transcr_yml_pth, mode="w", encoding="utf-8") as file:
                     file.write(ymlS)
+                register_file(transcr_yml_pth)
                 break
 
     # - edition information:
@@ -817,14 +1093,14 @@ def extract_transcr_meta(uri, transcr_yml_d, transcr_yml_pth,
     # - get the most advanced text file of this version
     #   (if different text files with the same extension exist in the folder)
     #   and give it a temporary secondary status:
-    local_pth, status_score = give_status_score(transcr_yml_pth, uri, length)
+    local_pth, status_score = give_status_score(transcr_yml_pth, length)
 
     # - build the link/path to the text file in the output file:
     fullTextURL = local_pth_to_fullTextURL(local_pth, start_folder, output_files_path,
                                            remove_from_path=remove_from_path)
 
     # - add the uri to the status_dic if the file is not missing:
-    if os.path.exists(local_pth):
+    if file_exists(local_pth):
         manuscr_uri = uri.build_uri("manuscript")
         if manuscr_uri not in status_dic:
             status_dic[manuscr_uri] = []
@@ -858,7 +1134,7 @@ def extract_transcr_meta(uri, transcr_yml_d, transcr_yml_pth,
 
     return transcr_d, uri, status_dic
 
-def give_status_score(yml_pth, uri, length):
+def give_status_score(yml_pth, length):
     """Select the text file with the most advanced extension for a specific version
     and define a score for it to later decide
     which version of a book should be the primary version"""
@@ -877,23 +1153,21 @@ def give_status_score(yml_pth, uri, length):
 
     # - make a provisional (i.e., without extension)
     #   local filepath to the current version:
-    uri.extension = ""
+    extension = ""
     local_pth = re.sub(r"\\", "/", yml_pth[:-4])
     
-    if os.path.isfile(local_pth+".mARkdown"):
+    if file_exists(local_pth+".mARkdown"):
         status_score = 10000000000 + int(length)
-        uri.extension = "mARkdown"
-    elif os.path.isfile(local_pth+".completed"):
+        extension = "mARkdown"
+    elif file_exists(local_pth+".completed"):
         status_score = 1000000000 + int(length)
-        uri.extension = "completed"
-    elif os.path.isfile(local_pth+".inProgress"):
+        extension = "completed"
+    elif file_exists(local_pth+".inProgress"):
         status_score = 100000000 + int(length)
-        uri.extension = "inProgress"
+        extension = "inProgress"
     elif "Sham30K" in local_pth: # give Sham30K files lowest priority
         status_score = 0
-        uri.extension = ""
     else:
-        uri.extension = ""
         if length:
             status_score = int(length)
         else:
@@ -902,8 +1176,8 @@ def give_status_score(yml_pth, uri, length):
     # - rebuild the local_path, with the extension
     #   (in case there is more than one text file with the same ID
     #   but different extensions):
-    if uri.extension:
-        local_pth+= "." + uri.extension
+    if extension:
+        local_pth+= "." + extension
 
     return local_pth, status_score
 
@@ -986,7 +1260,8 @@ def get_multilingual_vals(d, key_template, language_codes, sep=r"\s*,\s*",
         lang_vals = get_comma_sep_vals(d, k, sep=sep, excl_regex=excl_regex,
                                        splitter=splitter, split_idx=split_idx, joiner=None)
         if transcribe:
-            lang_vals = [betaCodeToArSimple(v, lang_code=lang) for v in lang_vals]
+            lang_vals = betaCodeToArBatch(lang_vals, lang_code=lang,
+                                          cache=conversion_cache)
         if first_only:
             return lang_vals[0]
         vals += lang_vals
@@ -1088,11 +1363,26 @@ def extract_location_meta(uri, loc_yml_d, all_loc_meta_d):
     loc_d["institution_lat"] = inst_lat
     loc_d["institution_ar"] = inst_ar
     loc_d["external_id"] = external_id
-    loc_d["manuscripts"] = []
+    loc_d["manuscripts"] = UniqueList()
 
     return loc_d
 
 
+def add_geo_uris(geo, auth_yml_fn):
+    """Register the author yml file in which each place URI is used
+    (in the global geo_URIs dictionary, used in check_thurayya_uris)
+
+    Args:
+        geo (list): list of geo tags (format: born@MakkaBadr_RE)
+        auth_yml_fn (str): filename of the author yml file
+    """
+    for tag in geo:
+        p = tag.split("@", 1)[1]
+        if p not in geo_URIs:
+            geo_URIs[p] = set()
+        geo_URIs[p].add(auth_yml_fn)
+
+
 def extract_author_meta(uri, auth_yml_d, all_auth_meta_d, name_elements_d):
     """Extract author-related metadata"""
 
@@ -1114,6 +1404,7 @@ def extract_author_meta(uri, auth_yml_d, all_auth_meta_d, name_elements_d):
     full_name = ""
     author_lat = []
     author_ar = []
+    to_convert = []  # names to be converted into Arabic script
 
     # Add the latinized name from the URI:
     author_name_from_uri = insert_spaces(auth_uri)[4:]
@@ -1126,7 +1417,7 @@ def extract_author_meta(uri, auth_yml_d, all_auth_meta_d, name_elements_d):
     if shuhra:
         shuhra = re.sub(r"[ \r\n¶]+", " ", shuhra).strip()
         author_lat.append(shuhra)
-        author_ar.append(betaCodeToArSimple(shuhra))
+        to_convert.append(shuhra)
 
     ## create a full (Latin-script) name from the name elements:
     
@@ -1145,7 +1436,8 @@ def extract_author_meta(uri, auth_yml_d, all_auth_meta_d, name_elements_d):
     if full_name:
         full_name = re.sub(r"[ \r\n¶]+", " ", full_name).strip()
         author_lat.append(full_name)
-        author_ar.append(betaCodeToArSimple(full_name))
+        to_convert.append(full_name)
+    author_ar += betaCodeToArBatch(to_convert, cache=conversion_cache)
 
     ## create a full English-language name from the name elements:
     
@@ -1177,7 +1469,8 @@ def extract_author_meta(uri, auth_yml_d, all_auth_meta_d, name_elements_d):
             else:
                 # store a version of the name in transcription and Arabic script:
                 name_d["LA"] = lang_d
-                lang_d_converted = {k: betaCodeToArSimple(v) for k,v in lang_d.items()}
+                lang_d_converted = dict(zip(lang_d, betaCodeToArBatch(list(lang_d.values()),
+                                                                      cache=conversion_cache)))
                 name_d[lang] = lang_d_converted
                 
     if name_d:
@@ -1188,34 +1481,13 @@ def extract_author_meta(uri, auth_yml_d, all_auth_meta_d, name_elements_d):
     auth_yml_fn = auth_uri + ".yml"
     geo_regex = r"\w+_RE(?:_\w+)?|\w+_[RSNO]\b|\w+XXXYYY\w*"
     
-    born = re.findall(geo_regex, auth_yml_d["20#AUTH#BORN#####:"])
-    for p in born:
-        geo.append("born@"+p)
-        if p not in geo_URIs:
-            geo_URIs[p] = set()
-        geo_URIs[p].add(auth_yml_fn)    # SIDE_EFFECT!
-
-        
-    died = re.findall(geo_regex, auth_yml_d["20#AUTH#DIED#####:"])
-    for p in died:
-        geo.append("died@"+p)
-        if p not in geo_URIs:
-            geo_URIs[p] = set()
-        geo_URIs[p].add(auth_yml_fn)    # SIDE_EFFECT!
-    
-    resided = re.findall(geo_regex, auth_yml_d["20#AUTH#RESIDED##:"])
-    for p in resided:
-        geo.append("resided@"+p)
-        if p not in geo_URIs:
-            geo_URIs[p] = set()
-        geo_URIs[p].add(auth_yml_fn)    # SIDE_EFFECT!
-
-    visited = re.findall(geo_regex, auth_yml_d["20#AUTH#VISITED##:"])
-    for p in visited:
-        geo.append("visited@"+p)
-        if p not in geo_URIs:
-            geo_URIs[p] = set()
-        geo_URIs[p].add(auth_yml_fn)    # SIDE_EFFECT!
+    for geo_type, key in [("born", "20#AUTH#BORN#####:"),
+                          ("died", "20#AUTH#DIED#####:"),
+                          ("resided", "20#AUTH#RESIDED##:"),
+                          ("visited", "20#AUTH#VISITED##:")]:
+        for p in re.findall(geo_regex, auth_yml_d[key]):
+            geo.append(geo_type+"@"+p)
+    add_geo_uris(geo, auth_yml_fn)    # SIDE_EFFECT!
 
     excl_regex = r"(?i)^\s*None\s*$|viaf@id, wikidata@id, src@id"
     external_id = get_comma_sep_vals(auth_yml_d, "70#AUTH#EXTID####:",
@@ -1235,7 +1507,7 @@ def extract_author_meta(uri, auth_yml_d, all_auth_meta_d, name_elements_d):
     author_d["vers_uri"] = english_name
     author_d["geo"] = geo
     author_d["external_id"] = external_id
-    author_d["books"] = []
+    author_d["books"] = UniqueList()
 
     return author_d, name_elements_d
 
@@ -1320,7 +1592,7 @@ def extract_manuscr_meta(uri, manuscr_yml_d, tags_dic, all_manuscr_meta_d):
     manuscr_d = dict()
     manuscr_d["uri"] = manuscr_uri
     manuscr_d["shelfmark"] = shelfmark
-    manuscr_d["genre_tags"] = genres
+    manuscr_d["genre_tags"] = UniqueList(genres)
     manuscr_d["titles_lat"] = titles_lat
     manuscr_d["titles_ar"] = titles_ar
     manuscr_d["authors_lat"] = authors_lat
@@ -1335,7 +1607,7 @@ def extract_manuscr_meta(uri, manuscr_yml_d, tags_dic, all_manuscr_meta_d):
     return manuscr_d
 
 
-def extract_book_meta(uri, book_yml_d, tags_dic, all_book_meta_d, book_rel_d):
+def extract_book_meta(uri, book_yml_d, tags_dic, all_book_meta_d, book_rels):
     """Extract book-related metadata"""
     
     book_uri = uri.build_uri("book")
@@ -1345,52 +1617,14 @@ def extract_book_meta(uri, book_yml_d, tags_dic, all_book_meta_d, book_rel_d):
     # or if no readable book YML file was found:
     
     if book_uri in all_book_meta_d:
-        return all_book_meta_d[book_uri], book_rel_d
+        return all_book_meta_d[book_uri], book_rels
     if not book_yml_d:
-        return dict(), book_rel_d
+        return dict(), book_rels
 
-    # - extract book relations:
+    # - extract book relations (old and new format; see utility/book_relations.py):
     
     if "40#BOOK#RELATED##:" in book_yml_d:
-        rels = book_yml_d["40#BOOK#RELATED##:"].strip()
-        if rels.startswith("URI of"):
-            rels = ""
-        rels = re.sub(r"[ \r\n¶]+", " ", rels)
-        rels = re.split(r" *[;:]+ *", rels)
-        rels = [rel for rel in rels if rel.strip()]
-        for rel in rels:
-            if "@" in rel:  # new format: COMM.sharh@0255Jahiz.Hayawan
-                rel_types = rel.strip().split("@")[0]
-                rel_book = rel.strip().split("@")[1]
-            else:           # old format: 0255Jahiz.Hayawan (COMM.sharh)
-                try:
-                    rel_types = re.findall(r"\(([^\)]+)", rel)[0].strip()
-                except:
-                    print(book_uri, ":")
-                    print("    no relationship type found in ", [rel])
-                    continue
-                rel_book = re.sub(r" *\(.+", "", rel).strip()
-            
-            
-            if not book_uri in book_rel_d:
-                book_rel_d[book_uri] = []
-            if not rel_book in book_rel_d:
-                book_rel_d[rel_book] = []
-            for rel_type in re.split(r" *, *", rel_types):
-                if "." in rel_type:
-                    main_rel_type = re.split(r" *\. *", rel_type)[0]
-                    sec_rel_type = re.split(r" *\. *", rel_type)[1]
-                else:
-                    main_rel_type = rel_type
-                    sec_rel_type = ""
-                rel = {"source": book_uri,
-                       "main_rel_type": main_rel_type,
-                       "sec_rel_type": sec_rel_type,
-                       "dest": rel_book}
-                if not rel in  book_rel_d[book_uri]:
-                    book_rel_d[book_uri].append(rel)
-                if not rel in book_rel_d[rel_book]:
-                    book_rel_d[rel_book].append(rel)
+        book_rels.add_yml_relations(book_uri, book_yml_d["40#BOOK#RELATED##:"])
         
 
     # - extract title metadata:
@@ -1402,7 +1636,7 @@ def extract_book_meta(uri, book_yml_d, tags_dic, all_book_meta_d, book_rel_d):
             if not ("al-Muʾallif" in book_yml_d[c]\
                     or "none" in book_yml_d[c].lower()):
                 title_lat.append(book_yml_d[c].strip())
-                title_ar.append(betaCodeToArSimple(title_lat[-1]))
+        title_ar = betaCodeToArBatch(title_lat, cache=conversion_cache)
 
     if not title_lat:
         title_lat.append(insert_spaces(uri.title))
@@ -1430,23 +1664,274 @@ def extract_book_meta(uri, book_yml_d, tags_dic, all_book_meta_d, book_rel_d):
     book_d["uri"] = book_uri
     book_d["title_ar"] = title_ar
     book_d["title_lat"] = title_lat
-    book_d["genre_tags"] = list(set(genre_tags))
+    book_d["genre_tags"] = UniqueList(set(genre_tags))
     book_d["external_id"] = external_id
     book_d["versions"] = []
     book_d["relations"] = []
 
-    return book_d, book_rel_d
+    return book_d, book_rels
 
 def load_yml(yml_pth):
     try:
-        yml_d = readYML(yml_pth)
+        with measure("yml_parsing", yml_pth):
+            yml_str = None
+            if prefetcher is not None:
+                yml_str = prefetcher.get_text(yml_pth)
+            if yml_str is None:
+                yml_d = readYML(yml_pth)
+            else:
+                yml_d = ymlToDic(yml_str, yml_fp=yml_pth)
         if not yml_d:
             yml_d = fix_broken_yml(yml_pth)
+            register_file(yml_pth)
     except:
         print("YML file not found:", yml_pth)
         yml_d = {}
     return yml_d
 
+def load_yml_once(yml_pth, loaded):
+    """Load a yml file only if it was not yet loaded
+    (into the `loaded` dictionary) for the current version.
+
+    If the yml cache is used, the file will only be parsed
+    if it was not loaded for another version before."""
+    if yml_pth not in loaded:
+        if yml_cache is not None:
+            loaded[yml_pth] = yml_cache.load(yml_pth, load_yml)
+        else:
+            loaded[yml_pth] = load_yml(yml_pth)
+    return loaded[yml_pth]
+
+def yml_to_str(yml_pth, loaded):
+    """Convert a yml file's dictionary into a yml string for the master yml file
+    (re-using the string made for another version if the yml cache is used)"""
+    yml_d = load_yml_once(yml_pth, loaded)
+    if yml_cache is not None:
+        return yml_cache.serialize(yml_pth, yml_d,
+                                   lambda d: dicToYML(d, reflow=False))
+    return dicToYML(yml_d, reflow=False)
+
+def make_yml_cache():
+    """Create a cache for the yml files loaded in the current run"""
+    if corpus_inventory is not None:
+        return YmlCache(stat=corpus_inventory.stat)
+    return YmlCache()
+
+def get_cached(cache, kind, key, input_fps):
+    """Get an extraction result from the cache (None if no cache is used)"""
+    if cache is None:
+        return None
+    return cache.get(kind, key, input_fps)
+
+def set_cached(cache, kind, key, input_fps, value):
+    """Store an extraction result in the cache (if a cache is used)"""
+    if cache is not None:
+        cache.set(kind, key, input_fps, value)
+
+def text_file_candidates(yml_pth):
+    """List the paths of all text files that can belong to a version yml file"""
+    pth = yml_pth[:-4]
+    return [pth + ext for ext in [".mARkdown", ".completed", ".inProgress", ""]]
+
+def get_yml_record(cache, yml_pths, loaded):
+    """Build the master yml record for a version/transcription
+    from its own yml file and the yml files of its book/manuscript
+    and author/location"""
+    record = get_cached(cache, "record", yml_pths[0], yml_pths)
+    if record is None:
+        yml_strings = [yml_to_str(pth, loaded) for pth in yml_pths]
+        record = "{}\n{}\n{}\n{}\n".format(splitter, *yml_strings)
+        set_cached(cache, "record", yml_pths[0], yml_pths, record)
+    return record
+
+def get_yml_string(cache, yml_pth, loaded):
+    """Get the yml string of a single yml file for the compact master yml file"""
+    yml_str = get_cached(cache, "yml_string", yml_pth, [yml_pth])
+    if yml_str is None:
+        yml_str = yml_to_str(yml_pth, loaded)
+        set_cached(cache, "yml_string", yml_pth, [yml_pth], yml_str)
+    return yml_str
+
+def get_yml_records(cache, yml_pths, loaded, shared_refs=None):
+    """Build the master yml record(s) for a version/transcription.
+
+    Args:
+        cache (ExtractionCache): extraction cache (None: no cache is used)
+        yml_pths (list): paths to the yml files of the version/transcription,
+            its book/manuscript and its author/location
+        loaded (dict): the yml files already loaded for this version
+        shared_refs (set): if None, a single record in the normal format
+            is returned (see get_yml_record); otherwise, the records
+            in the compact format (see utility/master_yml.py): a shared record
+            for every book/author/... whose URI is not yet in shared_refs,
+            followed by the version/transcription record
+
+    Returns:
+        list of strings
+    """
+    if shared_refs is None:
+        return [get_yml_record(cache, yml_pths, loaded)]
+    records = []
+    refs = [os.path.basename(pth)[:-4] for pth in yml_pths[1:]]
+    for ref, pth in zip(refs, yml_pths[1:]):
+        if ref not in shared_refs:
+            shared_refs.add(ref)
+            records.append(make_shared_record(ref, get_yml_string(cache, pth, loaded)))
+    records.append(make_compact_record(get_yml_string(cache, yml_pths[0], loaded), refs))
+    return records
+
+def cache_yml_records(cache, yml_pths, loaded, compact_yml):
+    """Store the master yml record(s) of a version/transcription in the cache
+    in the format that is not used in the current collection
+    (compact_yml: the format that is used), so that they are made from
+    the yml files before the script changes them (see scan_corpus)"""
+    if compact_yml:
+        get_yml_record(cache, yml_pths, loaded)
+    else:
+        get_yml_records(cache, yml_pths, loaded, shared_refs=set())
+
+def use_unique_lists(d, keys):
+    """Replace the lists in a metadata dictionary from the cache
+    to which elements are added for every version (e.g., the books
+    of an author) with UniqueLists (see utility/unique_list.py)"""
+    for key in keys:
+        if key in d:
+            d[key] = UniqueList(d[key])
+    return d
+
+def get_author_meta(cache, uri, auth_yml_pth, loaded,
+                    all_auth_meta_d, name_elements_d):
+    """Get the author metadata from the cache or from the author yml file"""
+    auth_uri = uri.build_uri("author")
+    if auth_uri in all_auth_meta_d:
+        return all_auth_meta_d[auth_uri], name_elements_d
+    cached = get_cached(cache, "author", auth_yml_pth, [auth_yml_pth])
+    if cached is None:
+        auth_yml_d = load_yml_once(auth_yml_pth, loaded)
+        auth_d, name_elements_d = extract_author_meta(uri, auth_yml_d,
+                                                      all_auth_meta_d,
+                                                      name_elements_d)
+        cached = {"author_d": auth_d,
+                  "name_d": name_elements_d.get(auth_uri, None)}
+        set_cached(cache, "author", auth_yml_pth, [auth_yml_pth], cached)
+        return auth_d, name_elements_d
+    # replay the side effects of extract_author_meta:
+    auth_d = use_unique_lists(cached["author_d"], ["books"])
+    if cached["name_d"]:
+        name_elements_d[auth_uri] = cached["name_d"]
+    if auth_d:
+        add_geo_uris(auth_d["geo"], auth_uri + ".yml")
+    return auth_d, name_elements_d
+
+def get_book_meta(cache, uri, book_yml_pth, loaded, all_book_meta_d, book_rels):
+    """Get the book metadata from the cache or from the book yml file"""
+    book_uri = uri.build_uri("book")
+    if book_uri in all_book_meta_d:
+        return all_book_meta_d[book_uri], book_rels
+    # genre tags from the tags_dic depend on the version ID:
+    key = book_yml_pth + "|" + uri.version
+    cached = get_cached(cache, "book", key, [book_yml_pth])
+    if cached is None:
+        book_yml_d = load_yml_once(book_yml_pth, loaded)
+        book_d, book_rels = extract_book_meta(uri, book_yml_d, tags_dic,
+                                              all_book_meta_d, book_rels)
+        rels = book_rels.relations(book_uri, as_source=True)
+        set_cached(cache, "book", key, [book_yml_pth],
+                   {"book_d": book_d, "rels": rels})
+        return book_d, book_rels
+    # replay the side effects of extract_book_meta:
+    for rel in cached["rels"]:
+        book_rels.add_dict(rel)
+    return use_unique_lists(cached["book_d"], ["genre_tags"]), book_rels
+
+def get_location_meta(cache, uri, loc_yml_pth, loaded, all_loc_meta_d):
+    """Get the location metadata from the cache or from the location yml file"""
+    if uri.build_uri("location") in all_loc_meta_d:
+        return all_loc_meta_d[uri.build_uri("location")]
+    loc_d = get_cached(cache, "location", loc_yml_pth, [loc_yml_pth])
+    if loc_d is None:
+        loc_yml_d = load_yml_once(loc_yml_pth, loaded)
+        loc_d = extract_location_meta(uri, loc_yml_d, all_loc_meta_d)
+        set_cached(cache, "location", loc_yml_pth, [loc_yml_pth], loc_d)
+        return loc_d
+    return use_unique_lists(loc_d, ["manuscripts"])
+
+def get_manuscr_meta(cache, uri, manuscr_yml_pth, loaded, all_manuscr_meta_d):
+    """Get the manuscript metadata from the cache or from the manuscript yml file"""
+    if uri.build_uri("manuscript") in all_manuscr_meta_d:
+        return all_manuscr_meta_d[uri.build_uri("manuscript")]
+    manuscr_d = get_cached(cache, "manuscript", manuscr_yml_pth, [manuscr_yml_pth])
+    if manuscr_d is None:
+        manuscr_yml_d = load_yml_once(manuscr_yml_pth, loaded)
+        manuscr_d = extract_manuscr_meta(uri, manuscr_yml_d, tags_dic,
+                                         all_manuscr_meta_d)
+        set_cached(cache, "manuscript", manuscr_yml_pth, [manuscr_yml_pth],
+                   manuscr_d)
+        return manuscr_d
+    return use_unique_lists(manuscr_d, ["genre_tags"])
+
+def get_text_meta(cache, kind, extract_func, uri, yml_pth, loaded,
+                  output_files_path, start_folder, status_dic,
+                  incl_char_length, remove_from_path=None,
+                  tok_count_engine="compiled"):
+    """Get the version/transcription metadata from the cache
+    or from the version/transcription yml file.
+
+    Args:
+        kind (str): "version" or "transcription"
+        extract_func (function): extract_version_meta or extract_transcr_meta
+        (other arguments: see extract_version_meta)
+
+    Returns:
+        (text_d, uri, status_dic)
+    """
+    input_fps = [yml_pth] + text_file_candidates(yml_pth)
+    # the extracted metadata also depends on the following arguments
+    # (but not on output_files_path and remove_from_path: the fullTextURL
+    # is built again from the local path when the cached metadata is used):
+    key = "|".join([yml_pth, start_folder, str(incl_char_length)])
+    if kind == "version":
+        parent_uri = uri.build_uri("book")
+    else:
+        parent_uri = uri.build_uri("manuscript")
+    cached = get_cached(cache, kind, key, input_fps)
+    if cached is None:
+        n_status = len(status_dic.get(parent_uri, []))
+        yml_d = load_yml_once(yml_pth, loaded)
+        text_d, uri, status_dic = extract_func(uri, yml_d, yml_pth,
+                                               output_files_path, start_folder,
+                                               status_dic, incl_char_length,
+                                               remove_from_path=remove_from_path,
+                                               tok_count_engine=tok_count_engine)
+        # NB: the yml file may have been changed by extract_func:
+        set_cached(cache, kind, key, input_fps,
+                   {"text_d": text_d,
+                    "status": status_dic.get(parent_uri, [])[n_status:]})
+        return text_d, uri, status_dic
+    # replay the side effects of extract_func:
+    if cached["status"]:
+        if parent_uri not in status_dic:
+            status_dic[parent_uri] = []
+        status_dic[parent_uri] += cached["status"]
+    text_d = cached["text_d"]
+    text_d["fullTextURL"] = local_pth_to_fullTextURL(text_d["local_pth"], start_folder,
+                                                     output_files_path,
+                                                     remove_from_path=remove_from_path)
+    return text_d, uri, status_dic
+
+def get_header_meta(cache, fp):
+    """Get the metadata from a text file header from the cache or the text file"""
+    cached = get_cached(cache, "header", fp, [fp])
+    if cached is None:
+        with measure("header_extraction", fp):
+            meta = extract_metadata_from_header(fp)
+        all_meta = all_header_meta[os.path.split(fp)[0]]
+        set_cached(cache, "header", fp, [fp], {"meta": meta, "all_meta": all_meta})
+        return meta
+    # replay the side effects of extract_metadata_from_header:
+    all_header_meta[os.path.split(fp)[0]] = cached["all_meta"]
+    return cached["meta"]
+
 def list2str(arr, sep=" :: "):
     """Turn a list into a string (removing empty elements and using a specified separator between elements)"""
     if type(arr) == str:
@@ -1459,6 +1944,7 @@ def aggregate_arabic_names(all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
     # aggregate the Arabic names found in all text files by the author:
     for auth_uri, auth_d in all_auth_meta_d.items():
         if not auth_d["author_ar"]:
+            auth_d["author_ar"] = UniqueList(auth_d["author_ar"])
             for book_uri in auth_d["books"]:
                 book_d = all_book_meta_d[book_uri]
                 for vers_uri in book_d["versions"]:
@@ -1472,6 +1958,7 @@ def aggregate_arabic_names(all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
     # aggregate the Arabic book titles found in all text files of the book:
     for book_uri, book_d in all_book_meta_d.items():
         if "title_ar" in book_d and not book_d["title_ar"]:
+            book_d["title_ar"] = UniqueList(book_d["title_ar"])
             for vers_uri in book_d["versions"]:
                 vers_d = all_vers_meta_d[vers_uri]
                 if "title_ar" in vers_d and vers_d["title_ar"]:
@@ -1495,13 +1982,22 @@ def aggregate_arabic_names(all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
 
 def create_tsv_row(vers_uri, all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
                    split_ar_lat=True, incl_char_length=True, sep="\t"):
+    cells = create_tsv_cells(vers_uri, all_vers_meta_d, all_book_meta_d,
+                             all_auth_meta_d, split_ar_lat=split_ar_lat,
+                             incl_char_length=incl_char_length)
+    return sep.join(cells)
+
+def create_tsv_cells(vers_uri, all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
+                     split_ar_lat=True, incl_char_length=True):
+    """Create the cells of the tsv row of a version
+    (one string for every column in make_tsv_columns)"""
     # get the relevant dictionaries:
     
     vers_d = all_vers_meta_d[vers_uri]
-    uri = URI(vers_d["fullTextURL"])
-    book_uri = uri.build_uri("book")
+    uri = parse_uri(vers_d["fullTextURL"])
+    book_uri = uri.book_uri
     book_d = all_book_meta_d[book_uri]
-    auth_uri = uri.build_uri("author")
+    auth_uri = uri.author_uri
     auth_d = all_auth_meta_d[auth_uri]
 
     # prepare values for the tsv row:
@@ -1530,47 +2026,57 @@ def create_tsv_row(vers_uri, all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
     # build the tsv row:
     
     if not split_ar_lat:
-        author = list2str([author_lat, author_ar])
-        title = list2str([title_lat, title_ar])
-        city = ""
-        institution = ""
+        author = [list2str([author_lat, author_ar])]
+        title = [list2str([title_lat, title_ar])]
+        city = [""]
+        institution = [""]
     else:
-        author = author_ar + sep + author_lat
-        title = title_ar + sep + title_lat
-        city = "" + sep + ""
-        institution = "" + sep + ""
+        author = [author_ar, author_lat]
+        title = [title_ar, title_lat]
+        city = ["", ""]
+        institution = ["", ""]
 
     if incl_char_length:
-        length = vers_d["tok_length"] + sep + vers_d["char_length"]
+        length = [vers_d["tok_length"], vers_d["char_length"]]
     else:
-        length = vers_d["tok_length"]
+        length = [vers_d["tok_length"]]
 
     shelfmark = ""
     catalog_ref = ""
     parts = ""
-    row = [vers_uri, language, subcorpus, uncorrected_OCR, auth_d["date"], author,
-           book_uri, title, ed_info, uri.version, vers_d["status"],
-           length, vers_d["fullTextURL"],
+    row = [vers_uri, language, subcorpus, uncorrected_OCR, auth_d["date"], *author,
+           book_uri, *title, ed_info, uri.version, vers_d["status"],
+           *length, vers_d["fullTextURL"],
            tags, auth_d["author_name_from_uri"],
            auth_d["shuhra"], auth_d["full_name"],
-           city, institution, shelfmark, catalog_ref, parts]
+           *city, *institution, shelfmark, catalog_ref, parts]
     #if incl_char_length:
     #    row.append(vers_d["char_length"])
 
-    return sep.join([str(cell) for cell in row])
+    return [str(cell) for cell in row]
 
 def create_transcr_tsv_row(transcr_uri, all_transcr_meta_d, all_manuscr_meta_d,
                            all_loc_meta_d, split_ar_lat=True, incl_char_length=True, sep="\t"):
+    cells = create_transcr_tsv_cells(transcr_uri, all_transcr_meta_d,
+                                     all_manuscr_meta_d, all_loc_meta_d,
+                                     split_ar_lat=split_ar_lat,
+                                     incl_char_length=incl_char_length)
+    return sep.join(cells)
+
+def create_transcr_tsv_cells(transcr_uri, all_transcr_meta_d, all_manuscr_meta_d,
+                             all_loc_meta_d, split_ar_lat=True, incl_char_length=True):
+    """Create the cells of the tsv row of a transcription
+    (one string for every column in make_tsv_columns)"""
     # get the relevant dictionaries:
     
     transcr_d = all_transcr_meta_d[transcr_uri]
-    uri = URI(transcr_d["fullTextURL"])
+    uri = parse_uri(transcr_d["fullTextURL"])
 
     language= ",".join(uri.languages.keys())
     
-    manuscr_uri = uri.build_uri("manuscript")
+    manuscr_uri = uri.manuscript_uri
     manuscr_d = all_manuscr_meta_d[manuscr_uri]
-    loc_uri = uri.build_uri("location")
+    loc_uri = uri.location_uri
     loc_d = all_loc_meta_d[loc_uri]
 
     # prepare values for the tsv row:
@@ -1610,7 +2116,7 @@ def create_transcr_tsv_row(transcr_uri, all_transcr_meta_d, all_manuscr_meta_d,
     for p in manuscr_d["parts"]:
         book_uri = p.split("@")[0]
         try:
-            if URI(book_uri).uri_type == "book":
+            if parse_uri(book_uri).uri_type == "book":
                 book_uris.append(book_uri)
         except:
             continue
@@ -1619,20 +2125,20 @@ def create_transcr_tsv_row(transcr_uri, all_transcr_meta_d, all_manuscr_meta_d,
     # build the tsv row:
     
     if not split_ar_lat:
-        author = list2str([author_lat, author_ar])
-        title = list2str([title_lat, title_ar])
-        city = list2str([city_lat, city_ar])
-        institution = list2str([institution_lat, institution_ar])
+        author = [list2str([author_lat, author_ar])]
+        title = [list2str([title_lat, title_ar])]
+        city = [list2str([city_lat, city_ar])]
+        institution = [list2str([institution_lat, institution_ar])]
     else:
-        author = author_ar + sep + author_lat
-        title = title_ar + sep + title_lat
-        city = city_ar + sep + city_lat
-        institution = institution_ar + sep + institution_lat
+        author = [author_ar, author_lat]
+        title = [title_ar, title_lat]
+        city = [city_ar, city_lat]
+        institution = [institution_ar, institution_lat]
 
     if incl_char_length:
-        length = transcr_d["tok_length"] + sep + transcr_d["char_length"]
+        length = [transcr_d["tok_length"], transcr_d["char_length"]]
     else:
-        length = transcr_d["tok_length"]
+        length = [transcr_d["tok_length"]]
     
     date = ""
     author_from_uri = ""
@@ -1643,66 +2149,135 @@ def create_transcr_tsv_row(transcr_uri, all_transcr_meta_d, all_manuscr_meta_d,
     author_full_name = sorted(author_lat.split(" :: "), key=lambda el: len(el))[-1]
     subcorpus = "MSS"
               
-    row = [transcr_uri, language, subcorpus, uncorrected_OCR, date, author,
-           book_uri, title, ed_info, uri.transcription, transcr_d["status"],
-           length, transcr_d["fullTextURL"],
+    row = [transcr_uri, language, subcorpus, uncorrected_OCR, date, *author,
+           book_uri, *title, ed_info, uri.transcription, transcr_d["status"],
+           *length, transcr_d["fullTextURL"],
            tags, author_from_uri,
            author_shuhra, author_full_name,
-           city, institution, shelfmark, catalog_ref, parts]
+           *city, *institution, shelfmark, catalog_ref, parts]
     #if incl_char_length:
     #    row.append(transcr_d["char_length"])
 
-    return sep.join([str(cell) for cell in row])
-
-def collectMetadata(start_folder, exclude, csv_outpth, yml_outpth,
-                    book_rel_outpth, name_el_outpth,
-                    incl_char_length=False, split_ar_lat=False,
-                    flat_folder=False, output_files_path=None,
-                    remove_from_path=None):
-    """Collect the metadata from URIs, YML files and text file headers
-    and save the metadata in csv and yml files.
+    return [str(cell) for cell in row]
+
+def make_extraction_cache(cache_fp):
+    """Load the extraction cache; the whole cache is discarded
+    if the script, the conversion tables, the modules that shape
+    the cached values or the version of the openiti library have changed."""
+    utility_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "utility")
+    salt_fps = [os.path.abspath(__file__)]
+    for fn in ["betaCode.py", "ID_TAGS.txt", "book_relations.py",
+               "unique_list.py", "parsed_uri.py", "master_yml.py"]:
+        salt_fps.append(os.path.join(utility_folder, fn))
+    salt = "openiti " + getattr(openiti, "__version__", "")
+    if corpus_inventory is not None:
+        return ExtractionCache(cache_fp, salt_fps=salt_fps, salt=salt,
+                               stat=corpus_inventory.stat)
+    return ExtractionCache(cache_fp, salt_fps=salt_fps, salt=salt)
+
+def make_header_index(header_index_fp):
+    """Load the index of header end positions in the text files"""
+    if corpus_inventory is not None:
+        return HeaderIndex(header_index_fp, stat=corpus_inventory.stat)
+    return HeaderIndex(header_index_fp)
+
+def new_meta_collections():
+    """Create the dictionaries and lists into which
+    the metadata of (a part of) the corpus is collected."""
+    return {
+        "dataYML": [],              # master yml records
+        "shared_yml_refs": set(),   # shared records in the compact master yml
+        "status_dic": dict(),
+        "split_files": dict(),
+        "book_relations": BookRelations(),
+        "name_elements_d": dict(),
+        "all_auth_meta_d": dict(),    # will contain all author-level metadata
+        "all_book_meta_d": dict(),    # will contain all book-level metadata
+        "all_vers_meta_d": dict(),    # will contain all version-level metadata
+        "all_loc_meta_d": dict(),     # will contain all location-level metadata
+        "all_manuscr_meta_d": dict(), # will contain all manuscript-level metadata
+        "all_transcr_meta_d": dict(), # will contain all transcription-level metadata
+        }
+
+def get_coll_id(version_id):
+    """Get the collection ID from a version ID (e.g., "Shamela0012345")"""
+    return re.findall(r"[A-Za-z]+", version_id)[0]
+
+def collect_folder_metadata(folder, meta, exclude, start_folder, cache=None,
+                            recursive=True, flat_folder=False,
+                            output_files_path=None, remove_from_path=None,
+                            incl_char_length=False, tok_count_engine="compiled",
+                            compact_yml=False, prefetch_depth=0,
+                            exclude_collections=None, cache_yml_formats=False):
+    """Collect the metadata from the URIs, YML files and text file headers
+    in a folder into the `meta` collections (see new_meta_collections).
 
     Args:
-        start_folder (str): path to the parent folder of all folders
-            from which metadata should be collected
+        folder (str): path to the folder from which metadata should be collected
+        meta (dict): the collections into which the metadata is collected
         exclude (list): list of directory names that should be excluded
-            from the metadata collections
-        csv_outpth (str): path to the output csv file
-        yml_outpth (str): path to the output yml file
-        incl_char_length (bool): if True, a column for character length
-            will be included in the metadata
-        split_ar_lat (bool): if True, Arabic and transliterated data on
-            title and author will be put into separate columns
-        remove_from_path (list): remove the folders in this list from the path
+        exclude_collections (list): list of collection IDs (the letters
+            at the start of the version ID, e.g. "Noorlib") whose versions
+            and transcriptions should be excluded
+        start_folder (str): path to the parent folder of all folders
+            from which metadata is collected
+        cache (ExtractionCache): extraction cache (None: no cache is used)
+        recursive (bool): if False, the subfolders of `folder` are skipped
+        cache_yml_formats (bool): if True, the master yml records are also
+            stored in the cache in the format that is not used
+            (see cache_yml_records)
+        (other arguments: see collectMetadata)
     """
-
-    dataYML = []
-    dataCSV = {}  
-    status_dic = {}
-    split_files = dict()
-    start_folder = re.sub(r"\\\\", "/", start_folder)
-    book_rel_d = dict()
-    name_elements_d = dict()
-    all_auth_meta_d = dict()    # will contain all author-level metadata
-    all_book_meta_d = dict()    # will contain all book-level metadata
-    all_vers_meta_d = dict()    # will contain all version-level metadata
-    all_loc_meta_d = dict()     # will contain all location-level metadata
-    all_manuscr_meta_d = dict() # will contain all manuscript-level metadata
-    all_transcr_meta_d = dict() # will contain all transcription-level metadata
+    dataYML = meta["dataYML"]
+    shared_refs = meta["shared_yml_refs"] if compact_yml else None
+    status_dic = meta["status_dic"]
+    split_files = meta["split_files"]
+    book_rels = meta["book_relations"]
+    name_elements_d = meta["name_elements_d"]
+    all_auth_meta_d = meta["all_auth_meta_d"]
+    all_book_meta_d = meta["all_book_meta_d"]
+    all_vers_meta_d = meta["all_vers_meta_d"]
+    all_loc_meta_d = meta["all_loc_meta_d"]
+    all_manuscr_meta_d = meta["all_manuscr_meta_d"]
+    all_transcr_meta_d = meta["all_transcr_meta_d"]
 
     version_yml_regex = r"^\d{4}[A-Za-z]+\.[A-Za-z\d]+\.\w+-[a-z]{3}\d+\.yml$"
     transcr_yml_regex = r"^MS\d{4}[A-Za-z]+\.[A-Za-z\d_]+\.\w+-(?:[a-z]{3}\d+)+\.yml$"
-    for root, dirs, files in os.walk(start_folder):
+    if corpus_inventory is not None:
+        walk = corpus_inventory.walk(folder)
+    else:
+        walk = os.walk(folder)
+
+    # read the yml files and text file headers of the next versions
+    # in background threads while the current version is processed:
+    global prefetcher
+    read_ahead = None
+    if prefetch_depth:
+        prefetcher = Prefetcher(max_files=8*prefetch_depth)
+        read_ahead = ReadAhead(prefetcher, prefetch_depth)
+        walk = prefetch_walk(walk, read_ahead, exclude, recursive, flat_folder,
+                             [version_yml_regex, transcr_yml_regex])
+
+    for root, dirs, files in walk:
         dirs[:] = [d for d in sorted(dirs) if d not in exclude]
+        if not recursive:
+            dirs[:] = []
         
         for fn in files:
+            if read_ahead is not None and (re.search(version_yml_regex, fn)
+                                           or re.search(transcr_yml_regex, fn)):
+                read_ahead.next()
+
             # select only the version yml files:
             if re.search(version_yml_regex, fn):
                 # build the relevant URIs:
-                uri = URI(os.path.join(root, fn))
-                vers_uri = uri.build_uri("version")
-                book_uri = uri.build_uri("book")
-                auth_uri = uri.build_uri("author")
+                uri = parse_uri(os.path.join(root, fn))
+                if exclude_collections and get_coll_id(uri.version) in exclude_collections:
+                    continue
+                vers_uri = uri.version_uri
+                book_uri = uri.book_uri
+                auth_uri = uri.author_uri
 
                 # add the version ID to the version_ids dictionary
                 # to check for duplicate IDs later:
@@ -1717,52 +2292,53 @@ def collectMetadata(start_folder, exclude, csv_outpth, yml_outpth,
                 else:
                     auth_folder = root
                 vers_yml_pth = os.path.join(root, fn)
-                book_yml_pth = os.path.join(root, uri.build_uri(uri_type="book")+".yml")
-                auth_yml_pth = os.path.join(auth_folder, uri.build_uri(uri_type="author")+".yml")
+                book_yml_pth = os.path.join(root, uri.book_yml)
+                auth_yml_pth = os.path.join(auth_folder, uri.author_yml)
 
                 # bring together all yml data related to the current version
-                # and store in the master dataYML variable:
-                vers_yml_d = load_yml(vers_yml_pth)
-                book_yml_d = load_yml(book_yml_pth)
-                auth_yml_d = load_yml(auth_yml_pth)
-
-                record = "{}\n{}\n{}\n{}\n".format(
-                    splitter,
-                    dicToYML(vers_yml_d, reflow=False),
-                    dicToYML(book_yml_d, reflow=False),
-                    dicToYML(auth_yml_d, reflow=False))
-                dataYML.append(record)
+                # and add it to the master yml file (dataYML)
+                # (yml files are loaded only if their data is not in the cache):
+                loaded = dict()
+                records = get_yml_records(cache, [vers_yml_pth, book_yml_pth, auth_yml_pth],
+                                          loaded, shared_refs)
+                with measure("yml_writing"):
+                    dataYML.extend(records)
+                if cache_yml_formats:
+                    cache_yml_records(cache, [vers_yml_pth, book_yml_pth, auth_yml_pth],
+                                      loaded, compact_yml)
 
                 # 1. collect the metadata related to the current version:
 
                 ## A) from the author YML file:
 
-                auth_d, name_elements_d = extract_author_meta(uri, auth_yml_d, all_auth_meta_d,
-                                                              name_elements_d)
+                auth_d, name_elements_d = get_author_meta(cache, uri, auth_yml_pth, loaded,
+                                                          all_auth_meta_d, name_elements_d)
                 if book_uri not in auth_d["books"]:
                     auth_d["books"].append(book_uri)
 
                 ## B) from the book yml file:
 
-                book_d, book_rel_d = extract_book_meta(uri, book_yml_d, tags_dic,
-                                                       all_book_meta_d, book_rel_d)
+                book_d, book_rels = get_book_meta(cache, uri, book_yml_pth, loaded,
+                                                  all_book_meta_d, book_rels)
                 book_d["versions"].append(vers_uri)
 
                 ## C) from the version YML file:
 
-                vers_d, uri, status_dic = extract_version_meta(uri, vers_yml_d, vers_yml_pth,
-                                                               output_files_path, start_folder,
-                                                               status_dic, incl_char_length,
-                                                               remove_from_path=remove_from_path)
+                vers_d, uri, status_dic = get_text_meta(cache, "version", extract_version_meta,
+                                                        uri, vers_yml_pth, loaded,
+                                                        output_files_path, start_folder,
+                                                        status_dic, incl_char_length,
+                                                        remove_from_path=remove_from_path,
+                                                        tok_count_engine=tok_count_engine)
 
                 # 2. collect additional metadata (mostly in Arabic!)
                 #    from the text file headers:
 
                 local_pth = vers_d["local_pth"]
-                if not os.path.exists(local_pth):
+                if not file_exists(local_pth):
                     print("MISSING FILE? {} does not exist".format(local_pth))
                 else:
-                    header_meta = extract_metadata_from_header(local_pth)
+                    header_meta = get_header_meta(cache, local_pth)
 
                     # - author name:
 
@@ -1786,7 +2362,7 @@ def collectMetadata(start_folder, exclude, csv_outpth, yml_outpth,
 
                     # - additional genre tags:
                     
-                    coll_id = re.findall(r"[A-Za-z]+", uri.version)[0]
+                    coll_id = get_coll_id(uri.version)
                     for el in header_meta["Genre"]:
                         for t in el.split(" :: "):
                             if coll_id+"@"+t not in book_d["genre_tags"]:
@@ -1810,10 +2386,12 @@ def collectMetadata(start_folder, exclude, csv_outpth, yml_outpth,
 
             elif re.search(transcr_yml_regex, fn):
                 # build the relevant URIs:
-                uri = URI(os.path.join(root, fn))
-                transcr_uri = uri.build_uri("transcription")
-                manuscr_uri = uri.build_uri("manuscript")
-                loc_uri = uri.build_uri("location")
+                uri = parse_uri(os.path.join(root, fn))
+                if exclude_collections and get_coll_id(uri.transcription) in exclude_collections:
+                    continue
+                transcr_uri = uri.transcription_uri
+                manuscr_uri = uri.manuscript_uri
+                loc_uri = uri.location_uri
 
                 # add the version ID to the version_ids dictionary
                 # to check for duplicate IDs later:
@@ -1828,52 +2406,53 @@ def collectMetadata(start_folder, exclude, csv_outpth, yml_outpth,
                 else:
                     loc_folder = root
                 transcr_yml_pth = os.path.join(root, fn)
-                manuscr_yml_pth = os.path.join(root, uri.build_uri(uri_type="manuscript")+".yml")
-                loc_yml_pth = os.path.join(loc_folder, uri.build_uri(uri_type="location")+".yml")
+                manuscr_yml_pth = os.path.join(root, uri.manuscript_yml)
+                loc_yml_pth = os.path.join(loc_folder, uri.location_yml)
 
                 # bring together all yml data related to the current version
-                # and store in the master dataYML variable:
-                transcr_yml_d = load_yml(transcr_yml_pth)
-                manuscr_yml_d = load_yml(manuscr_yml_pth)
-                loc_yml_d = load_yml(loc_yml_pth)
-
-                record = "{}\n{}\n{}\n{}\n".format(splitter,
-                                                   dicToYML(transcr_yml_d, reflow=False),
-                                                   dicToYML(manuscr_yml_d, reflow=False),
-                                                   dicToYML(loc_yml_d, reflow=False)
-                                                   )
-                dataYML.append(record)
+                # and add it to the master yml file (dataYML)
+                # (yml files are loaded only if their data is not in the cache):
+                loaded = dict()
+                records = get_yml_records(cache, [transcr_yml_pth, manuscr_yml_pth, loc_yml_pth],
+                                          loaded, shared_refs)
+                with measure("yml_writing"):
+                    dataYML.extend(records)
+                if cache_yml_formats:
+                    cache_yml_records(cache, [transcr_yml_pth, manuscr_yml_pth, loc_yml_pth],
+                                      loaded, compact_yml)
 
                 # 1. collect the metadata related to the current version:
 
                 ## A) from the location YML file:
 
-                loc_d = extract_location_meta(uri, loc_yml_d, all_loc_meta_d)
+                loc_d = get_location_meta(cache, uri, loc_yml_pth, loaded, all_loc_meta_d)
                 
                 if manuscr_uri not in loc_d["manuscripts"]:
                     loc_d["manuscripts"].append(manuscr_uri)
 
                 ## B) from the manuscript yml file:
 
-                manuscr_d = extract_manuscr_meta(uri, manuscr_yml_d, tags_dic,
-                                                 all_manuscr_meta_d)
+                manuscr_d = get_manuscr_meta(cache, uri, manuscr_yml_pth, loaded,
+                                             all_manuscr_meta_d)
                 manuscr_d["transcriptions"].append(transcr_uri)
 
                 ## C) from the transcription YML file:
 
-                transcr_d, uri, status_dic = extract_transcr_meta(
-                    uri, transcr_yml_d, transcr_yml_pth, output_files_path, 
+                transcr_d, uri, status_dic = get_text_meta(
+                    cache, "transcription", extract_transcr_meta,
+                    uri, transcr_yml_pth, loaded, output_files_path,
                     start_folder, status_dic, incl_char_length,
-                    remove_from_path=remove_from_path)
+                    remove_from_path=remove_from_path,
+                    tok_count_engine=tok_count_engine)
 
                 # 2. collect additional metadata (mostly in Arabic!)
                 #    from the text file headers:
 
                 local_pth = transcr_d["local_pth"]
-                if not os.path.exists(local_pth):
+                if not file_exists(local_pth):
                     print("MISSING FILE? {} does not exist".format(local_pth))
                 else:
-                    header_meta = extract_metadata_from_header(local_pth)
+                    header_meta = get_header_meta(cache, local_pth)
 
                     # - author name:
 
@@ -1893,7 +2472,7 @@ def collectMetadata(start_folder, exclude, csv_outpth, yml_outpth,
 
                     # - additional genre tags:
                     
-                    coll_id = re.findall("[A-Za-z]+", uri.transcription)[0]
+                    coll_id = get_coll_id(uri.transcription)
                     for el in header_meta["Genre"]:
                         for t in el.split(" :: "):
                             if coll_id+"@"+t not in manuscr_d["genre_tags"]:
@@ -1905,6 +2484,502 @@ def collectMetadata(start_folder, exclude, csv_outpth, yml_outpth,
                 all_manuscr_meta_d[manuscr_uri] = manuscr_d
                 all_transcr_meta_d[transcr_uri] = transcr_d
 
+    if prefetcher is not None:
+        if VERBOSE:
+            prefetcher.print_stats()
+        prefetcher.close()
+        prefetcher = None
+
+def get_prefetch_files(root, fn, flat_folder, shared=None, header_bytes=65536):
+    """List the files that are read for a version (or transcription) yml file:
+    the version, book and author yml files (or the transcription,
+    manuscript and location yml files) and the start of the text file.
+
+    The book and author yml files (or manuscript and location yml files)
+    are shared by all versions of a book/author, but are only read once
+    if the yml cache is used: they are left out if they are already
+    in the yml cache or in the `shared` set (to which they are added).
+
+    Args:
+        root (str): path to the folder that contains the yml file
+        fn (str): filename of the version (or transcription) yml file
+        flat_folder (bool): if True, all files are in the same folder
+        shared (set): paths of the shared yml files that were already
+            listed for an earlier version (None: list them for every version)
+        header_bytes (int): number of bytes of the text file to be read
+
+    Returns:
+        list of (path, n_bytes) tuples (see Prefetcher.schedule)
+    """
+    try:
+        uri = parse_uri(os.path.join(root, fn))
+    except Exception:
+        return []
+    if fn.startswith("MS"):
+        uri_types = ["manuscript", "location"]
+    else:
+        uri_types = ["book", "author"]
+    if not flat_folder:
+        parent_folder = os.path.dirname(root)
+    else:
+        parent_folder = root
+    yml_pth = os.path.join(root, fn)
+    files = [(yml_pth, None)]
+    for shared_pth in [os.path.join(root, uri.build_uri(uri_type=uri_types[0])+".yml"),
+                       os.path.join(parent_folder, uri.build_uri(uri_type=uri_types[1])+".yml")]:
+        if shared is not None:
+            if shared_pth in shared or yml_cache.get_entry(shared_pth)[1]:
+                continue
+            shared.add(shared_pth)
+        files.append((shared_pth, None))
+    # the text file that will be used for the version (see extract_version_meta):
+    local_pth = re.sub(r"\\", "/", yml_pth[:-4])
+    for ext in [".mARkdown", ".completed", ".inProgress", ""]:
+        if file_exists(local_pth+ext):
+            files.append((local_pth+ext, header_bytes))
+            break
+    return files
+
+def prefetch_walk(walk, read_ahead, exclude, recursive, flat_folder, yml_regexes):
+    """Walk through the corpus folders (like os.walk), and add the files
+    of all version and transcription yml files in every folder
+    to the read ahead queue (see get_prefetch_files).
+
+    A folder is only passed on when the files of at least `depth`
+    versions in the next folders were added to the queue,
+    so the subfolders that should not be visited are already removed
+    from the `dirs` list here (instead of in the loop that uses the walk).
+    """
+    # if the yml cache is used, the shared (book, author, ...) yml files
+    # are only read for the first version that uses them:
+    shared = set() if yml_cache is not None else None
+    buffered = collections.deque()  # (root, dirs, files, number of versions)
+    n_buffered = 0
+    for root, dirs, files in walk:
+        dirs[:] = [d for d in sorted(dirs) if d not in exclude]
+        if not recursive:
+            dirs[:] = []
+        n = 0
+        for fn in files:
+            if any(re.search(regex, fn) for regex in yml_regexes):
+                read_ahead.add(get_prefetch_files(root, fn, flat_folder, shared))
+                n += 1
+        buffered.append((root, dirs, files, n))
+        n_buffered += n
+        while n_buffered - buffered[0][3] >= read_ahead.depth:
+            root, dirs, files, n = buffered.popleft()
+            n_buffered -= n
+            yield root, dirs, files
+    while buffered:
+        root, dirs, files, n = buffered.popleft()
+        yield root, dirs, files
+
+
+def list_corpus_shards(start_folder, exclude):
+    """Divide the corpus into shards that can be processed in parallel:
+    the start folder itself (without its subfolders) and each of its
+    subfolders (the 25-years repos, or the author folders of a release),
+    in the order in which os.walk would visit them.
+
+    Returns:
+        list of (folder, recursive) tuples
+    """
+    shards = [(start_folder, False)]
+    if corpus_inventory is not None:
+        dirs = corpus_inventory.folders[start_folder][0]
+    else:
+        dirs = [d for d in sorted(os.listdir(start_folder))
+                if os.path.isdir(os.path.join(start_folder, d))
+                and not os.path.islink(os.path.join(start_folder, d))]
+    for d in dirs:
+        if d not in exclude:
+            shards.append((os.path.join(start_folder, d), True))
+    return shards
+
+def init_shard_worker(cache_fp, data_in_25_year_repos, inventory, header_index_fp,
+                      report, conversion_cache_fp, use_cache):
+    """Prepare a worker process for the parallel metadata collection"""
+    global shard_cache, corpus_inventory, yml_cache, header_index, run_report
+    global conversion_cache
+    corpus_inventory = inventory
+    if report:
+        run_report = RunReport()
+    yml_cache = make_yml_cache()
+    conversion_cache = ConversionCache(conversion_cache_fp)
+    if header_index_fp:
+        header_index = make_header_index(header_index_fp)
+    if data_in_25_year_repos is not None:
+        URI.data_in_25_year_repos = data_in_25_year_repos
+    if use_cache:
+        shard_cache = make_extraction_cache(cache_fp)
+
+def collect_shard_metadata(args):
+    """Collect the metadata of one shard of the corpus (in a worker process).
+
+    Args:
+        args (tuple): folder, recursive, kwargs for collect_folder_metadata
+
+    Returns:
+        tuple (meta, shard_globals, cached):
+            meta: collections with the metadata of the shard
+            shard_globals: the shard's data in the global dictionaries
+                all_header_meta, version_ids and geo_URIs
+                (and the shard's yml cache stats, conversion cache entries,
+                header index entries and run report measurements)
+            cached: cache entries and stats of the shard (None if no cache)
+    """
+    folder, recursive, kwargs = args
+    # the global dictionaries should only contain the data of this shard:
+    all_header_meta.clear()
+    version_ids.clear()
+    geo_URIs.clear()
+    if shard_cache is not None:
+        shard_cache.reset_usage()
+    if header_index is not None:
+        header_index.reset_usage()
+    if run_report is not None:
+        run_report.reset()
+    yml_cache.reset_stats()
+    conversion_cache.reset_usage()
+
+    meta = new_meta_collections()
+    collect_folder_metadata(folder, meta, cache=shard_cache,
+                            recursive=recursive, **kwargs)
+
+    shard_globals = {"all_header_meta": dict(all_header_meta),
+                     "version_ids": dict(version_ids),
+                     "geo_URIs": dict(geo_URIs),
+                     "yml_cache_stats": yml_cache.stats,
+                     "conversion_cache": conversion_cache.export_used()}
+    if header_index is not None:
+        shard_globals["header_index"] = header_index.export_used()
+    if run_report is not None:
+        shard_globals["run_report"] = run_report.export()
+    if shard_cache is not None:
+        cached = shard_cache.export_used()
+    else:
+        cached = None
+    return meta, shard_globals, cached
+
+def merge_shard_metadata(meta, shard_meta, shard_globals):
+    """Add the metadata of a shard to the metadata of the corpus.
+
+    Shards must be merged in the order of list_corpus_shards,
+    so that the result is identical to that of a single os.walk
+    over the whole corpus."""
+    meta["dataYML"].extend(shard_meta["dataYML"])
+    for k in ["status_dic", "split_files"]:
+        for key, lst in shard_meta[k].items():
+            if key not in meta[k]:
+                meta[k][key] = []
+            meta[k][key] += lst
+    meta["book_relations"].merge(shard_meta["book_relations"])
+    meta["name_elements_d"].update(shard_meta["name_elements_d"])
+
+    # an author/book/... is normally found in only one shard;
+    # if not, add the data that would have been added to its aggregating lists:
+    aggregated = {"all_auth_meta_d": ["books"],
+                  "all_book_meta_d": ["versions", "genre_tags"],
+                  "all_vers_meta_d": [],
+                  "all_loc_meta_d": ["manuscripts"],
+                  "all_manuscr_meta_d": ["transcriptions", "genre_tags"],
+                  "all_transcr_meta_d": []}
+    for k, list_keys in aggregated.items():
+        for uri, d in shard_meta[k].items():
+            if uri not in meta[k]:
+                meta[k][uri] = d
+                continue
+            for list_key in list_keys:
+                for el in d[list_key]:
+                    if el not in meta[k][uri][list_key]:
+                        meta[k][uri][list_key].append(el)
+
+    # add the shard's data to the global dictionaries:
+    all_header_meta.update(shard_globals["all_header_meta"])
+    for id_, fns in shard_globals["version_ids"].items():
+        if id_ not in version_ids:
+            version_ids[id_] = []
+        version_ids[id_] += fns
+    for p, fns in shard_globals["geo_URIs"].items():
+        if p not in geo_URIs:
+            geo_URIs[p] = set()
+        geo_URIs[p].update(fns)
+    yml_cache.add_stats(shard_globals["yml_cache_stats"])
+    if conversion_cache is not None and "conversion_cache" in shard_globals:
+        conversion_cache.merge(*shard_globals["conversion_cache"])
+    if header_index is not None and "header_index" in shard_globals:
+        header_index.merge(*shard_globals["header_index"])
+    if run_report is not None and "run_report" in shard_globals:
+        run_report.merge(shard_globals["run_report"])
+
+def collect_metadata_parallel(meta, n_processes, cache, cache_fp,
+                              header_index_fp=None, conversion_cache_fp=None,
+                              **kwargs):
+    """Collect the metadata of the corpus in a pool of worker processes,
+    one shard (see list_corpus_shards) at a time.
+
+    Args:
+        meta (dict): the collections into which the metadata is collected
+        n_processes (int): number of worker processes
+        cache (ExtractionCache): the extraction cache of the main process,
+            into which the workers' cache entries are merged (or None)
+        cache_fp (str): path to the extraction cache file
+            (or None, if the cache is only kept in memory)
+        header_index_fp (str): path to the header index file (or None)
+        conversion_cache_fp (str): path to the conversion cache file (or None)
+        kwargs: arguments for collect_folder_metadata
+    """
+    shards = list_corpus_shards(kwargs["start_folder"], kwargs["exclude"])
+    print("Collecting metadata from {} shards in {} processes".format(len(shards), n_processes))
+    args = [(folder, recursive, kwargs) for folder, recursive in shards]
+    initargs = (cache_fp, getattr(URI, "data_in_25_year_repos", None),
+                corpus_inventory, header_index_fp, run_report is not None,
+                conversion_cache_fp, cache is not None)
+    with multiprocessing.Pool(n_processes, initializer=init_shard_worker,
+                              initargs=initargs) as pool:
+        # imap returns the results in the order of the shards:
+        for shard_meta, shard_globals, cached in pool.imap(collect_shard_metadata, args):
+            merge_shard_metadata(meta, shard_meta, shard_globals)
+            if cache is not None and cached is not None:
+                cache.merge(*cached)
+
+def prepare_collection(start_folder, exclude, inventory=None,
+                       header_index_fp=None, conversion_cache_fp=None):
+    """Set up the global inventory, caches and index used
+    while the metadata is collected (see collectMetadata)"""
+    # scan the corpus folder only once:
+    global corpus_inventory, yml_cache
+    if inventory is None:
+        with measure("walk"):
+            inventory = CorpusInventory(start_folder, exclude=exclude)
+    corpus_inventory = inventory
+
+    # parse every yml file only once:
+    yml_cache = make_yml_cache()
+
+    # read the text file headers and bodies from the stored header end positions:
+    global header_index
+    if header_index_fp:
+        header_index = make_header_index(header_index_fp)
+    else:
+        header_index = None
+
+    # convert every name and title into Arabic script only once:
+    global conversion_cache
+    conversion_cache = ConversionCache(conversion_cache_fp)
+
+def save_collection_caches(cache):
+    """Save the extraction cache (if not None), header index and
+    conversion cache after the metadata was collected, and print their stats"""
+    if cache is not None:
+        cache.save()
+        cache.print_stats()
+    if header_index is not None:
+        header_index.save()
+        header_index.print_stats()
+    conversion_cache.save()
+    conversion_cache.print_stats()
+    yml_cache.print_stats()
+
+def scan_corpus(start_folder, exclude, flat_folder=False, cache_fp=None,
+                n_processes=1, incl_char_length=False,
+                tok_count_engine="compiled", header_index_fp=None,
+                prefetch_depth=0, conversion_cache_fp=None, compact_yml=[False],
+                inventory=None):
+    """Extract the metadata from all yml files and text file headers
+    in the corpus once, into an extraction cache from which collectMetadata
+    can build the outputs of several profiles (see utility/profiles.py)
+    without extracting anything again.
+
+    The master yml records are cached in the formats of all profiles
+    before the script changes any yml file (e.g., to add missing
+    token counts), and the cache is frozen after the scan:
+    every profile is built from the state of the corpus
+    at the start of the run, as in a run with a single profile.
+
+    NB: the genre tags of a book depend on the ID of its first version;
+        the book metadata is extracted again for the books whose first
+        version is excluded from a profile (e.g., by exclude_collections).
+
+    Args:
+        exclude (list): the folders excluded by all profiles
+        compact_yml (list): the compact_yml values of all profiles
+            (the master yml records are cached in each of these formats)
+        inventory (CorpusInventory): index of all files in the corpus
+            (if None, the corpus folder is scanned)
+        (other arguments: see collectMetadata; if cache_fp is None,
+        the extraction cache is only kept in memory)
+
+    Returns:
+        tuple (inventory, cache): the CorpusInventory and ExtractionCache
+            to be passed to collectMetadata for every profile
+    """
+    start_folder = re.sub(r"\\\\", "/", start_folder)
+    prepare_collection(start_folder, exclude, inventory, header_index_fp,
+                       conversion_cache_fp)
+    cache = make_extraction_cache(cache_fp)
+
+    # the collected metadata itself is discarded
+    # (every profile collects it again from the cache):
+    kwargs = {"exclude": exclude, "start_folder": start_folder,
+              "flat_folder": flat_folder, "incl_char_length": incl_char_length,
+              "tok_count_engine": tok_count_engine,
+              "prefetch_depth": prefetch_depth,
+              "compact_yml": compact_yml[0],
+              "cache_yml_formats": len(set(compact_yml)) > 1}
+    meta = new_meta_collections()
+    if n_processes > 1:
+        collect_metadata_parallel(meta, n_processes, cache, cache_fp,
+                                  header_index_fp=header_index_fp,
+                                  conversion_cache_fp=conversion_cache_fp,
+                                  **kwargs)
+    else:
+        collect_folder_metadata(start_folder, meta, cache=cache, **kwargs)
+    save_collection_caches(cache)
+    cache.freeze()
+
+    return corpus_inventory, cache
+
+def collectMetadata(start_folder, exclude, csv_outpth, yml_outpth,
+                    book_rel_outpth, name_el_outpth,
+                    incl_char_length=False, split_ar_lat=False,
+                    flat_folder=False, output_files_path=None,
+                    remove_from_path=None, cache_fp=None, n_processes=1,
+                    inventory=None, tok_count_engine="compiled",
+                    header_index_fp=None, json_format=None, compact_yml=False,
+                    prefetch_depth=0, book_rel_edges_outpth=None,
+                    conversion_cache_fp=None, exclude_collections=None,
+                    cache=None):
+    """Collect the metadata from URIs, YML files and text file headers
+    and save the metadata in csv and yml files.
+
+    Args:
+        start_folder (str): path to the parent folder of all folders
+            from which metadata should be collected
+        exclude (list): list of directory names that should be excluded
+            from the metadata collections
+        csv_outpth (str): path to the output csv file
+        yml_outpth (str): path to the output yml file
+        incl_char_length (bool): if True, a column for character length
+            will be included in the metadata
+        split_ar_lat (bool): if True, Arabic and transliterated data on
+            title and author will be put into separate columns
+        remove_from_path (list): remove the folders in this list from the path
+        cache_fp (str): path to the extraction cache file. If None,
+            no cache will be used and all metadata will be extracted
+            from the yml files and text file headers.
+        n_processes (int): number of processes used to collect
+            the metadata. If larger than 1, the corpus is divided into
+            shards (see list_corpus_shards) that are processed in parallel;
+            the output is identical to that of a single process.
+            NB: worker processes cannot ask the user to fix broken yml files;
+            use the yml check (perform_yml_check) before a parallel run.
+        inventory (CorpusInventory): index of all files in the corpus.
+            If None, the corpus folder will be scanned once
+            at the start of the function; all checks of which files
+            exist are then answered from this index.
+        tok_count_engine (str): name of the function used to count
+            the tokens in text files whose yml file has no (valid) length:
+            "compiled" (default) or "regex" (see tok_count_engines)
+        header_index_fp (str): path to the header index file, in which
+            the position of the header end in every text file is stored
+            (see utility/header_index.py). If None, the header end
+            is searched for in every text file that is read.
+        json_format (str): format of all json output files (including
+            split_files.json): "json", "jsonl" (JSON Lines)
+            or "jsonl.gz" (gzipped JSON Lines); if None, the format
+            is not changed (see save_json_dict and save_json_records)
+        compact_yml (bool): if True, the yml data of every book, author,
+            manuscript and location is written only once in the master
+            yml file, and the version and transcription records refer to it
+            (see utility/master_yml.py; use expand_master_yml to reconstruct
+            the normal format)
+        prefetch_depth (int): number of versions whose yml files and
+            text file headers are read ahead in background threads
+            (see utility/prefetch.py); 0: the files are read
+            only when they are needed
+        book_rel_edges_outpth (str): path to the edge list tsv file
+            of the book relations (see utility/book_relations.py);
+            if None, only the json file (book_rel_outpth) is written
+        conversion_cache_fp (str): path to the file in which the names
+            and titles converted into Arabic script are stored for the next
+            run (see ConversionCache in utility/betaCode.py); if None,
+            the converted strings are only kept during this run
+        exclude_collections (list): list of collection IDs
+            (e.g., "Noorlib") whose texts should be excluded
+            from the metadata collections
+        cache (ExtractionCache): an extraction cache that already contains
+            the metadata of the corpus (see scan_corpus); if None,
+            the cache is loaded from cache_fp. A cache passed
+            to this function is not saved, and the global dictionaries
+            (all_header_meta, version_ids, geo_URIs) are emptied
+            before they are filled again from the cache.
+
+    Returns:
+        dict (key: name of the metadata dictionary, e.g. "all_vers_meta_d";
+              value: the metadata dictionary)
+    """
+
+    start_folder = re.sub(r"\\\\", "/", start_folder)
+
+    global json_output_format
+    if json_format:
+        json_output_format = json_format
+
+    prepare_collection(start_folder, exclude, inventory, header_index_fp,
+                       conversion_cache_fp)
+
+    # re-use metadata extracted in previous runs from files that did not change:
+    save_cache = cache is None
+    if cache is None and cache_fp:
+        cache = make_extraction_cache(cache_fp)
+    elif cache is not None:
+        # the global dictionaries are filled again from the cache:
+        cache.reset_usage()
+        all_header_meta.clear()
+        version_ids.clear()
+        geo_URIs.clear()
+
+    # collect the metadata from all yml files and text files in the corpus
+    # (the combined yml data is written to the master yml file immediately):
+    meta = new_meta_collections()
+    kwargs = {"exclude": exclude, "start_folder": start_folder,
+              "flat_folder": flat_folder, "output_files_path": output_files_path,
+              "remove_from_path": remove_from_path,
+              "incl_char_length": incl_char_length,
+              "tok_count_engine": tok_count_engine,
+              "compact_yml": compact_yml,
+              "prefetch_depth": prefetch_depth,
+              "exclude_collections": exclude_collections}
+    if compact_yml:
+        yml_writer = CompactYmlWriter(yml_outpth, sep="\n")
+    else:
+        yml_writer = JoinedWriter(yml_outpth, sep="\n")
+    with yml_writer:
+        meta["dataYML"] = yml_writer
+        if n_processes > 1:
+            collect_metadata_parallel(meta, n_processes, cache, cache_fp,
+                                      header_index_fp=header_index_fp,
+                                      conversion_cache_fp=conversion_cache_fp,
+                                      **kwargs)
+        else:
+            collect_folder_metadata(start_folder, meta, cache=cache, **kwargs)
+
+    status_dic = meta["status_dic"]
+    split_files = meta["split_files"]
+    book_rels = meta["book_relations"]
+    name_elements_d = meta["name_elements_d"]
+    all_auth_meta_d = meta["all_auth_meta_d"]
+    all_book_meta_d = meta["all_book_meta_d"]
+    all_vers_meta_d = meta["all_vers_meta_d"]
+    all_loc_meta_d = meta["all_loc_meta_d"]
+    all_manuscr_meta_d = meta["all_manuscr_meta_d"]
+    all_transcr_meta_d = meta["all_transcr_meta_d"]
+
+    save_collection_caches(cache if save_cache else None)
+    if cache is not None and not save_cache:
+        cache.print_stats()
+
     # define which text file(s) get primary status:
     for book_or_manuscr_uri, versions in status_dic.items():
         versions = sorted(versions, reverse=True)
@@ -1928,29 +3003,28 @@ def collectMetadata(start_folder, exclude, csv_outpth, yml_outpth,
     # Write a json file containing all texts that have been split
     # into parts because they were too big (URIs with VolsA, VolsB, ...):
     split_files_fp = re.sub(r"metadata_light.csv", "split_files.json", csv_outpth)
-    with open(split_files_fp, mode='w', encoding='utf-8') as outfile:
-        json.dump(split_files, outfile, indent=4)  
+    with measure("json_writing"):
+        save_json_dict(split_files, split_files_fp, indent=4, sort_keys=False)
 
     # add compound data for text files split because of their size:
     all_vers_meta_d = add_split_files_meta(split_files, all_vers_meta_d, incl_char_length)
 
     # save metadata to tsv:
-    save_as_tsv(all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
-                all_transcr_meta_d, all_manuscr_meta_d, all_loc_meta_d,
-                csv_outpth, split_ar_lat=split_ar_lat,
-                incl_char_length=incl_char_length)
-
-    # save the combined yml data in a master yml file: 
-    with open(yml_outpth, "w", encoding="utf8") as outfile:
-        outfile.write("\n".join(dataYML))
-
-    # save the name elements to a json file:
-    with open(name_el_outpth, mode="w", encoding="utf-8") as outfile:
-        json.dump(name_elements_d, outfile, indent=2, ensure_ascii=False, sort_keys=True)
-
-    # save the book relations:
-    with open(book_rel_outpth, "w", encoding="utf-8") as outfile:
-        json.dump(book_rel_d, outfile, indent=2, ensure_ascii=False, sort_keys=True)
+    with measure("tsv_writing"):
+        save_as_tsv(all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
+                    all_transcr_meta_d, all_manuscr_meta_d, all_loc_meta_d,
+                    csv_outpth, split_ar_lat=split_ar_lat,
+                    incl_char_length=incl_char_length)
+
+    with measure("json_writing"):
+        # save the name elements to a json file:
+        save_json_dict(name_elements_d, name_el_outpth)
+
+        # save the book relations:
+        book_rel_d = book_rels.to_dict()
+        save_json_dict(book_rel_d, book_rel_outpth)
+        if book_rel_edges_outpth:
+            book_rels.save_edge_list(book_rel_edges_outpth)
 
     # store the book relations in the all_book_meta_d:
     for book_uri in book_rel_d:
@@ -1967,31 +3041,37 @@ def collectMetadata(start_folder, exclude, csv_outpth, yml_outpth,
                                all_transcr_meta_d, all_manuscr_meta_d, all_loc_meta_d)
     [all_vers_meta_d, all_book_meta_d, all_auth_meta_d, all_transcr_meta_d, all_manuscr_meta_d, all_loc_meta_d] = r
 
-    # store all version, book and author metadata in json files:
-    book_fp = re.sub(r"metadata_light.csv", "all_book_meta.json", csv_outpth)
-    with open(book_fp, mode="w", encoding="utf-8") as outfile:
-        json.dump(all_book_meta_d, outfile, indent=2, ensure_ascii=False, sort_keys=True)
+    with measure("json_writing"):
+        # store all version, book and author metadata in json files:
+        book_fp = re.sub(r"metadata_light.csv", "all_book_meta.json", csv_outpth)
+        save_json_dict(all_book_meta_d, book_fp)
 
-    auth_fp = re.sub(r"metadata_light.csv", "all_author_meta.json", csv_outpth)
-    with open(auth_fp, mode="w", encoding="utf-8") as outfile:
-        json.dump(all_auth_meta_d, outfile, indent=2, ensure_ascii=False, sort_keys=True)
+        auth_fp = re.sub(r"metadata_light.csv", "all_author_meta.json", csv_outpth)
+        save_json_dict(all_auth_meta_d, auth_fp)
 
-    vers_fp = re.sub(r"metadata_light.csv", "all_version_meta.json", csv_outpth)
-    with open(vers_fp, mode="w", encoding="utf-8") as outfile:
-        json.dump(all_vers_meta_d, outfile, indent=2, ensure_ascii=False, sort_keys=True)
+        vers_fp = re.sub(r"metadata_light.csv", "all_version_meta.json", csv_outpth)
+        save_json_dict(all_vers_meta_d, vers_fp)
 
-    # store all transcription, manuscript and location metadata in json files:
-    manuscr_fp = re.sub(r"metadata_light.csv", "all_manuscript_meta.json", csv_outpth)
-    with open(manuscr_fp, mode="w", encoding="utf-8") as outfile:
-        json.dump(all_manuscr_meta_d, outfile, indent=2, ensure_ascii=False, sort_keys=True)
+        # store all transcription, manuscript and location metadata in json files:
+        manuscr_fp = re.sub(r"metadata_light.csv", "all_manuscript_meta.json", csv_outpth)
+        save_json_dict(all_manuscr_meta_d, manuscr_fp)
 
-    loc_fp = re.sub(r"metadata_light.csv", "all_location_meta.json", csv_outpth)
-    with open(loc_fp, mode="w", encoding="utf-8") as outfile:
-        json.dump(all_loc_meta_d, outfile, indent=2, ensure_ascii=False, sort_keys=True)
+        loc_fp = re.sub(r"metadata_light.csv", "all_location_meta.json", csv_outpth)
+        save_json_dict(all_loc_meta_d, loc_fp)
 
-    transcr_fp = re.sub(r"metadata_light.csv", "all_transcription_meta.json", csv_outpth)
-    with open(transcr_fp, mode="w", encoding="utf-8") as outfile:
-        json.dump(all_transcr_meta_d, outfile, indent=2, ensure_ascii=False, sort_keys=True)
+        transcr_fp = re.sub(r"metadata_light.csv", "all_transcription_meta.json", csv_outpth)
+        save_json_dict(all_transcr_meta_d, transcr_fp)
+
+    # return the metadata so that it can be used by createJsonFileFromMeta:
+    return {"all_vers_meta_d": all_vers_meta_d,
+            "all_book_meta_d": all_book_meta_d,
+            "all_auth_meta_d": all_auth_meta_d,
+            "all_transcr_meta_d": all_transcr_meta_d,
+            "all_manuscr_meta_d": all_manuscr_meta_d,
+            "all_loc_meta_d": all_loc_meta_d,
+            "book_rel_d": book_rel_d,
+            "book_relations": book_rels,
+            "name_elements_d": name_elements_d}
 
 
 def add_split_files_meta(split_files, all_vers_meta_d, incl_char_length):
@@ -2018,67 +3098,122 @@ def add_split_files_meta(split_files, all_vers_meta_d, incl_char_length):
         vers_d["versionUri"] = file
         vers_d["id"] = vers_d["id"][:-1] # drop the letter
         vers_d["status"] = "sec"  # give the compound text secondary status so that it is not selected for passim etc.
-        vers_d["tok_length"] = file_length
+        vers_d["tok_length"] = str(file_length)
         vers_d["fullTextURL"] = re.sub(r"[A-Z](-[a-z]{3}\d)", r"\1", vers_d["fullTextURL"])
         if incl_char_length:
-            vers_d["char_length"] = file_clength
+            vers_d["char_length"] = str(file_clength)
         all_vers_meta_d[file] = vers_d
 
     return all_vers_meta_d
 
-def save_as_tsv(all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
-                all_transcr_meta_d, all_manuscr_meta_d, all_loc_meta_d,
-                csv_outpth, split_ar_lat, incl_char_length, sep="\t"):
+def make_tsv_header(split_ar_lat, incl_char_length, sep="\t"):
+    """Create the header row of the tsv file"""
+    return sep.join(make_tsv_columns(split_ar_lat, incl_char_length))
 
-    # define the tsv file header:
+def make_tsv_columns(split_ar_lat, incl_char_length):
+    """Create the list of the column names of the tsv file"""
     if not split_ar_lat:
-        author = "author"
-        title = "title"
+        author = ["author"]
+        title = ["title"]
         author_shuhra = "author_shuhra"
         author_full_name = "author_full_name"
-        city = "city"
-        institution = "institution"
+        city = ["city"]
+        institution = ["institution"]
     else:
-        author = "author_ar" + sep + "author_lat"
-        title = "title_ar" + sep + "title_lat"
+        author = ["author_ar", "author_lat"]
+        title = ["title_ar", "title_lat"]
         author_shuhra = "author_lat_shuhra"
         author_full_name = "author_lat_full_name"
-        city = "city_ar" + sep + "city_lat"
-        institution = "institution_ar" + sep +"institution_lat"
+        city = ["city_ar", "city_lat"]
+        institution = ["institution_ar", "institution_lat"]
     if incl_char_length:
-        length = "tok_length" + sep + "char_length"
+        length = ["tok_length", "char_length"]
     else:
-        length = "tok_length"
-    header = ["versionUri", "language", "subcorpus", "uncorrected_OCR", "date", author, "book",
-              title, "ed_info", "id", "status",
-              length, "url",
+        length = ["tok_length"]
+    header = ["versionUri", "language", "subcorpus", "uncorrected_OCR", "date", *author, "book",
+              *title, "ed_info", "id", "status",
+              *length, "url",
               "tags", "author_from_uri", author_shuhra, author_full_name,
-              city, institution, "shelfmark", "catalog_ref", "parts"]
+              *city, *institution, "shelfmark", "catalog_ref", "parts"]
     
-    header = sep.join(header)
+    return header
+
+def generate_tsv_rows(all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
+                      all_transcr_meta_d, all_manuscr_meta_d, all_loc_meta_d,
+                      split_ar_lat, incl_char_length, sep="\t"):
+    """Create the tsv rows for all versions and transcriptions, one at a time
+    (first the versions, then the transcriptions, both sorted by URI).
+
+    Yields:
+        tuple (uri, row)
+    """
+    for uri, cells in generate_tsv_cells(all_vers_meta_d, all_book_meta_d,
+                                         all_auth_meta_d, all_transcr_meta_d,
+                                         all_manuscr_meta_d, all_loc_meta_d,
+                                         split_ar_lat, incl_char_length):
+        yield uri, sep.join(cells)
+
+def generate_tsv_cells(all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
+                       all_transcr_meta_d, all_manuscr_meta_d, all_loc_meta_d,
+                       split_ar_lat, incl_char_length):
+    """Create the cells of the tsv rows for all versions and transcriptions,
+    in the same order as generate_tsv_rows. The cells are not joined,
+    so that values that contain the separator stay in their own column.
+
+    Yields:
+        tuple (uri, list of cells; one for every column in make_tsv_columns)
+    """
+    for vers_uri in sorted(all_vers_meta_d.keys()):
+        cells = create_tsv_cells(vers_uri, all_vers_meta_d,
+                                 all_book_meta_d, all_auth_meta_d,
+                                 split_ar_lat=split_ar_lat,
+                                 incl_char_length=incl_char_length)
+        yield vers_uri, cells
+    for transcr_uri in sorted(all_transcr_meta_d.keys()):
+        cells = create_transcr_tsv_cells(transcr_uri, all_transcr_meta_d,
+                                 all_manuscr_meta_d, all_loc_meta_d,
+                                 split_ar_lat=split_ar_lat,
+                                 incl_char_length=incl_char_length)
+        yield transcr_uri, cells
+
+def save_as_tsv(all_vers_meta_d, all_book_meta_d, all_auth_meta_d,
+                all_transcr_meta_d, all_manuscr_meta_d, all_loc_meta_d,
+                csv_outpth, split_ar_lat, incl_char_length, sep="\t"):
 
-    tsv = [header, ]
+    # define the tsv file header:
+    header = make_tsv_header(split_ar_lat, incl_char_length, sep=sep)
 
     print("="*80)
     print("COLLECTING INTO A CSV FILE ({} LINES)...".format(len(all_vers_meta_d)))
     print("="*80)
 
-    for vers_uri in sorted(all_vers_meta_d.keys()):
-        row = create_tsv_row(vers_uri, all_vers_meta_d,
-                             all_book_meta_d, all_auth_meta_d,
-                             split_ar_lat=split_ar_lat,
-                             incl_char_length=incl_char_length)
-        tsv.append(row)
-    for transcr_uri in sorted(all_transcr_meta_d.keys()):
-        row = create_transcr_tsv_row(transcr_uri, all_transcr_meta_d,
-                             all_manuscr_meta_d, all_loc_meta_d,
-                             split_ar_lat=split_ar_lat,
-                             incl_char_length=incl_char_length)
-        tsv.append(row)
+    # write every row to the csv file as soon as it is created:
+    with JoinedWriter(csv_outpth, sep="\n") as tsv:
+        tsv.append(header)
+        for uri, row in generate_tsv_rows(all_vers_meta_d, all_book_meta_d,
+                                          all_auth_meta_d, all_transcr_meta_d,
+                                          all_manuscr_meta_d, all_loc_meta_d,
+                                          split_ar_lat, incl_char_length):
+            tsv.append(row)
 
-    # save csv file:
-    with open(csv_outpth, "w", encoding="utf8") as outfile:
-        outfile.write("\n".join(tsv))
+
+def save_columnar_meta(meta, columnar_fp, split_ar_lat, incl_char_length):
+    """Save the rows of the tsv file in a columnar file with typed columns
+    (see utility/columnar_export.py).
+
+    Args:
+        meta (dict): the metadata dictionaries returned by collectMetadata
+        columnar_fp (str): path to the output file (.parquet or .npz)
+        split_ar_lat (bool): the value used for the tsv file
+        incl_char_length (bool): the value used for the tsv file
+    """
+    header = make_tsv_columns(split_ar_lat, incl_char_length)
+    rows = (cells for uri, cells in generate_tsv_cells(
+                meta["all_vers_meta_d"], meta["all_book_meta_d"],
+                meta["all_auth_meta_d"], meta["all_transcr_meta_d"],
+                meta["all_manuscr_meta_d"], meta["all_loc_meta_d"],
+                split_ar_lat, incl_char_length))
+    save_columnar(columnar_fp, header, rows)
 
 
 def restore_config_to_default():
@@ -2122,6 +3257,81 @@ meta_yml_fp = None
 meta_json_fp = None
 meta_header_fp = None
 
+# path to the extraction cache file (metadata extracted from files that
+# did not change since the previous run will be taken from this cache;
+# e.g., "./cache/extraction_cache.json"). Set to None to disable the cache:
+extraction_cache_fp = None
+
+# number of processes used to collect the metadata
+# (the 25-years repos / author folders are processed in parallel):
+n_processes = 1
+
+# path to the header index file (position of the end of the metadata header
+# in every text file, so that headers and text bodies can be read without
+# searching for the end of the header; e.g., "./cache/header_index.json").
+# Set to None to disable the header index:
+header_index_fp = None
+
+# Set to True to measure the peak memory use of every phase of the run
+# in the run report (using tracemalloc; this makes the run considerably slower):
+trace_memory = False
+
+# path to the local store of the GitHub issues (only issues that were updated
+# since the previous run are downloaded from GitHub;
+# e.g., "./cache/github_issues.sqlite"). Set to None to download all issues:
+issue_store_fp = None
+
+# path to the srt index file (links to the passim srt folders of every text,
+# rebuilt only if the html files in utility/srt or the passim runs change;
+# e.g., "./cache/srt_index.json"). Set to None to read the html files every run:
+srt_index_fp = None
+
+# path to the SQLite database into which all metadata is written
+# (e.g., "./output/metadata.sqlite"). Set to None to skip the SQLite output:
+sqlite_fp = None
+
+# path to the columnar export of the metadata_light rows, with typed columns
+# (".parquet": requires pyarrow; ".npz": requires numpy;
+# e.g., "./output/metadata_light.parquet"). Set to None to skip this export:
+columnar_fp = None
+
+# format of the json output files: "json", "jsonl" (JSON Lines: one record
+# per line, sorted by URI) or "jsonl.gz" (gzip-compressed JSON Lines).
+# This applies to all json output files; NB: the JSON Lines version
+# of the metadata_light json file contains only the records,
+# without the date and time of the run:
+json_format = "json"
+
+# Set to True to write the yml data of every author, book, location and
+# manuscript only once in the master yml file (the version and transcription
+# records refer to it by URI; see utility/master_yml.py):
+compact_yml = False
+
+# number of versions whose yml files and text file headers are read ahead
+# in background threads while the current version is processed
+# (useful if the corpus is on a network file system). 0: no prefetching:
+prefetch_depth = 0
+
+# Set to True to save the book relations also as a compact edge list
+# (a tsv file with one relation per line: source, main_rel_type,
+# sec_rel_type, dest; next to the _book_relations.json file):
+book_rel_edges = False
+
+# path to the conversion cache file (names and titles converted from betaCode
+# into Arabic script in previous runs; discarded if the conversion tables change;
+# e.g., "./cache/conversion_cache.json"). Set to None to keep it only in memory:
+conversion_cache_fp = None
+
+# list of collection IDs (the letters at the start of the version IDs;
+# e.g., ["Noorlib"]) whose texts should be excluded from the metadata:
+exclude_collections = []
+
+# config files of additional profiles: the metadata of every profile is built
+# from a single scan of the corpus, with the profile's own exclude,
+# exclude_collections, split_ar_lat, output_files_path, output files, ...
+# (see utility/profiles.py; e.g., ["utility/config_RELEASE_2021_wo_Noorlib.py"]):
+profiles = []
+
 # List of lists (description, run_id on server):  
 passim_runs = [['October 2017 (V1)', 'passim1017'],
                ['February 2019 (V2)', 'passim01022019'],
@@ -2145,22 +3355,68 @@ def check_input(msg, responses={"Y": True, "N": False}):
         print("Response not recognized. Try again:")
         return check_input(msg, responses)
 
-def get_github_issues(token_fp="GitHub personalAccessTokenReadOnly.txt"):
+def get_github_issues(token_fp="GitHub personalAccessTokenReadOnly.txt",
+                      issue_store_fp=None, api_url="https://api.github.com"):
+    """Get the open GitHub issues of the OpenITI/Annotation repo, sorted by URI.
+
+    Args:
+        token_fp (str): path to the file containing the GitHub access token
+        issue_store_fp (str): path to the local store of GitHub issues;
+            if None, all issues are downloaded from GitHub; if not,
+            only the issues that were updated since the previous run
+            are downloaded, and the others are taken from the store
+        api_url (str): base URL of the GitHub API (only used if
+            issue_store_fp is not None)
+
+    Returns:
+        dict (key: uri, value: list of issues)
+    """
     try:
         with open(token_fp, mode="r", encoding="utf-8") as file:
             github_token = file.read().strip()
     except:
         github_token = None # you will be prompted to insert the token manually
 
-    issues = get_issues.get_issues("OpenITI/Annotation",
-                                   access_token=github_token,
-                                   issue_labels=["URI change suggestion",
-                                                 "text quality",
-                                                 "PRI & SEC Versions"])
-    issues = get_issues.define_text_uris(issues)
+    issue_labels = ["URI change suggestion", "text quality", "PRI & SEC Versions"]
+    if issue_store_fp:
+        folder = os.path.dirname(issue_store_fp)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        store = IssueStore(issue_store_fp)
+        store.sync("OpenITI/Annotation", access_token=github_token, api_url=api_url)
+        issues = store.get_issues("OpenITI/Annotation", issue_labels=issue_labels)
+        store.close()
+    else:
+        issues = get_issues.get_issues("OpenITI/Annotation",
+                                       access_token=github_token,
+                                       issue_labels=issue_labels)
+        # download the comments of the issues concurrently; add a language code
+        # to version URIs in the titles (see utility/get_issues.py):
+        issues = define_text_uris(issues, title_suffix="-ara1")
     issues_uri_dict = get_issues.sort_issues_by_uri(issues)
     return issues_uri_dict
 
+def count_checked_files(inventory, check_token_counts):
+    """Count the files read by check_yml_files: all yml files in the corpus
+    and, if the token counts are checked, the text file of every version
+
+    Returns:
+        tuple (number of files, number of bytes)
+    """
+    n_files = 0
+    n_bytes = 0
+    for root, dirs, files in inventory.walk():
+        for fn in files:
+            if fn.endswith(".yml"):
+                fp = os.path.join(root, fn)
+                fps = [fp]
+                if check_token_counts:
+                    fps += inventory.text_files(fp[:-4])[:1]
+                for fp in fps:
+                    n_files += 1
+                    n_bytes += inventory.getsize(fp)
+    return n_files, n_bytes
+
 def supplement_config_variables(cfg_dict, v_list):
     """Check if all vars in v_list are in config_dict; \
     add missing vars with value None."""
@@ -2195,6 +3451,8 @@ def read_config(config_pth):
             print(v, ">", v.strip()[2:-1].replace("\\", "/"))
         elif v.strip().startswith(("'", '"')):
             cfg_dict[k] = v.strip()[1:-1]
+        elif re.match(r"^-?\d+$", v.strip()):  # e.g., n_processes = 4
+            cfg_dict[k] = int(v.strip())
     return cfg_dict
     
 
@@ -2305,6 +3563,38 @@ def check_thurayya_uris(pth_string):
     print("="*80)
 
 
+def set_output_paths(profile, corpus_path, suffix=""):
+    """Define the paths to the output files of a profile
+    (see utility/profiles.py) that are not defined in its config file:
+    they are put in the profile's output_path folder.
+
+    Args:
+        profile (dict): the profile
+        corpus_path (str): path to the corpus folder
+        suffix (str): string added to the names of the output files
+            (to distinguish them from the files of other profiles
+            in the same folder)
+    """
+    pth_string = re.sub(r"\.+[\\/]", "", corpus_path)
+    pth_string = re.sub(r"[:\\/]+", "_", pth_string)
+    pth_string = os.path.join(profile["output_path"], pth_string) + suffix
+    if profile["meta_yml_fp"] == None: 
+        profile["meta_yml_fp"] = pth_string + "_metadata_complete.yml"
+    if profile["meta_tsv_fp"] == None: 
+        profile["meta_tsv_fp"] = pth_string + "_metadata_light.csv"
+    if profile["meta_json_fp"] == None:
+        profile["meta_json_fp"] = pth_string + "_metadata_light.json"
+    if profile["meta_header_fp"] == None:
+        profile["meta_header_fp"] = pth_string + "_header_metadata.json"
+    profile["book_rel_fp"] = pth_string + "_book_relations.json"
+    if profile["book_rel_edges"]:
+        profile["book_rel_edges_fp"] = pth_string + "_book_relations.tsv"
+    else:
+        profile["book_rel_edges_fp"] = None
+    profile["name_el_fp"] = pth_string + "_name_elements.json"
+    profile["pth_string"] = pth_string
+
+
 def main():
     
     info = """\
@@ -2343,17 +3633,31 @@ Command line arguments for generate-metadata.py:
                             => sets meta_header_fp variable
 -x, --exclude : (list) list of folder names to exclude from metadata
 -c, --config : (str) name of a python file with custom configuration variables
-                     (default: ./utility/config.py)
+                     (default: ./utility/config.py).
+                     Repeat this option to generate the metadata
+                     for more than one profile with a single corpus scan:
+                     every additional config file defines a profile
+                     (see utility/profiles.py)
+-k, --cache : (str) path to the extraction cache file
+                    (metadata of unchanged files is taken from this cache)
+                    => sets extraction_cache_fp variable
+-n, --n_processes : (int) number of processes used to collect metadata
+                          (the 25-years repos are processed in parallel)
+                          => sets n_processes variable
+-e, --prefetch_depth : (int) number of versions whose files are read ahead
+                             in background threads (0: no prefetching)
+                             => sets prefetch_depth variable
 -z, --test : (str) test the script on one of the three different
                    folder structures: choose one out of "25_years_folders",
                    "release_structure" or "flat_structure"
 """
     argv = sys.argv[1:]
-    opt_str = "htlfdprsi:o:t:y:j:a:x:c:z:"
+    opt_str = "htlfdprsi:o:t:y:j:a:x:c:z:k:n:e:"
     opt_list = ["help", "token_counts", "char_length", "flat_data",
                 "restore_default", "split_ar_lat", "recheck_yml", "silent",
                 "input_folder=", "output_folder=", "csv_fp=", "yml_fp=",
-                "json_fp=", "arab_header_fp=", "exclude=", "config=", "test="]
+                "json_fp=", "arab_header_fp=", "exclude=", "config=", "test=",
+                "cache=", "n_processes=", "prefetch_depth="]
     try:
         opts, args = getopt.getopt(argv, opt_str, opt_list)
     except Exception as e:
@@ -2364,10 +3668,17 @@ Command line arguments for generate-metadata.py:
     # 0a- import variables from config file
 
     configured = False
+    config_fp = "utility/config.py"
+    profile_fps = []
     for opt, arg in opts:
-        if opt in ["-c", "--config"]:
+        if opt in ["-c", "--config"] and configured:
+            # additional config files define additional profiles:
+            print ("profile", arg)
+            profile_fps.append(arg)
+        elif opt in ["-c", "--config"]:
             # load variables from custom config file provided in command line:
             print ("config", arg)
+            config_fp = arg
             shutil.copy(arg, "utility/temp_config.py")
             cfg_dict = read_config("utility/temp_config.py")
             os.remove("utility/temp_config.py")
@@ -2384,7 +3695,12 @@ Command line arguments for generate-metadata.py:
               "incl_char_length", "output_path",
               "meta_tsv_fp", "meta_yml_fp", "meta_json_fp", "meta_header_fp",
               "passim_runs", "silent", "split_ar_lat", "output_files_path",
-              "remove_from_path"]
+              "remove_from_path", "extraction_cache_fp", "n_processes",
+              "header_index_fp", "trace_memory", "issue_store_fp",
+              "srt_index_fp", "sqlite_fp", "columnar_fp",
+              "json_format", "compact_yml", "prefetch_depth",
+              "book_rel_edges", "conversion_cache_fp",
+              "exclude_collections", "profiles"]
     supplement_config_variables(cfg_dict, v_list)
 
     corpus_path = cfg_dict["corpus_path"]
@@ -2404,6 +3720,21 @@ Command line arguments for generate-metadata.py:
     split_ar_lat = cfg_dict["split_ar_lat"]
     output_files_path = cfg_dict["output_files_path"]
     remove_from_path = cfg_dict["remove_from_path"]
+    extraction_cache_fp = cfg_dict["extraction_cache_fp"]
+    n_processes = int(cfg_dict["n_processes"] or 1)
+    header_index_fp = cfg_dict["header_index_fp"]
+    trace_memory = cfg_dict["trace_memory"]
+    issue_store_fp = cfg_dict["issue_store_fp"]
+    srt_index_fp = cfg_dict["srt_index_fp"]
+    sqlite_fp = cfg_dict["sqlite_fp"]
+    columnar_fp = cfg_dict["columnar_fp"]
+    json_format = cfg_dict["json_format"] or "json"
+    compact_yml = cfg_dict["compact_yml"]
+    prefetch_depth = int(cfg_dict["prefetch_depth"] or 0)
+    book_rel_edges = cfg_dict["book_rel_edges"]
+    conversion_cache_fp = cfg_dict["conversion_cache_fp"]
+    exclude_collections = cfg_dict["exclude_collections"]
+    profile_fps += cfg_dict["profiles"] or []
     flat_folder = False
 
     print("output_files_path", output_files_path)
@@ -2454,6 +3785,15 @@ Command line arguments for generate-metadata.py:
         elif opt in ["-x", "--exclude"]:
             exclude = arg
             print("exclude", exclude)
+        elif opt in ["-k", "--cache"]:
+            extraction_cache_fp = arg
+            print("extraction_cache_fp", extraction_cache_fp)
+        elif opt in ["-n", "--n_processes"]:
+            n_processes = int(arg)
+            print("n_processes", n_processes)
+        elif opt in ["-e", "--prefetch_depth"]:
+            prefetch_depth = int(arg)
+            print("prefetch_depth", prefetch_depth)
         elif opt in ["-z", "--test"]:
             if arg == "25_years_folders":
                 setup_25_years_folders_test()
@@ -2520,19 +3860,57 @@ Command line arguments for generate-metadata.py:
 
 
 
-    pth_string = re.sub(r"\.+[\\/]", "", corpus_path)
-    pth_string = re.sub(r"[:\\/]+", "_", pth_string)
-    pth_string = os.path.join(output_path, pth_string)
-    if meta_yml_fp == None: 
-        meta_yml_fp = pth_string + "_metadata_complete.yml"
-    if meta_tsv_fp == None: 
-        meta_tsv_fp = pth_string + "_metadata_light.csv"
-    if meta_json_fp == None:
-        meta_json_fp = pth_string + "_metadata_light.json"
-    if meta_header_fp == None:
-        meta_header_fp = pth_string + "_header_metadata.json"
-    book_rel_fp = pth_string + "_book_relations.json"
-    name_el_fp = pth_string + "_name_elements.json"
+    # 0d- define the outputs of every profile (see utility/profiles.py):
+
+    main_profile = make_profile(config_fp, {
+        "exclude": exclude, "exclude_collections": exclude_collections,
+        "split_ar_lat": split_ar_lat, "output_files_path": output_files_path,
+        "remove_from_path": remove_from_path, "output_path": output_path,
+        "meta_tsv_fp": meta_tsv_fp, "meta_yml_fp": meta_yml_fp,
+        "meta_json_fp": meta_json_fp, "meta_header_fp": meta_header_fp,
+        "sqlite_fp": sqlite_fp, "columnar_fp": columnar_fp,
+        "passim_runs": passim_runs, "json_format": json_format,
+        "compact_yml": compact_yml, "book_rel_edges": book_rel_edges})
+    set_output_paths(main_profile, corpus_path)
+    profiles = [main_profile]
+    shared_values = {"corpus_path": corpus_path,
+                     "data_in_25_year_repos": data_in_25_year_repos,
+                     "perform_yml_check": perform_yml_check,
+                     "check_token_counts": check_token_counts,
+                     "incl_char_length": incl_char_length,
+                     "extraction_cache_fp": extraction_cache_fp,
+                     "n_processes": n_processes,
+                     "header_index_fp": header_index_fp,
+                     "conversion_cache_fp": conversion_cache_fp,
+                     "prefetch_depth": prefetch_depth}
+    for fp in profile_fps:
+        profile_cfg = read_config(fp)
+        for v in ignored_variables(profile_cfg, shared_values):
+            print("WARNING: {} is shared by all profiles;".format(v),
+                  "the value in {} is not used".format(fp))
+        profile = make_profile(fp, profile_cfg, main_profile)
+        profile["exclude"] = profile["exclude"] or []
+        profile["json_format"] = profile["json_format"] or "json"
+        # distinguish the default output files from those of the main profile:
+        suffix = "_" + os.path.splitext(os.path.basename(fp))[0]
+        set_output_paths(profile, corpus_path, suffix=suffix)
+        profiles.append(profile)
+    duplicates = duplicate_output_fps(profiles, ["meta_tsv_fp", "meta_yml_fp",
+                                                 "meta_json_fp", "meta_header_fp",
+                                                 "sqlite_fp", "columnar_fp",
+                                                 "book_rel_fp", "book_rel_edges_fp",
+                                                 "name_el_fp"])
+    for fp, names in duplicates.items():
+        print("ERROR: {} would be written by more than one profile:".format(fp),
+              ", ".join(names))
+    if duplicates:
+        sys.exit(2)
+
+    pth_string = main_profile["pth_string"]
+    meta_yml_fp = main_profile["meta_yml_fp"]
+    meta_tsv_fp = main_profile["meta_tsv_fp"]
+    meta_json_fp = main_profile["meta_json_fp"]
+    meta_header_fp = main_profile["meta_header_fp"]
 
 
     print("corpus_path", corpus_path)
@@ -2550,82 +3928,203 @@ Command line arguments for generate-metadata.py:
     print("data_in_25_year_repos", data_in_25_year_repos)
     print("flat_folder", flat_folder)
     print("output_files_path", output_files_path)
+    print("extraction_cache_fp", extraction_cache_fp)
+    print("n_processes", n_processes)
+    print("header_index_fp", header_index_fp)
+    print("trace_memory", trace_memory)
+    print("issue_store_fp", issue_store_fp)
+    print("srt_index_fp", srt_index_fp)
+    print("sqlite_fp", sqlite_fp)
+    print("columnar_fp", columnar_fp)
+    print("json_format", json_format)
+    print("compact_yml", compact_yml)
+    print("prefetch_depth", prefetch_depth)
+    print("book_rel_edges", book_rel_edges)
+    print("conversion_cache_fp", conversion_cache_fp)
+    print("exclude_collections", exclude_collections)
+    for profile in profiles[1:]:
+        print("-"*80)
+        print("profile", profile["name"])
+        for k, v in profile.items():
+            if k not in ["name", "pth_string"]:
+                print("    ", k, v)
 
     if not silent:
         input("Press Enter to start generating metadata ")
 
     start = time.time()
+
+    # measure the time and memory used in every phase of the run:
+    global run_report
+    run_report = RunReport(trace_memory=bool(trace_memory))
+    run_report.info = {"corpus_path": corpus_path,
+                       "perform_yml_check": perform_yml_check,
+                       "check_token_counts": check_token_counts,
+                       "incl_char_length": incl_char_length,
+                       "extraction_cache_fp": extraction_cache_fp,
+                       "header_index_fp": header_index_fp,
+                       "n_processes": n_processes,
+                       "profiles": [profile["name"] for profile in profiles]}
+
+    # only the folders that are excluded by all profiles
+    # are excluded from the yml check and the corpus scan:
+    if len(profiles) > 1:
+        scan_exclude = shared_exclude(profiles)
+    else:
+        scan_exclude = exclude
         
     # 1a- check and update yml files:
 
+    inventory = None
     if perform_yml_check:
         print("Checking yml files before collecting metadata...")
+        # scan the corpus folder only once, for the check and the collection
+        # (the check registers the yml files it changes in the inventory):
+        with measure("walk"):
+            inventory = CorpusInventory(re.sub(r"\\\\", "/", corpus_path),
+                                        exclude=scan_exclude)
         # execute=False forces the script to show you all changes it wants to make
         # before prompting you whether to execute the proposed changes:
-        check_yml_files(corpus_path, exclude=exclude,
-                        execute=silent, check_token_counts=check_token_counts,
-                        flat_folder=flat_folder)
+        with measure("yml_check"):
+            check_yml_files(corpus_path, exclude=scan_exclude,
+                            execute=silent, check_token_counts=check_token_counts,
+                            flat_folder=flat_folder, inventory=inventory,
+                            n_processes=n_processes or 1)
+        run_report.add_files("yml_check", *count_checked_files(inventory,
+                                                               check_token_counts))
         print()
-        end = time.time()
-        print("Processing time: {0:.2f} sec".format(end - start))
-
-    # 1b- collect metadata and save to csv:
-
-    end = time.time()
-    print("="*80)
-    print("Collecting metadata...")
-    collectMetadata(corpus_path, exclude, meta_tsv_fp, meta_yml_fp,
-                    book_rel_fp, name_el_fp, incl_char_length=incl_char_length,
-                    split_ar_lat=split_ar_lat, flat_folder=flat_folder,
-                    output_files_path=output_files_path,remove_from_path=remove_from_path)
-    temp = end
-    end = time.time()
-    print("Processing time: {0:.2f} sec".format(end - start))
-
-    # 1c - get github issues:
-
-    print("="*80)
-    #print("SKIPPING COLLECTING ISSUES FROM GITHUB")
-    #issues_uri_dict = dict()
-    print("Collecting issues from GitHub...")
-    # UNCOMMENT!
-    issues_uri_dict = get_github_issues()
-    temp = end
-    end = time.time()
-    print("GitHub fetching time: {0:.2f} sec".format(end - temp))
-    
-    # 2a - Save main metadata
-
-    print("="*80)
-    print("Saving metadata...")
-    print("="*80)
-
-    createJsonFile(meta_tsv_fp, meta_json_fp, passim_runs, issues_uri_dict)
-
-    
-    # 2b- Save header metadata
-
-    with open(meta_header_fp, mode="w", encoding="utf-8") as file:
-        json.dump(all_header_meta, file, ensure_ascii=False)
-
-
-    # 3a- check Thurayya URIs:
-    check_thurayya_uris(pth_string)
-
-        
-    # 3b- check duplicate ids:
-    duplicate_ids = False
-    for version_id, uris in version_ids.items():
-        if len(uris) > 1:
-            duplicate_ids = True
-            print("DUPLICATE ID:", uris)
-    if not duplicate_ids:
-        print("NO DUPLICATE IDS FOUND")
-    print("="*80)
+        print("Processing time: {0:.2f} sec".format(run_report.total("yml_check")))
+
+    # 1b- extract the metadata of the corpus only once for all profiles:
+
+    if len(profiles) > 1:
+        print("="*80)
+        print("Scanning the corpus for {} profiles...".format(len(profiles)))
+        with measure("scan_corpus"):
+            inventory, cache = scan_corpus(corpus_path, scan_exclude,
+                                           flat_folder=flat_folder,
+                                           cache_fp=extraction_cache_fp,
+                                           n_processes=n_processes or 1,
+                                           incl_char_length=incl_char_length,
+                                           header_index_fp=header_index_fp,
+                                           prefetch_depth=prefetch_depth or 0,
+                                           conversion_cache_fp=conversion_cache_fp,
+                                           compact_yml=[bool(p["compact_yml"]) for p in profiles],
+                                           inventory=inventory)
+        print("Processing time: {0:.2f} sec".format(run_report.total("scan_corpus")))
+        # all metadata of the profiles is taken from the scan:
+        collect_kwargs = {"inventory": inventory, "cache": cache}
+    else:
+        collect_kwargs = {"inventory": inventory,
+                          "cache_fp": extraction_cache_fp,
+                          "n_processes": n_processes or 1,
+                          "header_index_fp": header_index_fp,
+                          "prefetch_depth": prefetch_depth or 0,
+                          "conversion_cache_fp": conversion_cache_fp}
+
+    issues_uri_dict = None
+    for profile in profiles:
+        if len(profiles) > 1:
+            print("="*80)
+            print("Profile:", profile["name"])
+
+        # 1c- collect metadata and save to csv:
+
+        print("="*80)
+        print("Collecting metadata...")
+        # (the collection time of earlier profiles is in the same phase):
+        prev_collect_time = run_report.total("collect_metadata")
+        with measure("collect_metadata"):
+            meta = collectMetadata(corpus_path, profile["exclude"],
+                                   profile["meta_tsv_fp"], profile["meta_yml_fp"],
+                                   profile["book_rel_fp"], profile["name_el_fp"],
+                                   incl_char_length=incl_char_length,
+                                   split_ar_lat=profile["split_ar_lat"],
+                                   flat_folder=flat_folder,
+                                   output_files_path=profile["output_files_path"],
+                                   remove_from_path=profile["remove_from_path"],
+                                   json_format=profile["json_format"],
+                                   compact_yml=bool(profile["compact_yml"]),
+                                   book_rel_edges_outpth=profile["book_rel_edges_fp"],
+                                   exclude_collections=profile["exclude_collections"],
+                                   **collect_kwargs)
+        collect_time = run_report.total("collect_metadata") - prev_collect_time
+        print("Processing time: {0:.2f} sec".format(collect_time))
+
+        # 1d - get github issues (only once for all profiles):
+
+        if issues_uri_dict is None:
+            print("="*80)
+            #print("SKIPPING COLLECTING ISSUES FROM GITHUB")
+            #issues_uri_dict = dict()
+            print("Collecting issues from GitHub...")
+            # UNCOMMENT!
+            with measure("github_fetch"):
+                issues_uri_dict = get_github_issues(issue_store_fp=issue_store_fp)
+            print("GitHub fetching time: {0:.2f} sec".format(run_report.total("github_fetch")))
+
+        # 2a - Save main metadata
+
+        print("="*80)
+        print("Saving metadata...")
+        print("="*80)
+
+        with measure("json_output"):
+            json_records = createJsonFileFromMeta(meta, profile["meta_json_fp"],
+                                   profile["passim_runs"], issues_uri_dict,
+                                   split_ar_lat=profile["split_ar_lat"],
+                                   incl_char_length=incl_char_length,
+                                   srt_index_fp=srt_index_fp)
+
+
+        # 2b- Save header metadata
+
+        with measure("json_writing"):
+            save_json_dict(all_header_meta, profile["meta_header_fp"],
+                           indent=None, sort_keys=False)
+
+        # 2c- Save all metadata in an SQLite database:
+
+        if profile["sqlite_fp"]:
+            print("Saving metadata to", profile["sqlite_fp"])
+            with measure("sqlite_writing"):
+                save_as_sqlite(profile["sqlite_fp"], meta, json_records=json_records,
+                               header_meta=all_header_meta,
+                               issues_uri_dict=issues_uri_dict)
+
+        # 2d- Save the metadata_light rows in a columnar file with typed columns:
+
+        if profile["columnar_fp"]:
+            print("Saving typed columns to", profile["columnar_fp"])
+            with measure("columnar_writing"):
+                save_columnar_meta(meta, profile["columnar_fp"],
+                                   split_ar_lat=profile["split_ar_lat"],
+                                   incl_char_length=incl_char_length)
+
+        # 3a- check Thurayya URIs:
+        with measure("thurayya_check"):
+            check_thurayya_uris(profile["pth_string"])
+
+
+        # 3b- check duplicate ids:
+        duplicate_ids = False
+        for version_id, uris in version_ids.items():
+            if len(uris) > 1:
+                duplicate_ids = True
+                print("DUPLICATE ID:", uris)
+        if not duplicate_ids:
+            print("NO DUPLICATE IDS FOUND")
+        print("="*80)
             
 
+    # 3c- save the run report:
+    run_report_fp = pth_string + "_run_report.json"
+    run_report.save(run_report_fp)
+    run_report.print_summary()
+    print("Run report saved to", run_report_fp)
+
     print("Tada!")
-    print("Total processing time: {0:.2f} sec".format(end - start))
+    print("Total processing time: {0:.2f} sec".format(time.time() - start))
 
 
 
@@ -0,0 +1,259 @@
+"""Measure how generate-metadata.py scales with the size of the corpus.
+
+For every combination of corpus layout and corpus size,
+a synthetic corpus is generated (see make_synthetic_corpus.py)
+and the main phases of the metadata generation are timed:
+
+* yml_check: check_yml_files (only if the -y option is used)
+* collect_metadata: collectMetadata (walk, yml files, headers, token counts,
+  tsv and yml output)
+* collect_metadata_warm: collectMetadata again, with the extraction cache
+  filled by the first run (only if the -k option is used)
+* json: createJsonFileFromMeta (srt links and json output)
+
+The results are written to a json file, which can be compared
+with the results file of an earlier run (-c option), so that
+regressions and speedups are visible.
+
+The output of generate-metadata.py is written to a log file
+in the working folder.
+
+Command line usage (from the root folder of the repository):
+    python test/benchmark.py [options]
+
+    -s, --sizes <ints>      : comma-separated list of numbers of authors
+                              (default: 10,100)
+    -l, --layouts <strs>    : comma-separated list of layouts
+                              (default: 25-years,release,flat)
+    -b, --books <int>       : number of books per author (default: 3)
+    -v, --versions <int>    : number of versions per book (default: 2)
+    -m, --locations <int>   : number of manuscript locations (default: 2)
+    -t, --tokens <int>      : average number of tokens per text (default: 2000)
+    -n, --n_processes <int> : number of processes for collectMetadata (default: 1)
+    -y, --yml_check         : include the yml check
+    -k, --cache             : include a second (cached) run of collectMetadata
+    -d, --dir <path>        : working folder for the corpora and output files
+                              (default: ./benchmark)
+    -o, --output <path>     : path to the results file
+                              (default: ./benchmark/benchmark_results.json)
+    -c, --compare <path>    : path to the results file of an earlier run
+"""
+
+import contextlib
+import getopt
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+repo_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_folder)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from make_synthetic_corpus import make_synthetic_corpus
+
+
+def import_generate_metadata():
+    """Import generate-metadata.py as a module (its file name is not a valid
+    module name). NB: the working directory must be the repository folder,
+    because the script uses relative paths to the utility folder."""
+    fp = os.path.join(repo_folder, "generate-metadata.py")
+    spec = importlib.util.spec_from_file_location("generate_metadata", fp)
+    gm = importlib.util.module_from_spec(spec)
+    # register the module so that worker processes can find its functions:
+    sys.modules["generate_metadata"] = gm
+    spec.loader.exec_module(gm)
+    return gm
+
+def git_commit():
+    """Get the hash of the current git commit (None if git is not available)"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=repo_folder,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def timed(phases, phase, func, *args, **kwargs):
+    """Call a function and store its processing time in the phases dict"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    phases[phase] = round(time.perf_counter() - start, 4)
+    return result
+
+def run_benchmark(gm, work_dir, layout, n_authors, n_books=3, n_versions=2,
+                  n_locations=2, n_tokens=2000, n_processes=1,
+                  yml_check=False, cache=False, passim_runs=[], log=None):
+    """Generate a synthetic corpus and time the phases of the metadata generation.
+
+    Args:
+        gm (module): the generate-metadata.py module
+        work_dir (str): folder in which the corpus and outputs are created
+        layout (str): "25-years", "release" or "flat"
+        n_authors, n_books, n_versions, n_locations, n_tokens:
+            see make_synthetic_corpus
+        n_processes (int): number of processes used by collectMetadata
+        yml_check (bool): if True, the yml check is timed too
+        cache (bool): if True, a second run of collectMetadata
+            with a warm extraction cache is timed too
+        passim_runs (list): passim runs for which srt links are added
+        log (file): file to which the output of generate-metadata.py is written
+
+    Returns:
+        dict
+    """
+    corpus = os.path.join(work_dir, "corpus_{}_{}".format(layout, n_authors))
+    out = os.path.join(work_dir, "output_{}_{}".format(layout, n_authors))
+    for folder in [corpus, out]:
+        if os.path.exists(folder):
+            shutil.rmtree(folder)
+    os.makedirs(out)
+    flat_folder = layout == "flat"
+    cache_fp = os.path.join(out, "extraction_cache.json") if cache else None
+    phases = dict()
+
+    corpus_stats = timed(phases, "generate_corpus", make_synthetic_corpus,
+                         corpus, layout=layout, n_authors=n_authors,
+                         n_books=n_books, n_versions=n_versions,
+                         n_locations=n_locations, n_tokens=n_tokens)
+    print("  {} {} authors: {} files, {:.1f} MB".format(layout, n_authors,
+          corpus_stats["files"], corpus_stats["bytes"]/1e6))
+
+    args = [corpus, [], os.path.join(out, "metadata_light.csv"),
+            os.path.join(out, "metadata_complete.yml"),
+            os.path.join(out, "book_relations.json"),
+            os.path.join(out, "name_elements.json")]
+    kwargs = {"incl_char_length": True, "split_ar_lat": True,
+              "flat_folder": flat_folder, "cache_fp": cache_fp,
+              "n_processes": n_processes}
+    with contextlib.redirect_stdout(log):
+        if yml_check:
+            timed(phases, "yml_check", gm.check_yml_files, corpus, exclude=[],
+                  execute=True, check_token_counts=True, flat_folder=flat_folder)
+        meta = timed(phases, "collect_metadata", gm.collectMetadata, *args, **kwargs)
+        if cache:
+            meta = timed(phases, "collect_metadata_warm", gm.collectMetadata,
+                         *args, **kwargs)
+        timed(phases, "json", gm.createJsonFileFromMeta, meta,
+              os.path.join(out, "metadata_light.json"), passim_runs, dict(),
+              split_ar_lat=True, incl_char_length=True)
+
+    shutil.rmtree(corpus)
+    return {"layout": layout, "n_authors": n_authors, "n_books": n_books,
+            "n_versions": n_versions, "n_locations": n_locations,
+            "n_tokens": n_tokens, "n_processes": n_processes,
+            "corpus": corpus_stats, "phases": phases}
+
+def run_key(run):
+    """Key used to find the same run in two results files"""
+    return tuple(run[k] for k in ["layout", "n_authors", "n_books", "n_versions",
+                                  "n_locations", "n_tokens", "n_processes"])
+
+def compare_results(results, old_results):
+    """Print the processing time of every phase in the current and the
+    earlier results (and the ratio old/new: >1 means faster)."""
+    old_runs = {run_key(run): run for run in old_results["runs"]}
+    print("Comparison with {} (commit {}):".format(old_results["date"],
+                                                  old_results["commit"]))
+    print("{:<10} {:>8} {:<24} {:>10} {:>10} {:>8}".format(
+        "layout", "authors", "phase", "old (s)", "new (s)", "speedup"))
+    for run in results["runs"]:
+        old_run = old_runs.get(run_key(run))
+        if old_run is None:
+            continue
+        for phase, t in run["phases"].items():
+            if phase not in old_run["phases"]:
+                continue
+            old_t = old_run["phases"][phase]
+            speedup = "{:.2f}x".format(old_t / t) if t else "-"
+            print("{:<10} {:>8} {:<24} {:>10.3f} {:>10.3f} {:>8}".format(
+                run["layout"], run["n_authors"], phase, old_t, t, speedup))
+
+def main():
+    sizes = [10, 100]
+    layouts = ["25-years", "release", "flat"]
+    kwargs = {"n_books": 3, "n_versions": 2, "n_locations": 2,
+              "n_tokens": 2000, "n_processes": 1,
+              "yml_check": False, "cache": False}
+    work_dir = "benchmark"
+    results_fp = None
+    compare_fp = None
+
+    opt_str = "s:l:b:v:m:t:n:ykd:o:c:"
+    opt_list = ["sizes=", "layouts=", "books=", "versions=", "locations=",
+                "tokens=", "n_processes=", "yml_check", "cache",
+                "dir=", "output=", "compare="]
+    # short option, long option => keyword argument of run_benchmark:
+    int_args = {("-b", "--books"): "n_books",
+                ("-v", "--versions"): "n_versions",
+                ("-m", "--locations"): "n_locations",
+                ("-t", "--tokens"): "n_tokens",
+                ("-n", "--n_processes"): "n_processes"}
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], opt_str, opt_list)
+    except getopt.GetoptError as e:
+        print(e)
+        print(__doc__)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-s", "--sizes"]:
+            sizes = [int(x) for x in arg.split(",")]
+        elif opt in ["-l", "--layouts"]:
+            layouts = arg.split(",")
+        elif opt in ["-y", "--yml_check"]:
+            kwargs["yml_check"] = True
+        elif opt in ["-k", "--cache"]:
+            kwargs["cache"] = True
+        elif opt in ["-d", "--dir"]:
+            work_dir = arg
+        elif opt in ["-o", "--output"]:
+            results_fp = arg
+        elif opt in ["-c", "--compare"]:
+            compare_fp = arg
+        for k, v in int_args.items():
+            if opt in k:
+                kwargs[v] = int(arg)
+    work_dir = os.path.abspath(work_dir)
+    if results_fp is None:
+        results_fp = os.path.join(work_dir, "benchmark_results.json")
+    results_fp = os.path.abspath(results_fp)
+    if compare_fp:
+        compare_fp = os.path.abspath(compare_fp)
+    if not os.path.exists(work_dir):
+        os.makedirs(work_dir)
+
+    os.chdir(repo_folder)
+    gm = import_generate_metadata()
+    passim_runs = gm.read_config("utility/config.py")["passim_runs"]
+
+    results = {"date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+               "commit": git_commit(),
+               "python": platform.python_version(),
+               "platform": platform.platform(),
+               "cpu_count": os.cpu_count(),
+               "runs": []}
+    log_fp = os.path.join(work_dir, "benchmark_log.txt")
+    with open(log_fp, mode="w", encoding="utf-8") as log:
+        for layout in layouts:
+            for n_authors in sizes:
+                run = run_benchmark(gm, work_dir, layout, n_authors,
+                                    passim_runs=passim_runs, log=log, **kwargs)
+                for phase, t in run["phases"].items():
+                    print("    {:<24} {:>10.3f} s".format(phase, t))
+                results["runs"].append(run)
+
+    with open(results_fp, mode="w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print("Results saved to", results_fp)
+
+    if compare_fp:
+        with open(compare_fp, mode="r", encoding="utf-8") as file:
+            compare_results(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Measure how long it takes to aggregate the metadata of a synthetic author
+with thousands of versions, with plain lists and with UniqueLists
+(see utility/unique_list.py).
+
+For every version of the author, the same aggregations are done as in
+collect_folder_metadata and aggregate_arabic_names in generate-metadata.py:
+
+* the book URI is added to the books of the author (if it is not yet there)
+* the genre tags from the text file header are added to the genre tags
+  of the book (if they are not yet there)
+* the Arabic author names of the version are added to the Arabic
+  names of the author (if they are not yet there)
+
+Both variants must produce the same lists, in the same order.
+
+Command line usage (from the root folder of the repository):
+    python test/benchmark_aggregation.py [options]
+
+    -b, --books <ints>      : comma-separated list of numbers of books
+                              of the author (default: 100,1000,5000)
+    -v, --versions <int>    : number of versions per book (default: 3)
+    -t, --tags <int>        : number of genre tags per version (default: 20)
+    -n, --names <int>       : number of Arabic author names per version
+                              (default: 2)
+"""
+
+import getopt
+import os
+import random
+import sys
+import time
+
+repo_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_folder)
+
+from utility.unique_list import UniqueList
+
+
+def make_synthetic_author(n_books, n_versions=3, n_tags=20, n_names=2, seed=0):
+    """Create the data that is aggregated for every version of an author.
+
+    Returns:
+        list of (book_uri, genre_tags, author_ar) tuples (one per version)
+    """
+    rng = random.Random(seed)
+    versions = []
+    for b in range(n_books):
+        book_uri = "0310Tabari.Book{:05d}".format(b)
+        for v in range(n_versions):
+            coll_id = rng.choice(["Shamela", "JK", "Sham19Y", "Masaha"])
+            tags = ["{}@tag{}".format(coll_id, rng.randrange(4*n_tags))
+                    for i in range(n_tags)]
+            names = ["name{}".format(rng.randrange(n_books)) for i in range(n_names)]
+            versions.append((book_uri, tags, names))
+    return versions
+
+def aggregate(versions, container):
+    """Aggregate the books, genre tags and Arabic names of the versions
+    in lists of the type `container` (list or UniqueList)"""
+    auth_d = {"books": container(), "author_ar": container()}
+    all_book_meta_d = dict()
+    for book_uri, tags, names in versions:
+        if book_uri not in auth_d["books"]:
+            auth_d["books"].append(book_uri)
+        if book_uri not in all_book_meta_d:
+            all_book_meta_d[book_uri] = {"genre_tags": container()}
+        book_d = all_book_meta_d[book_uri]
+        for t in tags:
+            if t not in book_d["genre_tags"]:
+                book_d["genre_tags"].append(t)
+        for name in names:
+            if name not in auth_d["author_ar"]:
+                auth_d["author_ar"].append(name)
+    return auth_d, all_book_meta_d
+
+def run_benchmark(books=[100, 1000, 5000], n_versions=3, n_tags=20, n_names=2):
+    """Aggregate the data of synthetic authors of different sizes
+    with both list types, and print the processing times.
+
+    Returns:
+        dict (key: number of books,
+              value: dict (key: list type, value: processing time in seconds))
+    """
+    results = dict()
+    for n_books in books:
+        versions = make_synthetic_author(n_books, n_versions, n_tags, n_names)
+        results[n_books] = dict()
+        outputs = []
+        for container in [list, UniqueList]:
+            start = time.perf_counter()
+            outputs.append(aggregate(versions, container))
+            results[n_books][container.__name__] = round(time.perf_counter() - start, 4)
+        if outputs[0] != outputs[1]:
+            print("ERROR: different output for {} books".format(n_books))
+        print("{} books, {} versions: list {} s, UniqueList {} s".format(
+            n_books, len(versions), results[n_books]["list"],
+            results[n_books]["UniqueList"]))
+    return results
+
+def main():
+    kwargs = dict()
+    opt_str = "b:v:t:n:"
+    opt_list = ["books=", "versions=", "tags=", "names="]
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], opt_str, opt_list)
+    except getopt.GetoptError as e:
+        print(e)
+        print(__doc__)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-b", "--books"]:
+            kwargs["books"] = [int(x) for x in arg.split(",")]
+        elif opt in ["-v", "--versions"]:
+            kwargs["n_versions"] = int(arg)
+        elif opt in ["-t", "--tags"]:
+            kwargs["n_tags"] = int(arg)
+        elif opt in ["-n", "--names"]:
+            kwargs["n_names"] = int(arg)
+    run_benchmark(**kwargs)
+
+
+if __name__ == "__main__":
+    main()
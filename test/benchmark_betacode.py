@@ -0,0 +1,150 @@
+"""Check that the compiled betaCode conversion (betacodeToArabicCompiled,
+used by betaCodeToArSimple; see utility/betaCode.py) produces the same
+output as the original conversion (betacodeToArabic + regex deNoise),
+and measure how long both take.
+
+The regression set consists of:
+
+* all values in the yml files of a corpus folder
+  (names, titles, places, ... in betaCode)
+* the author and book parts of the URIs in the corpus
+  (split at capitals, e.g. "Ibn Sacd Tabaqat")
+* (optionally) random strings built from the keys of the betaCode tables,
+  to cover combinations that are not in the corpus
+
+Command line usage (from the root folder of the repository):
+    python test/benchmark_betacode.py [options]
+
+    -c, --corpus <path>   : path to the corpus folder
+                            (default: test/25-years-folders)
+    -r, --random <int>    : number of random strings to be added
+                            (default: 10000)
+    -n, --repeat <int>    : number of times the regression set is converted
+                            for the time measurement (default: 3)
+    -v, --verbose         : print all strings with different output
+"""
+
+import getopt
+import os
+import random
+import re
+import sys
+import time
+
+repo_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_folder)
+
+from utility import betaCode
+from utility.betaCode import betaCodeToArSimple, betacodeToArabic
+
+
+# the regex used by deNoise before it was replaced with str.translate:
+noise_regex = re.compile(""" ّ    | # Tashdid
+                             َ    | # Fatha
+                             ً    | # Tanwin Fath
+                             ُ    | # Damma
+                             ٌ    | # Tanwin Damm
+                             ِ    | # Kasra
+                             ٍ    | # Tanwin Kasr
+                             ْ    | # Sukun
+                             ٰ    | # Dagger Alif
+                             ـ     # Tatwil/Kashida
+                         """, re.VERBOSE)
+
+
+def original_betacode_to_ar_simple(text):
+    """betaCodeToArSimple before the conversion was compiled"""
+    text = betacodeToArabic(text)
+    text = text.replace("ﭐ", "ا")
+    text = re.sub(noise_regex, "", text)
+    text = re.sub(r"\bإبن\b", "ابن", text)
+    return text
+
+def collect_corpus_strings(corpus_folder):
+    """Collect the yml values and the URI parts from a corpus folder"""
+    strings = set()
+    for root, dirs, files in os.walk(corpus_folder):
+        for fn in files:
+            if not fn.endswith(".yml"):
+                continue
+            for uri_part in fn[:-4].split(".")[:2]:
+                uri_part = re.sub(r"^\d+", "", uri_part)
+                strings.add(re.sub(r"(?<=[a-z])(?=[A-Z])", " ", uri_part))
+            with open(os.path.join(root, fn), mode="r", encoding="utf-8") as file:
+                for line in file:
+                    if ":" in line:
+                        line = line.split(":", 1)[1]
+                    line = line.strip()
+                    if line:
+                        strings.add(line)
+                        strings.update(s.strip() for s in line.split("::"))
+    return sorted(s for s in strings if s)
+
+def make_random_strings(n, seed=0):
+    """Create random strings from the keys of the betaCode tables"""
+    rng = random.Random(seed)
+    keys = list(betaCode.betacodeTranslit) + list(betaCode.translitArabic)
+    keys += [" ", " ", "-", "al-", "b.", "Allah", "'", ",", "+", "_"]
+    keys = [k.strip() or k for k in keys]
+    strings = []
+    for i in range(n):
+        s = "".join(rng.choice(keys) for j in range(rng.randint(1, 12)))
+        if rng.random() < 0.3:
+            s = s.upper()
+        strings.append(s)
+    return strings
+
+def run_benchmark(corpus="test/25-years-folders", n_random=10000, repeat=3,
+                  verbose=False):
+    """Compare the output of both conversions and print the processing times.
+
+    Returns:
+        int (number of strings with different output)
+    """
+    strings = collect_corpus_strings(corpus)
+    print("{} strings in the corpus".format(len(strings)))
+    strings += make_random_strings(n_random)
+    mismatches = 0
+    for s in strings:
+        old = original_betacode_to_ar_simple(s)
+        new = betaCodeToArSimple(s)
+        if old != new:
+            mismatches += 1
+            if verbose:
+                print([s], [old], [new])
+    print("{} of {} strings with different output".format(mismatches, len(strings)))
+    for label, func in [("original", original_betacode_to_ar_simple),
+                        ("compiled", betaCodeToArSimple)]:
+        start = time.perf_counter()
+        for i in range(repeat):
+            for s in strings:
+                func(s)
+        print("{}: {} s".format(label, round(time.perf_counter() - start, 3)))
+    return mismatches
+
+def main():
+    kwargs = dict()
+    opt_str = "c:r:n:v"
+    opt_list = ["corpus=", "random=", "repeat=", "verbose"]
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], opt_str, opt_list)
+    except getopt.GetoptError as e:
+        print(e)
+        print(__doc__)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-c", "--corpus"]:
+            kwargs["corpus"] = arg
+        elif opt in ["-r", "--random"]:
+            kwargs["n_random"] = int(arg)
+        elif opt in ["-n", "--repeat"]:
+            kwargs["repeat"] = int(arg)
+        elif opt in ["-v", "--verbose"]:
+            kwargs["verbose"] = True
+    mismatches = run_benchmark(**kwargs)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
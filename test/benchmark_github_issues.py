@@ -0,0 +1,89 @@
+"""Measure how long it takes to define the URIs of GitHub issues
+(see define_text_uris in utility/get_issues.py) with different numbers
+of threads for downloading the comments of the issues.
+
+The issues are served by a local stand-in for the GitHub API
+(see mock_github_api.py), which delays every response to simulate
+network latency and can enforce a rate limit.
+
+Command line usage (from the root folder of the repository):
+    python test/benchmark_github_issues.py [options]
+
+    -i, --issues <int>      : number of issues (default: 300)
+    -t, --threads <ints>    : comma-separated list of numbers of threads
+                              (default: 1,4,8,16)
+    -d, --delay <float>     : delay of every response in seconds (default: 0.02)
+    -r, --rate_limit <int>  : number of requests allowed per second
+                              (default: no rate limit)
+"""
+
+import getopt
+import os
+import sys
+import time
+
+import requests
+
+repo_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_folder)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_github_api import MockGitHubAPI, make_mock_issues
+from utility.get_issues import define_text_uris
+from utility.issue_store import StoredIssue, get_pages
+
+
+def run_benchmark(n_issues=300, threads=[1, 4, 8, 16], delay=0.02, rate_limit=None):
+    """Define the URIs of the mock issues with every number of threads
+    and print the time it took and the number of comment requests.
+
+    Returns:
+        dict (key: number of threads, value: processing time in seconds)
+    """
+    results = dict()
+    ref = None
+    with MockGitHubAPI(make_mock_issues(n_issues), delay=delay,
+                       rate_limit=rate_limit) as api:
+        session = requests.Session()
+        url = "{}/repos/{}/issues".format(api.url, api.repo_name)
+        issue_dicts = list(get_pages(session, url, {"state": "all", "per_page": 100}))
+        print("{} issues, response delay {} s, rate limit: {}".format(
+            n_issues, delay, rate_limit))
+        for n_threads in threads:
+            issues = [StoredIssue(d, session=session) for d in issue_dicts]
+            n_requests = len(api.requests)
+            start = time.perf_counter()
+            define_text_uris(issues, n_threads=n_threads)
+            results[n_threads] = round(time.perf_counter() - start, 4)
+            uris = [issue.uri for issue in issues]
+            if ref is None:
+                ref = uris
+            print("    {:>3} threads: {:>8.3f} s, {} comment requests{}".format(
+                n_threads, results[n_threads], len(api.requests) - n_requests,
+                "" if uris == ref else " (DIFFERENT URIS!)"))
+    return results
+
+def main():
+    kwargs = dict()
+    opt_str = "i:t:d:r:"
+    opt_list = ["issues=", "threads=", "delay=", "rate_limit="]
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], opt_str, opt_list)
+    except getopt.GetoptError as e:
+        print(e)
+        print(__doc__)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-i", "--issues"]:
+            kwargs["n_issues"] = int(arg)
+        elif opt in ["-t", "--threads"]:
+            kwargs["threads"] = [int(x) for x in arg.split(",")]
+        elif opt in ["-d", "--delay"]:
+            kwargs["delay"] = float(arg)
+        elif opt in ["-r", "--rate_limit"]:
+            kwargs["rate_limit"] = int(arg)
+    run_benchmark(**kwargs)
+
+
+if __name__ == "__main__":
+    main()
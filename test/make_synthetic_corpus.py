@@ -0,0 +1,338 @@
+"""Generate a synthetic OpenITI corpus of any size, to measure
+how generate-metadata.py scales (see benchmark.py).
+
+The corpus contains N authors, each with a number of books,
+each of which has a number of versions (and, optionally,
+manuscript transcriptions in a number of locations), with:
+
+* author, book, version, location, manuscript and transcription yml files
+  (based on the templates in openiti.helper.templates)
+* text files with a #META# header and a random Arabic body text
+  with page numbers and milestones
+* versions split into VolsA/VolsB parts because they are "too big"
+* README.md and text_questionnaire.md files in every book folder
+
+The corpus can be generated in three layouts:
+
+* "25-years": 0025AH/data/0001Author/0001Author.Book/0001Author.Book.Version-ara1
+* "release":  0001Author/0001Author.Book/0001Author.Book.Version-ara1
+* "flat":     all files in one folder
+
+The random generator is seeded, so that the same parameters
+always produce the same corpus.
+
+Usage example:
+    make_synthetic_corpus("synthetic_corpus", layout="25-years",
+                          n_authors=100, n_books=3, n_versions=2,
+                          n_tokens=5000)
+
+Command line usage:
+    python make_synthetic_corpus.py [options] <destination folder>
+
+    -l, --layout <layout>   : "25-years" (default), "release" or "flat"
+    -a, --authors <int>     : number of authors (default: 10)
+    -b, --books <int>       : number of books per author (default: 3)
+    -v, --versions <int>    : number of versions per book (default: 2)
+    -m, --locations <int>   : number of manuscript locations (default: 0)
+    -t, --tokens <int>      : average number of tokens per text (default: 2000)
+    -s, --seed <int>        : seed for the random generator (default: 0)
+"""
+
+import getopt
+import os
+import random
+import shutil
+import sys
+
+from openiti.helper.templates import author_yml_template, book_yml_template, \
+                                     version_yml_template, location_yml_template, \
+                                     manuscript_yml_template, transcription_yml_template, \
+                                     readme_template, text_questionnaire_template
+
+
+layouts = ["25-years", "release", "flat"]
+
+ar_letters = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+lat_names = ["Muḥammad", "Aḥmad", "ʿAlī", "ʿUmar", "Ibrāhīm", "Yūsuf",
+             "Ḥasan", "Ḥusayn", "Maḥmūd", "Khālid", "Saʿīd", "Ismāʿīl"]
+lat_nisbas = ["al-Baghdādī", "al-Dimashqī", "al-Miṣrī", "al-Qurṭubī",
+              "al-Ṭabarī", "al-Anṣārī", "al-Ḥanbalī", "al-Shāfiʿī"]
+lat_title_words = ["Kitāb", "Risālaŧ", "Sharḥ", "Mukhtaṣar", "Taʾrīkh",
+                   "Dīwān", "Tafsīr", "Ṭabaqāt"]
+uri_title_words = ["Kitab", "Risala", "Sharh", "Mukhtasar", "Tarikh",
+                   "Diwan", "Tafsir", "Tabaqat"]
+genres = ["src@adab", "src@tarikh", "src@fiqh", "src@hadith",
+          "src@tafsir", "src@shir", "src@tasawwuf", "src@lugha"]
+version_sources = ["Shamela", "JK", "Sham19Y", "Masaha", "Hindawi", "Kraken"]
+cities = ["Cairo", "Damascus", "Istanbul", "Leiden", "Berlin", "Paris"]
+institutions = ["Azhar", "Zahiriyya", "Suleymaniye", "UB", "SBB", "BnF"]
+
+
+def letters(n, length=3):
+    """Convert a number into a (unique) capitalized string of latin letters"""
+    s = ""
+    for i in range(length):
+        s = chr(ord("a") + n % 26) + s
+        n //= 26
+    return s.capitalize()
+
+def fill_yml(template, values):
+    """Replace the values of the given keys in a yml template.
+
+    Args:
+        template (str): yml template (from openiti.helper.templates)
+        values (dict): key: yml key (e.g., "00#AUTH#URI######:"),
+            value: the new value for that key
+
+    Returns:
+        str
+    """
+    lines = []
+    skip = False
+    for line in template.splitlines():
+        if line.startswith("    ") or line.startswith("   "):
+            if not skip:
+                lines.append(line)
+            continue
+        skip = False
+        key = line.split(":")[0] + ":"
+        if key in values:
+            lines.append("{} {}".format(key, values[key]))
+            skip = True
+        else:
+            lines.append(line)
+    return "\n".join(lines)
+
+def make_text(rng, n_tokens, author_name, title):
+    """Make the content of a text file: OpenITI header and random body text.
+
+    Returns:
+        tuple (text, tok_count, char_count)
+    """
+    header = ["######OpenITI#", "", ""]
+    meta = [("000.SortField", "Shamela_{:07d}".format(rng.randint(1, 9999999))),
+            ("010.AuthorNAME", author_name),
+            ("011.AuthorDIED", str(rng.randint(1, 1450))),
+            ("020.BookTITLE", title),
+            ("021.BookSUBJ", "تاريخ :: أدب"),
+            ("022.BookVOLS", "1"),
+            ("040.EdEDITOR", "محقق " + author_name),
+            ("043.EdPUBLISHER", "دار الكتب"),
+            ("044.EdPLACE", "القاهرة"),
+            ("045.EdYEAR", str(rng.randint(1900, 2020)))]
+    for k, v in meta:
+        header.append("#META# {}\t:: {}".format(k, v))
+    header += ["", "#META#Header#End#", ""]
+
+    body = []
+    line = []
+    tok_count = n_tokens
+    n_chars = 0
+    page = 1
+    for i in range(n_tokens):
+        word = "".join(rng.choice(ar_letters) for j in range(rng.randint(2, 7)))
+        n_chars += len(word)
+        line.append(word)
+        if i % 300 == 299:
+            line.append("ms{}".format(i // 300 + 1))
+        if i % 250 == 249:
+            line.append("PageV01P{:03d}".format(page))
+            page += 1
+        if len(line) >= 12:
+            body.append("# " + " ".join(line))
+            line = []
+        if i % 1000 == 999:
+            body.append("### | " + "باب")
+            n_chars += 3
+            tok_count += 1
+    if line:
+        body.append("# " + " ".join(line))
+    return "\n".join(header + body) + "\n", tok_count, n_chars
+
+def write_file(fp, text, stats):
+    """Write a text file and add it to the corpus stats"""
+    with open(fp, mode="w", encoding="utf-8") as file:
+        file.write(text)
+    stats["files"] += 1
+    stats["bytes"] += len(text.encode("utf-8"))
+
+def make_folder(layout, dest, *folders):
+    """Create the folder for a corpus item in the given layout
+    (folders: e.g., 25-years repo, author folder, book folder)"""
+    if layout == "flat":
+        pth = dest
+    elif layout == "release":
+        pth = os.path.join(dest, *folders[1:])
+    else:
+        pth = os.path.join(dest, folders[0], "data", *folders[1:])
+    if not os.path.exists(pth):
+        os.makedirs(pth)
+    return pth
+
+def make_synthetic_corpus(dest, layout="25-years", n_authors=10, n_books=3,
+                          n_versions=2, n_locations=0, n_manuscripts=2,
+                          n_tokens=2000, split_ratio=0.1,
+                          missing_length_ratio=0.1, seed=0, overwrite=True):
+    """Generate a synthetic OpenITI corpus.
+
+    Args:
+        dest (str): path to the folder in which the corpus will be created
+        layout (str): "25-years", "release" or "flat" (see module docstring)
+        n_authors (int): number of authors
+        n_books (int): number of books per author
+        n_versions (int): number of versions per book
+        n_locations (int): number of locations (libraries) with manuscripts
+        n_manuscripts (int): number of manuscripts per location
+            (with one transcription each)
+        n_tokens (int): average number of tokens per text
+            (the actual length varies between half and one and a half times
+            this number)
+        split_ratio (float): share of the versions that are split
+            into two parts (VolsA and VolsB)
+        missing_length_ratio (float): share of the version yml files
+            without token and character count (so that the text needs
+            to be counted by generate-metadata.py)
+        seed (int): seed for the random generator
+        overwrite (bool): if True, the destination folder will be
+            removed before the corpus is generated
+
+    Returns:
+        dict (number of authors, books, versions, transcriptions,
+              files and bytes in the corpus)
+    """
+    if layout not in layouts:
+        raise ValueError("layout should be one of {}".format(layouts))
+    if overwrite and os.path.exists(dest):
+        shutil.rmtree(dest)
+    rng = random.Random(seed)
+    stats = {"authors": 0, "books": 0, "versions": 0, "transcriptions": 0,
+             "files": 0, "bytes": 0}
+    all_book_uris = []
+
+    for a in range(n_authors):
+        died = rng.randint(1, 1450)
+        repo = "{:04d}AH".format(((died - 1) // 25 + 1) * 25)
+        name = rng.choice(lat_names)
+        nisba = rng.choice(lat_nisbas)
+        author_uri = "{:04d}Author{}".format(died, letters(a, 4))
+        author_folder = make_folder(layout, dest, repo, author_uri)
+        yml = fill_yml(author_yml_template, {
+            "00#AUTH#URI######:": author_uri,
+            "10#AUTH#ISM####AR:": name,
+            "10#AUTH#NISBA##AR:": nisba,
+            "10#AUTH#SHUHRA#AR:": "{} {}".format(name, nisba),
+            "30#AUTH#DIED###AH:": "{:04d}".format(died)})
+        write_file(os.path.join(author_folder, author_uri+".yml"), yml, stats)
+        stats["authors"] += 1
+
+        for b in range(n_books):
+            i = rng.randrange(len(lat_title_words))
+            title = "{} al-{}".format(lat_title_words[i], letters(b))
+            book_uri = "{}.{}{}".format(author_uri, uri_title_words[i], letters(b))
+            book_folder = make_folder(layout, dest, repo, author_uri, book_uri)
+            values = {"00#BOOK#URI######:": book_uri,
+                      "10#BOOK#GENRES###:": ", ".join(rng.sample(genres, 2)),
+                      "10#BOOK#TITLEA#AR:": title}
+            # add relations to earlier books:
+            if all_book_uris and rng.random() < 0.2:
+                values["40#BOOK#COMMENTD#:"] = rng.choice(all_book_uris)
+            write_file(os.path.join(book_folder, book_uri+".yml"),
+                       fill_yml(book_yml_template, values), stats)
+            if layout != "flat":
+                write_file(os.path.join(book_folder, "README.md"),
+                           readme_template, stats)
+                write_file(os.path.join(book_folder, "text_questionnaire.md"),
+                           text_questionnaire_template, stats)
+            all_book_uris.append(book_uri)
+            stats["books"] += 1
+
+            for v in range(n_versions):
+                version_id = "{}{:07d}".format(rng.choice(version_sources),
+                                               (a * n_books + b) * n_versions + v)
+                if rng.random() < split_ratio:
+                    parts = ["VolsA", "VolsB"]
+                else:
+                    parts = [""]
+                primary = v == 0 and rng.random() < 0.3
+                for part in parts:
+                    version_uri = "{}.{}{}-ara1".format(book_uri, version_id, part)
+                    n = rng.randint(n_tokens // 2, n_tokens * 3 // 2)
+                    text, tok_count, char_count = make_text(rng, n, name, title)
+                    ext = rng.choice([".mARkdown", ".completed", "", ""])
+                    write_file(os.path.join(book_folder, version_uri+ext), text, stats)
+                    values = {"00#VERS#URI######:": version_uri,
+                              "00#VERS#LENGTH###:": str(tok_count),
+                              "00#VERS#CLENGTH##:": str(char_count)}
+                    if rng.random() < missing_length_ratio:
+                        values["00#VERS#LENGTH###:"] = ""
+                        values["00#VERS#CLENGTH##:"] = ""
+                    if primary:
+                        values["90#VERS#ISSUES###:"] = "PRIMARY_VERSION"
+                    write_file(os.path.join(book_folder, version_uri+".yml"),
+                               fill_yml(version_yml_template, values), stats)
+                    stats["versions"] += 1
+
+    for loc in range(n_locations):
+        city = cities[loc % len(cities)]
+        inst = institutions[loc % len(institutions)]
+        loc_uri = "MS{:04d}{}".format(loc + 1, city)
+        loc_folder = make_folder(layout, dest, "MSS", loc_uri)
+        write_file(os.path.join(loc_folder, loc_uri+".yml"),
+                   fill_yml(location_yml_template, {
+                       "00#LOC#URI#######:": loc_uri,
+                       "10#LOC#CITY#EN###:": city,
+                       "10#LOC#INST#EN###:": inst}),
+                   stats)
+        for m in range(n_manuscripts):
+            manuscr_uri = "{}.{}_{:04d}".format(loc_uri, inst, m + 1)
+            manuscr_folder = make_folder(layout, dest, "MSS", loc_uri, manuscr_uri)
+            write_file(os.path.join(manuscr_folder, manuscr_uri+".yml"),
+                       fill_yml(manuscript_yml_template, {
+                           "00#MS#URI########:": manuscr_uri,
+                           "10#MS#SHELFM#####:": "{} {}".format(inst, m + 1),
+                           "10#MS#GENRES#####:": ", ".join(rng.sample(genres, 2))}),
+                       stats)
+            transcr_uri = "{}.Kraken{:04d}-ara1".format(manuscr_uri, m + 1)
+            n = rng.randint(n_tokens // 2, n_tokens * 3 // 2)
+            text, tok_count, char_count = make_text(rng, n, "", "")
+            write_file(os.path.join(manuscr_folder, transcr_uri), text, stats)
+            write_file(os.path.join(manuscr_folder, transcr_uri+".yml"),
+                       fill_yml(transcription_yml_template, {
+                           "00#TRNS#URI######:": transcr_uri,
+                           "00#TRNS#LENGTH###:": str(tok_count),
+                           "00#TRNS#CLENGTH##:": str(char_count)}),
+                       stats)
+            stats["transcriptions"] += 1
+
+    return stats
+
+
+if __name__ == "__main__":
+    kwargs = dict()
+    opt_str = "l:a:b:v:m:t:s:"
+    opt_list = ["layout=", "authors=", "books=", "versions=",
+                "locations=", "tokens=", "seed="]
+    # short option, long option => keyword argument of make_synthetic_corpus:
+    int_args = {("-a", "--authors"): "n_authors",
+                ("-b", "--books"): "n_books",
+                ("-v", "--versions"): "n_versions",
+                ("-m", "--locations"): "n_locations",
+                ("-t", "--tokens"): "n_tokens",
+                ("-s", "--seed"): "seed"}
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], opt_str, opt_list)
+    except getopt.GetoptError as e:
+        print(e)
+        print(__doc__)
+        sys.exit(2)
+    if len(args) != 1:
+        print(__doc__)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-l", "--layout"]:
+            kwargs["layout"] = arg
+        for k, v in int_args.items():
+            if opt in k:
+                kwargs[v] = int(arg)
+    stats = make_synthetic_corpus(args[0], **kwargs)
+    print(stats)
@@ -0,0 +1,233 @@
+"""A local stand-in for the parts of the GitHub REST API used by
+generate-metadata.py (the issues and comments of a repository).
+
+The server runs in a background thread, so that the GitHub issue
+functions (utility/issue_store.py, utility/get_issues.py) can be tested
+and benchmarked without network access or a GitHub token:
+
+* GET /repos/{owner}/{repo}/issues (parameters: state, since,
+  per_page, page; pagination through the Link header)
+* GET /repos/{owner}/{repo}/issues/{number}/comments
+  (parameters: per_page, page)
+
+Optionally, the server adds a delay to every response and enforces
+a rate limit (with the X-RateLimit-* headers of the GitHub API and
+a 403 response when the limit is exhausted).
+
+Usage example:
+    issues = make_mock_issues(200)
+    with MockGitHubAPI(issues) as api:
+        store = IssueStore("issues.sqlite")
+        store.sync("OpenITI/Annotation", access_token="", api_url=api.url)
+        print(api.requests)
+
+Command line usage (from the root folder of the repository):
+    python test/mock_github_api.py [n_issues] [port]
+"""
+
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+
+labels = ["URI change suggestion", "text quality", "PRI & SEC Versions",
+          "in progress", "question"]
+
+
+def make_mock_issues(n_issues, n_comments=3, seed=1):
+    """Generate a list of issues in the format of the GitHub REST API.
+
+    The URI an issue pertains to is mentioned in its title, its body
+    or (only) in one of its comments, as in the OpenITI/Annotation repo.
+
+    Args:
+        n_issues (int): number of issues
+        n_comments (int): maximum number of comments per issue
+        seed (int): seed for the random generator
+
+    Returns:
+        list of dicts
+    """
+    rand = random.Random(seed)
+    issues = []
+    for i in range(1, n_issues+1):
+        letters = "".join(chr(97 + (i // 26**k) % 26) for k in range(3))
+        uri = "{:04d}Author{}.Book{}.Shamela{:07d}-ara1".format(
+            rand.randint(1, 1450), letters[:2], letters, i)
+        place = rand.choice(["title", "body", "old_uri", "comment", "none"])
+        title = "Issue {}".format(i)
+        body = "Description of issue {}".format(i)
+        comments = ["Comment {} on issue {}".format(j, i)
+                    for j in range(rand.randint(0, n_comments))]
+        if place == "title":
+            title = uri.split("-")[0] + " " + title
+        elif place == "body":
+            body += "\n" + uri
+        elif place == "old_uri":
+            body += "\nOLD URI: " + uri + "\nNEW URI: " + uri.replace("Book", "Kitab")
+        elif place == "comment":
+            comments.append("The URI is " + uri)
+        issues.append({"number": i,
+                       "title": title,
+                       "body": body,
+                       "state": rand.choice(["open", "open", "closed"]),
+                       "labels": [{"name": x} for x in rand.sample(labels, rand.randint(0, 2))],
+                       "updated_at": "2023-01-01T00:00:{:02d}Z".format(i % 60),
+                       "comment_bodies": comments})
+    return issues
+
+
+class MockGitHubAPI:
+    """A local HTTP server that serves issues like the GitHub REST API.
+
+    Args:
+        issues (list): issues in the format of make_mock_issues
+        repo_name (str): name of the repository
+        delay (float): number of seconds every response is delayed
+        rate_limit (int): number of requests allowed per rate limit window
+            (None: no rate limit)
+        rate_limit_window (float): duration of the rate limit window in seconds
+        port (int): port of the server (0: any free port)
+    """
+    def __init__(self, issues, repo_name="OpenITI/Annotation", delay=0.0,
+                 rate_limit=None, rate_limit_window=1.0, port=0):
+        self.issues = {d["number"]: d for d in issues}
+        self.repo_name = repo_name
+        self.delay = delay
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.window_start = time.time()
+        self.remaining = rate_limit
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.server.server_address[1])
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def update_issue(self, number, **kwargs):
+        """Change an issue (e.g., updated_at, state, title)"""
+        with self.lock:
+            self.issues[number].update(kwargs)
+
+    def check_rate_limit(self):
+        """Count a request against the rate limit.
+
+        Returns:
+            tuple (allowed (bool), rate limit headers (dict))
+        """
+        if self.rate_limit is None:
+            return True, dict()
+        with self.lock:
+            now = time.time()
+            if now - self.window_start >= self.rate_limit_window:
+                self.window_start = now
+                self.remaining = self.rate_limit
+            allowed = self.remaining > 0
+            if allowed:
+                self.remaining -= 1
+            headers = {"X-RateLimit-Limit": str(self.rate_limit),
+                       "X-RateLimit-Remaining": str(self.remaining),
+                       "X-RateLimit-Reset": str(int(self.window_start
+                                                    + self.rate_limit_window + 1))}
+        return allowed, headers
+
+    def list_issues(self, params):
+        """Get the issues, newest first, filtered by state and update time"""
+        state = params.get("state", "open")
+        since = params.get("since")
+        with self.lock:
+            issues = sorted(self.issues.values(), key=lambda d: d["number"], reverse=True)
+        issues = [d for d in issues if state == "all" or d["state"] == state]
+        if since:
+            issues = [d for d in issues if d["updated_at"] >= since]
+        return [self.issue_json(d) for d in issues]
+
+    def issue_json(self, d):
+        issue = {k: v for k, v in d.items() if k != "comment_bodies"}
+        issue["comments"] = len(d["comment_bodies"])
+        issue["comments_url"] = "{}/repos/{}/issues/{}/comments".format(
+            self.url, self.repo_name, d["number"])
+        return issue
+
+    def make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, status, data, headers):
+                b = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(b)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(b)
+
+            def do_GET(self):
+                if api.delay:
+                    time.sleep(api.delay)
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                with api.lock:
+                    api.requests.append(self.path)
+                allowed, headers = api.check_rate_limit()
+                if not allowed:
+                    self.send_json(403, {"message": "API rate limit exceeded"}, headers)
+                    return
+                prefix = "/repos/{}/issues".format(api.repo_name)
+                comments_m = re.match(re.escape(prefix) + r"/(\d+)/comments$", parsed.path)
+                if parsed.path == prefix:
+                    items = api.list_issues(params)
+                elif comments_m and int(comments_m.group(1)) in api.issues:
+                    issue = api.issues[int(comments_m.group(1))]
+                    items = [{"body": c} for c in issue["comment_bodies"]]
+                else:
+                    self.send_json(404, {"message": "Not Found"}, headers)
+                    return
+                per_page = int(params.get("per_page", 30))
+                page = int(params.get("page", 1))
+                if page * per_page < len(items):
+                    next_params = dict(params, page=page+1)
+                    headers["Link"] = '<{}{}?{}>; rel="next"'.format(
+                        api.url, parsed.path, urlencode(next_params))
+                self.send_json(200, items[(page-1)*per_page:page*per_page], headers)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    n_issues = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    api = MockGitHubAPI(make_mock_issues(n_issues), port=port)
+    print("Serving {} mock issues at {}".format(n_issues, api.url))
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        api.server.server_close()
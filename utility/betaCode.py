@@ -1,3 +1,6 @@
+import hashlib
+import json
+import os
 import re
 
 ###################################################################################
@@ -316,20 +319,12 @@ def AHCE(ah):
     ce = int(ah)-(int(ah)/33)+622
     return(int(ce))
 
+# short vowels, tanwins, shadda, sukun, dagger alif and tatwil/kashida:
+noiseChars = "ّ" + "َ" + "ً" + "ُ" + "ٌ" + "ِ" + "ٍ" + "ْ" + "ٰ" + "ـ"
+noiseTable = str.maketrans({c: None for c in noiseChars})
+
 def deNoise(text):
-    noise = re.compile(""" ّ    | # Tashdid
-                             َ    | # Fatha
-                             ً    | # Tanwin Fath
-                             ُ    | # Damma
-                             ٌ    | # Tanwin Damm
-                             ِ    | # Kasra
-                             ٍ    | # Tanwin Kasr
-                             ْ    | # Sukun
-                             ٰ    | # Dagger Alif
-                             ـ     # Tatwil/Kashida
-                         """, re.VERBOSE)
-    text = re.sub(noise, '', text)
-    return(text)
+    return(text.translate(noiseTable))
 
 # define replacement with dictionaries
 def dictReplace(text, dic):
@@ -400,10 +395,142 @@ def arabicToBetaCode(text):
     return(text)
 
 
-def betacodeToArabic(text):
-    cnsnnts = "btṯǧčḥḥḫdḏrzsšṣḍṭẓʿġfḳkglmnhwy"
-    cnsnnts = "%s%s" % (cnsnnts, cnsnnts.upper())
+_cnsnnts = "btṯǧčḥḥḫdḏrzsšṣḍṭẓʿġfḳkglmnhwy"
+_cnsnnts = "%s%s" % (_cnsnnts, _cnsnnts.upper())
+_sun = "tṯdḏrzsšṣḍṭẓln"
 
+# the regex rules of betacodeToArabic, in groups (guard, rules):
+# the rules of a group can only match if the text contains the guard string
+# (None: the rules are always applied); the guards are only used
+# by betacodeToArabicCompiled, which skips the groups that cannot match.
+betacodeToArabicRuleBlocks = [
+    # complex combinations
+    ("ll", [
+        (r"li-?a?ll[āã]hi?", " لِـلّٰـهِ ".strip()), # Convert God's Name
+        (r"bi-?a?ll[āã]hi?", "بِاللهِ"), # Convert God's Name
+        (r"wa-?a?ll[āã]hi?", "وَاللهِ"), # Convert God's Name
+        ("all[ãā]h", " ﭐلـلّٰـه ".strip()), # Convert God's Name
+        ]),
+    ("b.", [
+        (r"\bb\.", "بن"), # Convert b. into ar bn
+        ]),
+    ("l-", [
+        (r"\bal-([%s])" % _sun, r"ﭐل-\1\1"), # converts articles w/ sun letters
+        (r"\bal-", r"ﭐلْ-"), # converts articles
+        (r"\bwa-a?l-", "وَﭐل-"), # converts articles
+        #(r"n-", ""), # converts articles
+        ]),
+    (",", [
+        (",", "،"), # Convert commas
+        ]),
+    # initial HAMZAs
+    (None, [
+        ("\\bʾ?a", "أَ"),
+        ("\\bʾi", "إِ"),
+        ("\\bi", "ﭐ"),
+        ("\\bʾ?u", "أُ"),
+        ("\\bʾ?ā", "آ"),
+        ("\\bʾ?ī", "إِي"),
+        ("\\bʾ?ū", "أُو"),
+        ]),
+    # final, medial HAMZAs (all rules contain a hamza)
+    ("ʾ", [
+        (r'aʾ\b', "أ"),
+        (r'uʾ\b', "ؤ"),
+        (r'iʾ\b', "ئ"),
+        (r'yʾaȵ', r"يْئًا"),
+        (r'([%s])ʾuȵ' % _cnsnnts, r"\1%s" % "ْءٌ"),
+        (r'([%s])ʾiȵ' % _cnsnnts, r"\1%s" % "ْءٍ"),
+        (r'([%s])ʾaȵ' % _cnsnnts, r"\1%s" % "ْءًا"),
+        # short, hamza, tanwin
+        (r'uʾuȵ', r"ُؤٌ"),
+        (r'uʾiȵ', r"ُؤٍ"),
+        (r'uʾaȵ', r"ُؤًا"),
+        (r'iʾuȵ', r"ِئٌ"),
+        (r'iʾiȵ', r"ِئٍ"),
+        (r'iʾaȵ', r"ِئًا"),
+        (r'aʾuȵ', r"َأٌ"),
+        (r'aʾiȵ', r"َأٍ"),
+        (r'aʾaȵ', r"َأً"),
+        # long, hamza, tanwin
+        (r'ūʾuȵ', r"وءٌ"),
+        (r'ūʾiȵ', r"وءٍ"),
+        (r'ūʾaȵ', r"وءً"),
+        (r'īʾuȵ', r"يءٌ"),
+        (r'īʾiȵ', r"يءٍ"),
+        (r'īʾaȵ', r"يءً"),
+        (r'āʾuȵ', r"اءٌ"),
+        (r'āʾiȵ', r"اءٍ"),
+        (r'āʾaȵ', r"اءً"),
+        # long, hamza, diptote
+        (r'āʾu\b', r"اءُ"),
+        (r'āʾi\b', r"اءِ"),
+        (r'āʾa\b', r"اءَ"),
+        # medial HAMZAs
+        (r"aʾū", r"َؤُو"),
+        (r"uʾa", r"ُؤَ"),
+        (r"uʾi", r"ُئِ"),
+        (r"ūʾu", r"ُوؤُ"),
+        (r"ūʾi", r"ُوئِ"),
+        (r"awʾa", r"َوْءَ"),
+        (r"awʾu", r"َوْءُ"),
+        (r"āʾi", r"ائِ"),
+        (r"aʾī", r"َئِي"),
+        (r"āʾī", r"ائِي"),
+        (r"āʾu", r"اؤُ"),
+        (r"uʾā", r"ُؤَا"),
+        (r"aʾa", r"َأَ"),
+        (r"aʾi", r"َئِ"),
+        (r"aʾu", r"َؤُ"),
+        (r"iʾu", r"ِئُ"),
+        (r"iʾi", r"ِئِ"),
+        (r"iʾa", r"ِئَ"),
+        (r"īʾa", r"ِيئَ"),
+        (r"īʾu", r"ِيؤُ"),
+        (r"iʾā", r"ِئَا"),
+        (r"([%s])ʾa" % _cnsnnts, r"\1%s" % "ْأَ"),
+        (r"([%s])ʾu" % _cnsnnts, r"\1%s" % "ْؤُ"),
+        (r"([%s])ʾū" % _cnsnnts, r"\1%s" % "ْؤُو"),
+        (r"([%s])ʾi" % _cnsnnts, r"\1%s" % "ْئِ"),
+        (r"uʾu", r"ُؤُ"),
+        (r"uʾū", r"ُؤُو"),
+        (r"aʾʾā", r"َأَّا"), # geminnated hamza # dagger alif "َأّٰ", ordinary alif ""
+        (r"aʾī", r"َئِي"),
+        (r"āʾī", r"ائِي"),
+        (r"uʾā", r"ُؤَا"),
+        (r"uʾ([%s])" % _cnsnnts, r"%s\1" % "ُؤْ"),
+        (r"iʾ([%s])" % _cnsnnts, r"%s\1" % "ِئْ"),
+        (r"aʾ([%s])" % _cnsnnts, r"%s\1" % "َأْ"),
+        (r"aʾā", r"َآ"), # madda: hamza, long a
+        (r"([%s])ʾā" % _cnsnnts, r"\1%s" % "ْآ"), # madda: sukun, hamza, long a
+        ]),
+    # pronominal suffixes
+    #(None, [
+    #    (r"-(h[ui]|hā|k[ai]|h[ui]mā?|kumā|h[ui]nna|)\b", r"\1"),
+    #    ]),
+    # consonant combinations
+    (None, [
+        (r"([%s])\1" % _cnsnnts, r"\1" + " ّ ".strip()),
+        # two consonants into C-sukun-C
+        (r"([%s])([%s])" % (_cnsnnts,_cnsnnts), r"\1%s\2" % " ْ ".strip()),
+        (r"([%s])([%s])" % (_cnsnnts,_cnsnnts), r"\1%s\2" % " ْ ".strip()),
+        # final consonant into C-sukun
+        (r"([%s])(\s|$)" % (_cnsnnts), r"\1%s\2" % " ْ ".strip()),
+        # consonant + long vowel into C-shortV-longV
+        (r"([%s])(ā)" % (_cnsnnts), r"\1%s\2" % " َ ".strip()),
+        (r"([%s])(ī)" % (_cnsnnts), r"\1%s\2" % " ِ ".strip()),
+        (r"([%s])(ū)" % (_cnsnnts), r"\1%s\2" % " ُ ".strip()),
+        ]),
+    # tanwins
+    ("ȵ", [
+        (r'([%s])aȵ' % "btṯǧḥḥḫdḏrzsšṣḍṭẓʿġfḳklmnhwy", r"\1%s" % 'اً'),
+        ('aȵ' , ' ً '.strip()),
+        ('uȵ' , ' ٌ '.strip()),
+        ('iȵ' , ' ٍ '.strip()),
+        ]),
+    ]
+
+def betacodeToArabic(text):
     #print("betacodeToArabic()")
     text = dictReplace(text, betacodeTranslit)
     #print(text)
@@ -415,138 +542,9 @@ def betacodeToArabic(text):
     text = re.sub("ỉ", "i", text)
     text = re.sub("ả", "a", text)
 
-    # complex combinations
-    text = re.sub(r"li-?a?ll[āã]hi?", " لِـلّٰـهِ ".strip(), text) # Convert God's Name
-    text = re.sub(r"bi-?a?ll[āã]hi?", "بِاللهِ", text) # Convert God's Name
-    text = re.sub(r"wa-?a?ll[āã]hi?", "وَاللهِ", text) # Convert God's Name
-    text = re.sub("all[ãā]h", " ﭐلـلّٰـه ".strip(), text) # Convert God's Name
-    text = re.sub(r"\bb\.", "بن", text) # Convert b. into ar bn
-
-    sun = "tṯdḏrzsšṣḍṭẓln"
-    text = re.sub(r"\bal-([%s])" % sun, r"ﭐل-\1\1", text) # converts articles w/ sun letters
-    text = re.sub(r"\bal-", r"ﭐلْ-", text) # converts articles
-    text = re.sub(r"\bwa-a?l-", "وَﭐل-", text) # converts articles
-    #text   = re.sub(r"n-", "", text) # converts articles
-
-    text  = re.sub(",", "،", text) # Convert commas
-
-    # initial HAMZAs
-    text = re.sub("\\bʾ?a", "أَ", text)
-    text = re.sub("\\bʾi", "إِ", text)
-    text = re.sub("\\bi", "ﭐ", text)
-    text = re.sub("\\bʾ?u", "أُ", text)
-    text = re.sub("\\bʾ?ā", "آ", text)
-    text = re.sub("\\bʾ?ī", "إِي", text)
-    text = re.sub("\\bʾ?ū", "أُو", text)
-
-    # final HAMZAs
-    
-    text = re.sub(r'aʾ\b', "أ", text)
-    text = re.sub(r'uʾ\b', "ؤ", text)
-    text = re.sub(r'iʾ\b', "ئ", text)
-    text = re.sub(r'yʾaȵ', r"يْئًا", text)
-    text = re.sub(r'([%s])ʾuȵ' % cnsnnts, r"\1%s" % "ْءٌ", text)
-    text = re.sub(r'([%s])ʾiȵ' % cnsnnts, r"\1%s" % "ْءٍ", text)
-    text = re.sub(r'([%s])ʾaȵ' % cnsnnts, r"\1%s" % "ْءًا", text)
-
-    # short, hamza, tanwin
-    text = re.sub(r'uʾuȵ', r"ُؤٌ", text)
-    text = re.sub(r'uʾiȵ', r"ُؤٍ", text)
-    text = re.sub(r'uʾaȵ', r"ُؤًا", text)
-
-    text = re.sub(r'iʾuȵ', r"ِئٌ", text)
-    text = re.sub(r'iʾiȵ', r"ِئٍ", text)
-    text = re.sub(r'iʾaȵ', r"ِئًا", text)
-
-    text = re.sub(r'aʾuȵ', r"َأٌ", text)
-    text = re.sub(r'aʾiȵ', r"َأٍ", text)
-    text = re.sub(r'aʾaȵ', r"َأً", text)
-
-    # long, hamza, tanwin
-    text = re.sub(r'ūʾuȵ', r"وءٌ", text)
-    text = re.sub(r'ūʾiȵ', r"وءٍ", text)
-    text = re.sub(r'ūʾaȵ', r"وءً", text)
-
-    text = re.sub(r'īʾuȵ', r"يءٌ", text)
-    text = re.sub(r'īʾiȵ', r"يءٍ", text)
-    text = re.sub(r'īʾaȵ', r"يءً", text)
-
-    text = re.sub(r'āʾuȵ', r"اءٌ", text)
-    text = re.sub(r'āʾiȵ', r"اءٍ", text)
-    text = re.sub(r'āʾaȵ', r"اءً", text)
-
-    # long, hamza, diptote
-    text = re.sub(r'āʾu\b', r"اءُ", text)
-    text = re.sub(r'āʾi\b', r"اءِ", text)
-    text = re.sub(r'āʾa\b', r"اءَ", text)
-    
-    # medial HAMZAs
-    text = re.sub(r"aʾū", r"َؤُو", text)
-    text = re.sub(r"uʾa", r"ُؤَ", text)
-    text = re.sub(r"uʾi", r"ُئِ", text)
-
-    text = re.sub(r"ūʾu", r"ُوؤُ", text)
-    text = re.sub(r"ūʾi", r"ُوئِ", text)
-    text = re.sub(r"awʾa", r"َوْءَ", text)
-    text = re.sub(r"awʾu", r"َوْءُ", text)
-    
-    text = re.sub(r"āʾi", r"ائِ", text)
-    text = re.sub(r"aʾī", r"َئِي", text)
-    text = re.sub(r"āʾī", r"ائِي", text)
-    text = re.sub(r"āʾu", r"اؤُ", text)
-    text = re.sub(r"uʾā", r"ُؤَا", text)
-
-    text = re.sub(r"aʾa", r"َأَ", text)
-    text = re.sub(r"aʾi", r"َئِ", text)
-    text = re.sub(r"aʾu", r"َؤُ", text)
-
-    text = re.sub(r"iʾu", r"ِئُ", text)
-    text = re.sub(r"iʾi", r"ِئِ", text)
-    text = re.sub(r"iʾa", r"ِئَ", text)
-    text = re.sub(r"īʾa", r"ِيئَ", text)
-    text = re.sub(r"īʾu", r"ِيؤُ", text)
-    text = re.sub(r"iʾā", r"ِئَا", text)
-
-    text = re.sub(r"([%s])ʾa" % cnsnnts, r"\1%s" % "ْأَ", text)
-    text = re.sub(r"([%s])ʾu" % cnsnnts, r"\1%s" % "ْؤُ", text)
-    text = re.sub(r"([%s])ʾū" % cnsnnts, r"\1%s" % "ْؤُو", text)
-    text = re.sub(r"([%s])ʾi" % cnsnnts, r"\1%s" % "ْئِ", text)
-
-    text = re.sub(r"uʾu", r"ُؤُ", text)
-    text = re.sub(r"uʾū", r"ُؤُو", text)
-
-    text = re.sub(r"aʾʾā", r"َأَّا", text) # geminnated hamza # dagger alif "َأّٰ", ordinary alif ""
-    text = re.sub(r"aʾī", r"َئِي", text)
-    text = re.sub(r"āʾī", r"ائِي", text)
-    text = re.sub(r"uʾā", r"ُؤَا", text)
-
-    text = re.sub(r"uʾ([%s])" % cnsnnts, r"%s\1" % "ُؤْ", text)
-    text = re.sub(r"iʾ([%s])" % cnsnnts, r"%s\1" % "ِئْ", text)
-    text = re.sub(r"aʾ([%s])" % cnsnnts, r"%s\1" % "َأْ", text)
-
-    text = re.sub(r"aʾā", r"َآ", text) # madda: hamza, long a
-    text = re.sub(r"([%s])ʾā" % cnsnnts, r"\1%s" % "ْآ", text) # madda: sukun, hamza, long a
-
-    # pronominal suffixes
-    #text = re.sub(r"-(h[ui]|hā|k[ai]|h[ui]mā?|kumā|h[ui]nna|)\b", r"\1", text)
-
-    # consonant combinations
-    text = re.sub(r"([%s])\1" % cnsnnts, r"\1" + " ّ ".strip(), text)
-    # two consonants into C-sukun-C
-    text = re.sub(r"([%s])([%s])" % (cnsnnts,cnsnnts), r"\1%s\2" % " ْ ".strip(), text)
-    text = re.sub(r"([%s])([%s])" % (cnsnnts,cnsnnts), r"\1%s\2" % " ْ ".strip(), text)
-    # final consonant into C-sukun
-    text = re.sub(r"([%s])(\s|$)" % (cnsnnts), r"\1%s\2" % " ْ ".strip(), text)
-    # consonant + long vowel into C-shortV-longV
-    text = re.sub(r"([%s])(ā)" % (cnsnnts), r"\1%s\2" % " َ ".strip(), text)
-    text = re.sub(r"([%s])(ī)" % (cnsnnts), r"\1%s\2" % " ِ ".strip(), text)
-    text = re.sub(r"([%s])(ū)" % (cnsnnts), r"\1%s\2" % " ُ ".strip(), text)
-
-    # tanwins
-    text = re.sub(r'([%s])aȵ' % "btṯǧḥḥḫdḏrzsšṣḍṭẓʿġfḳklmnhwy", r"\1%s" % 'اً', text)
-    text = re.sub('aȵ' , ' ً '.strip(), text)
-    text = re.sub('uȵ' , ' ٌ '.strip(), text)
-    text = re.sub('iȵ' , ' ٍ '.strip(), text)
+    for guard, rules in betacodeToArabicRuleBlocks:
+        for pattern, repl in rules:
+            text = re.sub(pattern, repl, text)
 
     # silent letters
     text = re.sub('ů' , "و", text)
@@ -558,22 +556,25 @@ def betacodeToArabic(text):
     #text = re.sub("-", "ـ ـ", text)
     return(text)
 
+# language-specific replacements in betaCodeToArSimple:
+langReplacements = {
+    "ar": {},
+    "fa": {
+        "ك": "ک",
+        "ي": "ي",
+        },
+    "ur": {
+        "ك": "ک",
+        "ي": "ي",
+        }
+}
+
 def betaCodeToArSimple(text, lang_code=None):
-    text = betacodeToArabic(text)
+    text = betacodeToArabicCompiled(text)
     text = text.replace("ﭐ", "ا")
     text = deNoise(text)
-    text = re.sub(r"\bإبن\b", "ابن", text)
-    replacements = {
-        "ar": {},
-        "fa": {
-            "ك": "ک",
-            "ي": "ي",
-            },
-        "ur": {
-            "ك": "ک",
-            "ي": "ي",
-            }
-    }
+    text = ibnRegex.sub("ابن", text)
+    replacements = langReplacements
     if lang_code:
         lang_code = lang_code.lower()[:2]
         if lang_code in replacements:
@@ -582,6 +583,286 @@ def betaCodeToArSimple(text, lang_code=None):
     return(text)
     
 
+###################################################################################
+# Compiled conversion: Beginning ##################################################
+###################################################################################
+
+# betaCodeToArSimple is called for every name and title in the metadata.
+# The functions below produce the same output as betacodeToArabic and deNoise,
+# but all tables and regex patterns are compiled only once, at import:
+# - every conversion table is applied in a single pass
+#   (one regex alternation of all keys) instead of two str.replace calls per key
+# - single character replacements and deletions are done with str.translate
+#   (as in deNoise)
+# - groups of regex rules that can only match if the text contains
+#   a specific string (e.g., the hamza rules) are skipped if it does not
+
+def compileDictReplace(dic):
+    """Compile the replacements of dictReplace(text, dic) into a single regex.
+
+    dictReplace replaces the keys one after the other (first the lower case,
+    then the upper case form of every key). A single pass with an alternation
+    of the keys (in the same order) gives the same result if no replacement
+    can create or destroy a match of a later key; this is checked here.
+
+    Returns:
+        function (text -> converted text), or None if the table
+        cannot be applied in a single pass
+    """
+    rules = []
+    for k, v in dic.items():
+        k = k.strip()
+        v = v.strip()
+        if len(v) > 1:
+            vUpper = v[0].upper()+v[1:]
+        else:
+            vUpper = v.upper()
+        rules.append((k, v))
+        rules.append((k.upper(), vUpper))
+    # replacements that do not change the text can be left out:
+    rules = [(k, v) for k, v in rules if k and k != v]
+    live = []
+    for j, (k, v) in enumerate(rules):
+        earlier = [r[0] for r in rules[:j]]
+        # a key that contains an earlier key can never match:
+        if any(e in k for e in earlier):
+            continue
+        # a replacement must not create new matches of its own or later keys:
+        if set(v) & set("".join(r[0] for r in rules[j:])):
+            return None
+        # a match of this key must not overlap with a (later) match
+        # of an earlier key:
+        for t in range(1, len(k)):
+            if any(e.startswith(k[t:]) or k[t:].startswith(e) for e in earlier):
+                return None
+        live.append((k, v))
+    if not live:
+        return lambda text: text
+    table = dict()
+    for k, v in live:
+        table.setdefault(k, v)
+    pattern = re.compile("|".join(re.escape(k) for k, v in live))
+    return lambda text: pattern.sub(lambda m: table[m.group()], text)
+
+def compileRules(blocks):
+    """Compile groups of (pattern, replacement) rules.
+
+    Args:
+        blocks (list): (guard, rules) tuples; the rules of a block
+            are only applied if the guard string is in the text
+            (None: always)
+
+    Returns:
+        list of (guard, [(compiled pattern, replacement), ...]) tuples
+    """
+    return [(guard, [(re.compile(p), r) for p, r in rules]) for guard, rules in blocks]
+
+def applyRules(text, compiledBlocks):
+    """Apply compiled groups of regex rules (see compileRules) to a text"""
+    for guard, rules in compiledBlocks:
+        if guard is None or guard in text:
+            for pattern, repl in rules:
+                text = pattern.sub(repl, text)
+    return text
+
+# the regex rules of betacodeToArabic, compiled once:
+betacodeToArabicRules = compileRules(betacodeToArabicRuleBlocks)
+
+_betacodeTranslitReplace = compileDictReplace(betacodeTranslit)
+_translitArabicReplace = compileDictReplace(translitArabic)
+
+# "+" is removed, and the final vowels are not relevant for Arabic script:
+_translitFixTable = str.maketrans({"+": None, "ủ": "u", "ỉ": "i", "ả": "a"})
+# silent letters:
+_silentLettersTable = str.maketrans({"ů": "و", "å": "ا"})
+_removeDashesTable = str.maketrans({"-": None, "_": None, "ـ": None})
+
+def betacodeToArabicCompiled(text):
+    """Convert betaCode into Arabic script; faster version of betacodeToArabic,
+    using the precompiled tables and the same rules (betacodeToArabicRuleBlocks)
+
+    Examples:
+        >>> t = "raʾʾās al-ḥasan b. ʿalī"
+        >>> betacodeToArabicCompiled(t) == betacodeToArabic(t)
+        True
+    """
+    if _betacodeTranslitReplace is None:
+        text = dictReplace(text, betacodeTranslit)
+    else:
+        text = _betacodeTranslitReplace(text)
+    text = text.lower().translate(_translitFixTable)
+    text = applyRules(text, betacodeToArabicRules)
+    text = text.translate(_silentLettersTable)
+    if _translitArabicReplace is None:
+        text = dictReplace(text, translitArabic)
+    else:
+        text = _translitArabicReplace(text)
+    return text.translate(_removeDashesTable)
+
+ibnRegex = re.compile(r"\bإبن\b")
+
+###################################################################################
+# Compiled conversion: End ########################################################
+###################################################################################
+
+###################################################################################
+# Batch conversion: Beginning #####################################################
+###################################################################################
+
+# The same names and titles are converted many times, in every run
+# (e.g., the shuhra of an author is converted for every language).
+# betaCodeToArBatch converts a list of strings, converting every unique
+# string only once; the converted strings can be kept in a ConversionCache,
+# which can be stored on disk so that they are re-used in the next run.
+# The stored cache is discarded as soon as the conversion tables or rules
+# change (see conversionTablesHash).
+
+def langKey(lang_code):
+    """Get the key under which the conversions for a language code are cached
+    (all language codes without specific replacements share the key "")"""
+    if not lang_code:
+        return ""
+    lang_code = lang_code.lower()[:2]
+    if langReplacements.get(lang_code):
+        return lang_code
+    return ""
+
+def conversionTablesHash():
+    """Get an md5 hash of all tables and rules used by betaCodeToArSimple"""
+    data = [betacodeTranslit, translitArabic, betacodeToArabicRuleBlocks,
+            [sorted(t.items()) for t in [_translitFixTable, _silentLettersTable,
+                                         _removeDashesTable, noiseTable]],
+            ibnRegex.pattern, langReplacements]
+    data = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    return hashlib.md5(data.encode("utf-8")).hexdigest()
+
+class ConversionCache:
+    """A cache of betaCode strings converted into Arabic script,
+    keyed by the string and the language code (see betaCodeToArBatch).
+
+    Args:
+        cache_fp (str): path to the json file in which the cache is stored
+            (if None, the cache is only kept in memory)
+    """
+    def __init__(self, cache_fp=None):
+        self.cache_fp = cache_fp
+        self.entries = dict()  # key: language key, value: {betaCode: Arabic}
+        self.used = dict()     # key: language key, value: set of betaCode strings
+        self.stats = [0, 0]    # hits, misses
+        if cache_fp:
+            self.load()
+
+    def convert(self, texts, lang_code=None):
+        """Convert a list of betaCode strings into Arabic script
+        (only the strings that are not in the cache are converted).
+
+        Args:
+            texts (list): betaCode strings
+            lang_code (str): language code (see betaCodeToArSimple)
+
+        Returns:
+            list (the converted strings, in the same order)
+        """
+        key = langKey(lang_code)
+        converted = self.entries.setdefault(key, dict())
+        used = self.used.setdefault(key, set())
+        for text in texts:
+            if text in converted:
+                self.stats[0] += 1
+            else:
+                self.stats[1] += 1
+                converted[text] = betaCodeToArSimple(text, lang_code=key or None)
+            used.add(text)
+        return [converted[text] for text in texts]
+
+    def reset_usage(self):
+        """Forget which entries were used (and the hit/miss counts),
+        e.g., before a worker process starts on a new part of the corpus"""
+        self.used = dict()
+        self.stats = [0, 0]
+
+    def export_used(self):
+        """Get the entries used since the last reset, and the hit/miss counts
+        (to be merged into the cache of the main process).
+
+        Returns:
+            tuple (entries, stats)
+        """
+        entries = {key: {text: self.entries[key][text] for text in texts}
+                   for key, texts in self.used.items()}
+        return entries, self.stats
+
+    def merge(self, entries, stats):
+        """Add the entries and hit/miss counts exported from another cache
+        (see export_used); the merged entries count as used."""
+        for key, d in entries.items():
+            self.entries.setdefault(key, dict()).update(d)
+            self.used.setdefault(key, set()).update(d.keys())
+        self.stats[0] += stats[0]
+        self.stats[1] += stats[1]
+
+    def load(self):
+        """Load the cache from disk (start with an empty cache if the file
+        does not exist, cannot be read or was made with other conversion tables)"""
+        try:
+            with open(self.cache_fp, mode="r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get("tables") == conversionTablesHash():
+            self.entries = data["entries"]
+        else:
+            print("Conversion cache outdated: all strings will be converted again")
+
+    def save(self, prune=True):
+        """Write the cache to disk (if it has a cache file).
+
+        Args:
+            prune (bool): if True, remove all entries that were not used
+                in the current run
+        """
+        if not self.cache_fp:
+            return
+        if prune:
+            self.entries = {key: {text: d[text] for text in self.used.get(key, set())}
+                            for key, d in self.entries.items()}
+        folder = os.path.dirname(self.cache_fp)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        temp_fp = self.cache_fp + ".temp"
+        with open(temp_fp, mode="w", encoding="utf-8") as file:
+            json.dump({"tables": conversionTablesHash(), "entries": self.entries},
+                      file, ensure_ascii=False)
+        os.replace(temp_fp, self.cache_fp)
+
+    def print_stats(self):
+        """Print the number of cache hits and misses"""
+        print("Conversion cache ({}):".format(self.cache_fp))
+        print("    betaCode to Arabic: {} hits, {} misses".format(*self.stats))
+
+def betaCodeToArBatch(texts, lang_code=None, cache=None):
+    """Convert a list of betaCode strings into Arabic script
+    (with betaCodeToArSimple), converting every unique string only once.
+
+    Args:
+        texts (list): betaCode strings
+        lang_code (str): language code (see betaCodeToArSimple)
+        cache (ConversionCache): cache in which the converted strings
+            are looked up and stored; if None, the converted strings
+            are only kept during this call
+
+    Returns:
+        list (the converted strings, in the same order)
+    """
+    if cache is None:
+        cache = ConversionCache()
+    return cache.convert(texts, lang_code)
+
+###################################################################################
+# Batch conversion: End ###########################################################
+###################################################################################
+
+
 ###########################################################
 # BELOW : TESTING ZONE ####################################
 ###########################################################
@@ -626,3 +907,9 @@ def betaCodeToArSimple(text, lang_code=None):
 ###print(arabicToBetaCode(testStringArabic))
 ##print(betacodeToArabic(testBetaCode))
 ##print(betacodeToTranslit(testBetaCode))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    print("passed doctests")
@@ -0,0 +1,314 @@
+"""Graph of the relations between books (commentaries, abridgements, ...).
+
+The relations of a book with older books are recorded in the
+40#BOOK#RELATED##: key of its book yml file, in one of two formats:
+
+    COMM.sharh@0255Jahiz.Hayawan; ABR@0310Tabari.Tarikh        (new format)
+    0255Jahiz.Hayawan (COMM.sharh); 0310Tabari.Tarikh (ABR)    (old format)
+
+Every relation is an edge from the book in whose yml file it is recorded
+(the source) to the related book (the destination), with a main relation
+type (e.g., "COMM") and an optional secondary relation type
+(e.g., "sharh"). The BookRelations graph stores every edge only once
+(in a hash table), together with:
+
+* the edges of every book (as source or destination), in the order
+  in which they were added: this is the format of the
+  _book_relations.json output file (see to_dict)
+* the destinations of the edges from every book, by main relation type
+* the sources of the edges to every book, by main relation type
+  (the reverse edges)
+
+so that related books can be found (and followed transitively)
+without going through all relations.
+
+The graph can be exported to the _book_relations.json format (to_dict)
+and to a compact edge list: a tsv file with one edge per line
+(source, main_rel_type, sec_rel_type, dest; see save_edge_list).
+
+Usage example:
+    book_rels = BookRelations()
+    book_rels.add_yml_relations("0606Razi.Sharh", "COMM.sharh@0255Jahiz.Hayawan")
+    book_rels.commentaries("0255Jahiz.Hayawan")   # ["0606Razi.Sharh"]
+    book_rels.abridgements("0310Tabari.Tarikh", transitive=True)
+    book_rel_d = book_rels.to_dict()
+    book_rels.save_edge_list("output/book_relations.tsv")
+"""
+
+import collections
+import csv
+import re
+
+
+# precompiled patterns for parse_relations:
+rel_splitter_re = re.compile(r" *[;:]+ *")
+whitespace_re = re.compile(r"[ \r\n¶]+")
+old_format_type_re = re.compile(r"\(([^\)]+)")
+old_format_book_re = re.compile(r" *\(.+")
+type_splitter_re = re.compile(r" *, *")
+subtype_splitter_re = re.compile(r" *\. *")
+
+edge_fields = ["source", "main_rel_type", "sec_rel_type", "dest"]
+
+
+def parse_relations(book_uri, rels):
+    """Parse the value of the 40#BOOK#RELATED##: key of a book yml file.
+
+    Args:
+        book_uri (str): URI of the book (the source of the relations)
+        rels (str): value of the 40#BOOK#RELATED##: key
+
+    Returns:
+        list of (source, main_rel_type, sec_rel_type, dest) tuples
+
+    Examples:
+        >>> parse_relations("0606Razi.Sharh", "COMM.sharh@0255Jahiz.Hayawan; ABR@0310Tabari.Tarikh")
+        [('0606Razi.Sharh', 'COMM', 'sharh', '0255Jahiz.Hayawan'), ('0606Razi.Sharh', 'ABR', '', '0310Tabari.Tarikh')]
+        >>> parse_relations("0606Razi.Sharh", "0255Jahiz.Hayawan (COMM.sharh, ABR)")
+        [('0606Razi.Sharh', 'COMM', 'sharh', '0255Jahiz.Hayawan'), ('0606Razi.Sharh', 'ABR', '', '0255Jahiz.Hayawan')]
+        >>> parse_relations("0606Razi.Sharh", "URI of the related book")
+        []
+    """
+    edges = []
+    rels = rels.strip()
+    if rels.startswith("URI of"):  # default value in the yml template
+        return edges
+    rels = whitespace_re.sub(" ", rels)
+    for rel in rel_splitter_re.split(rels):
+        if not rel.strip():
+            continue
+        if "@" in rel:  # new format: COMM.sharh@0255Jahiz.Hayawan
+            parts = rel.strip().split("@")
+            rel_types = parts[0]
+            rel_book = parts[1]
+        else:           # old format: 0255Jahiz.Hayawan (COMM.sharh)
+            m = old_format_type_re.search(rel)
+            if not m:
+                print(book_uri, ":")
+                print("    no relationship type found in ", [rel])
+                continue
+            rel_types = m.group(1).strip()
+            rel_book = old_format_book_re.sub("", rel).strip()
+        for rel_type in type_splitter_re.split(rel_types):
+            if "." in rel_type:
+                main_rel_type, sec_rel_type = subtype_splitter_re.split(rel_type)[:2]
+            else:
+                main_rel_type = rel_type
+                sec_rel_type = ""
+            edges.append((book_uri, main_rel_type, sec_rel_type, rel_book))
+    return edges
+
+def edge_to_dict(edge):
+    """Convert an edge tuple into a relation dictionary
+    (the format of the _book_relations.json file)"""
+    return dict(zip(edge_fields, edge))
+
+def dict_to_edge(rel):
+    """Convert a relation dictionary into an edge tuple"""
+    return tuple(rel[k] for k in edge_fields)
+
+
+class BookRelations:
+    """An indexed graph of the relations between books.
+
+    Examples:
+        >>> g = BookRelations()
+        >>> g.add_yml_relations("0606Razi.Sharh", "COMM.sharh@0255Jahiz.Hayawan")
+        >>> g.add_yml_relations("0700Ibn.Hashiya", "COMM.hashiya@0606Razi.Sharh")
+        >>> g.add_yml_relations("0400Ibn.Mukhtasar", "ABR@0255Jahiz.Hayawan")
+        >>> g.add("0606Razi.Sharh", "COMM", "sharh", "0255Jahiz.Hayawan")  # already in the graph
+        False
+        >>> len(g), "0255Jahiz.Hayawan" in g, "0310Tabari.Tarikh" in g
+        (3, True, False)
+
+        Lookups in both directions, by main relation type:
+
+        >>> g.related("0606Razi.Sharh")
+        ['0255Jahiz.Hayawan']
+        >>> g.related("0255Jahiz.Hayawan", reverse=True)
+        ['0606Razi.Sharh', '0400Ibn.Mukhtasar']
+        >>> g.commentaries("0255Jahiz.Hayawan")
+        ['0606Razi.Sharh']
+        >>> g.commentaries("0255Jahiz.Hayawan", transitive=True)
+        ['0606Razi.Sharh', '0700Ibn.Hashiya']
+        >>> g.abridgements("0255Jahiz.Hayawan")
+        ['0400Ibn.Mukhtasar']
+        >>> g.related("0310Tabari.Tarikh", "COMM")
+        []
+        >>> [r["source"] for r in g.relations("0606Razi.Sharh", as_source=False)]
+        ['0700Ibn.Hashiya']
+
+        The _book_relations.json format keeps the order of the relations:
+
+        >>> g2 = BookRelations.from_dict(g.to_dict())
+        >>> g2.to_dict() == g.to_dict(), list(g2.edges) == list(g.edges)
+        (True, True)
+    """
+    def __init__(self):
+        self.edges = dict()      # key: edge tuple, value: None (an ordered set)
+        self.book_edges = dict() # key: book URI, value: list of edges of the book
+        # adjacency by main relation type (the books are the keys of ordered dicts):
+        self.out_edges = dict()  # key: source, value: {main_rel_type: {dest: None}}
+        self.in_edges = dict()   # key: dest, value: {main_rel_type: {source: None}}
+
+    def __len__(self):
+        return len(self.edges)
+
+    def __contains__(self, book_uri):
+        return book_uri in self.book_edges
+
+    def add(self, source, main_rel_type, sec_rel_type, dest):
+        """Add an edge to the graph (if it is not in the graph yet).
+
+        Returns:
+            bool (True if the edge was added)
+        """
+        edge = (source, main_rel_type, sec_rel_type, dest)
+        if edge in self.edges:
+            return False
+        self.edges[edge] = None
+        self.book_edges.setdefault(source, []).append(edge)
+        if dest != source:
+            self.book_edges.setdefault(dest, []).append(edge)
+        out_d = self.out_edges.setdefault(source, dict())
+        out_d.setdefault(main_rel_type, dict())[dest] = None
+        in_d = self.in_edges.setdefault(dest, dict())
+        in_d.setdefault(main_rel_type, dict())[source] = None
+        return True
+
+    def add_dict(self, rel):
+        """Add a relation in the format of the _book_relations.json file"""
+        return self.add(*dict_to_edge(rel))
+
+    def add_yml_relations(self, book_uri, rels):
+        """Add the relations from the 40#BOOK#RELATED##: key
+        of a book yml file (see parse_relations)"""
+        for edge in parse_relations(book_uri, rels):
+            self.add(*edge)
+
+    def merge(self, other):
+        """Add all edges of another graph (in the order in which
+        they were added to it)"""
+        for edge in other.edges:
+            self.add(*edge)
+
+    def relations(self, book_uri, as_source=None):
+        """Get the relations of a book, as relation dictionaries.
+
+        Args:
+            book_uri (str): URI of the book
+            as_source (bool): if True, only relations of which the book
+                is the source; if False, only those of which it is
+                the destination; if None, both
+
+        Returns:
+            list of dicts
+        """
+        return [edge_to_dict(edge) for edge in self.book_edges.get(book_uri, [])
+                if as_source is None or (edge[0] == book_uri) == as_source]
+
+    def related(self, book_uri, rel_type=None, reverse=False):
+        """Get the books to which a book is related
+        (or, if reverse is True, the books that are related to the book).
+
+        Args:
+            book_uri (str): URI of the book
+            rel_type (str): main relation type (e.g., "COMM");
+                if None, all relation types
+            reverse (bool): if True, follow the edges in reverse direction
+
+        Returns:
+            list of book URIs
+        """
+        d = (self.in_edges if reverse else self.out_edges).get(book_uri, dict())
+        if rel_type is not None:
+            return list(d.get(rel_type, dict()))
+        related = dict()
+        for books in d.values():
+            related.update(books)
+        return list(related)
+
+    def traverse(self, book_uri, rel_type=None, reverse=False):
+        """Follow the relations of a book transitively (breadth-first),
+        e.g., the abridgements of the abridgements of a book.
+
+        Args:
+            (see related)
+
+        Returns:
+            list of book URIs (in the order in which they were reached,
+            without the book itself)
+        """
+        seen = {book_uri}
+        found = []
+        todo = collections.deque([book_uri])
+        while todo:
+            for b in self.related(todo.popleft(), rel_type=rel_type, reverse=reverse):
+                if b not in seen:
+                    seen.add(b)
+                    found.append(b)
+                    todo.append(b)
+        return found
+
+    def commentaries(self, book_uri, transitive=False):
+        """Get the commentaries on a book (the books that have a COMM
+        relation with the book; if transitive is True, also the
+        commentaries on those commentaries, etc.)"""
+        if transitive:
+            return self.traverse(book_uri, "COMM", reverse=True)
+        return self.related(book_uri, "COMM", reverse=True)
+
+    def abridgements(self, book_uri, transitive=False):
+        """Get the abridgements of a book (the books that have an ABR
+        relation with the book; if transitive is True, the whole chain
+        of abridgements of abridgements)"""
+        if transitive:
+            return self.traverse(book_uri, "ABR", reverse=True)
+        return self.related(book_uri, "ABR", reverse=True)
+
+    def to_dict(self):
+        """Export the graph in the format of the _book_relations.json file.
+
+        Returns:
+            dict (key: book URI, value: list of the relation dictionaries
+                of the book, as source or destination)
+        """
+        return {book_uri: [edge_to_dict(edge) for edge in edges]
+                for book_uri, edges in self.book_edges.items()}
+
+    @classmethod
+    def from_dict(cls, book_rel_d):
+        """Build a graph from the contents of a _book_relations.json file"""
+        book_rels = cls()
+        for rels in book_rel_d.values():
+            for rel in rels:
+                book_rels.add_dict(rel)
+        # keep the order of the relations of every book:
+        book_rels.book_edges = {book_uri: [dict_to_edge(rel) for rel in rels]
+                                for book_uri, rels in book_rel_d.items()}
+        return book_rels
+
+    def save_edge_list(self, fp):
+        """Save the graph as a tsv file with one edge per line
+        (columns: source, main_rel_type, sec_rel_type, dest)"""
+        with open(fp, mode="w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file, delimiter="\t", lineterminator="\n")
+            writer.writerow(edge_fields)
+            writer.writerows(self.edges)
+
+    @classmethod
+    def load_edge_list(cls, fp):
+        """Build a graph from an edge list tsv file (see save_edge_list)"""
+        book_rels = cls()
+        with open(fp, mode="r", encoding="utf-8", newline="") as file:
+            reader = csv.reader(file, delimiter="\t")
+            next(reader, None)
+            for row in reader:
+                book_rels.add(*row)
+        return book_rels
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    print("passed doctests")
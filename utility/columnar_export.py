@@ -0,0 +1,187 @@
+"""Columnar export of the rows of the metadata_light tsv file, with typed columns.
+
+In the tsv file, all values are strings: the token and character lengths,
+the booleans ("True"/"False") and the tags (joined with " :: ")
+have to be parsed again by every program that uses the file.
+This module writes the same rows column by column, with real types:
+
+* tok_length, char_length, date: integers (missing values: null in Parquet,
+  -1 in npz files)
+* uncorrected_OCR: boolean
+* tags: list of strings
+* all other columns: dictionary-encoded strings
+
+Two formats are supported (depending on the extension of the output path):
+
+* .parquet: an Apache Parquet file (requires pyarrow); the string
+  columns are dictionary-encoded, the tags are a list<string> column.
+* .npz: a NumPy archive (requires numpy). Every column is stored as
+  one or more arrays, which are only loaded when they are accessed:
+  - integer and boolean columns: `<col>` (int64 / bool array)
+  - string columns: `<col>.codes` (int32 array) and `<col>.values`
+    (the distinct strings); value of row i: values[codes[i]]
+  - list columns: `<col>.codes` (the codes of all list items, concatenated),
+    `<col>.offsets` (start of the items of row i: offsets[i],
+    end: offsets[i+1]) and `<col>.values`
+
+Usage example:
+    save_columnar("output/metadata_light.parquet", header, rows)
+    columns = load_columnar("output/metadata_light.npz",
+                            columns=["versionUri", "tok_length"])
+"""
+
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+int_columns = ["tok_length", "char_length", "date"]
+bool_columns = ["uncorrected_OCR"]
+list_columns = ["tags"]
+list_sep = " :: "
+
+
+def to_int(s):
+    """Convert a string to an integer (None if it is not a number)"""
+    s = s.strip()
+    if s.isdigit():
+        return int(s)
+    return None
+
+def typed_columns(header, rows):
+    """Convert tsv rows into typed columns.
+
+    Args:
+        header (list): column names
+        rows (iterable): lists of string values (one per column)
+
+    Returns:
+        dict (key: column name, value: list of typed values)
+    """
+    columns = {col: [] for col in header}
+    convert = []
+    for col in header:
+        if col in int_columns:
+            convert.append(to_int)
+        elif col in bool_columns:
+            convert.append(lambda s: s == "True")
+        elif col in list_columns:
+            convert.append(lambda s: [x for x in s.split(list_sep) if x])
+        else:
+            convert.append(None)
+    lists = [columns[col] for col in header]
+    for row in rows:
+        for values, func, s in zip(lists, convert, row):
+            values.append(func(s) if func else s)
+    return columns
+
+def dictionary_encode(values):
+    """Encode a list of strings as a list of codes and a list of distinct strings"""
+    index = dict()
+    codes = [index.setdefault(v, len(index)) for v in values]
+    return codes, list(index)
+
+def save_as_parquet(fp, columns):
+    """Write typed columns to a Parquet file (see typed_columns)"""
+    if pa is None:
+        raise ImportError("Saving Parquet files requires pyarrow (pip install pyarrow)")
+    arrays = dict()
+    for col, values in columns.items():
+        if col in int_columns:
+            arrays[col] = pa.array(values, type=pa.int64())
+        elif col in bool_columns:
+            arrays[col] = pa.array(values, type=pa.bool_())
+        elif col in list_columns:
+            arrays[col] = pa.array(values, type=pa.list_(pa.string()))
+        else:
+            arrays[col] = pa.array(values, type=pa.string()).dictionary_encode()
+    pq.write_table(pa.table(arrays), fp)
+
+def save_as_npz(fp, columns):
+    """Write typed columns to a NumPy .npz archive (see typed_columns)"""
+    if np is None:
+        raise ImportError("Saving npz files requires numpy (pip install numpy)")
+    arrays = dict()
+    for col, values in columns.items():
+        if col in int_columns:
+            arrays[col] = np.array([-1 if v is None else v for v in values], dtype=np.int64)
+        elif col in bool_columns:
+            arrays[col] = np.array(values, dtype=bool)
+        elif col in list_columns:
+            offsets = [0]
+            for items in values:
+                offsets.append(offsets[-1] + len(items))
+            codes, distinct = dictionary_encode([x for items in values for x in items])
+            arrays[col+".codes"] = np.array(codes, dtype=np.int32)
+            arrays[col+".offsets"] = np.array(offsets, dtype=np.int64)
+            arrays[col+".values"] = np.array(distinct, dtype=str)
+        else:
+            codes, distinct = dictionary_encode(values)
+            arrays[col+".codes"] = np.array(codes, dtype=np.int32)
+            arrays[col+".values"] = np.array(distinct, dtype=str)
+    # write to an open file so that numpy does not add the .npz extension:
+    with open(fp, mode="wb") as file:
+        np.savez_compressed(file, **arrays)
+
+def save_columnar(fp, header, rows):
+    """Write tsv rows to a columnar file with typed columns
+    (Parquet if the path ends with .parquet, otherwise NumPy npz).
+
+    Args:
+        fp (str): path to the output file
+        header (list): column names
+        rows (iterable): lists of string values (one per column)
+    """
+    folder = os.path.dirname(fp)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    columns = typed_columns(header, rows)
+    if fp.endswith(".parquet"):
+        save_as_parquet(fp, columns)
+    else:
+        save_as_npz(fp, columns)
+
+def load_columnar(fp, columns=None):
+    """Load (some) columns from a file created by save_columnar.
+
+    Args:
+        fp (str): path to the Parquet or npz file
+        columns (list): names of the columns to be loaded (None: all columns)
+
+    Returns:
+        dict (key: column name, value: list of typed values)
+    """
+    if fp.endswith(".parquet"):
+        if pa is None:
+            raise ImportError("Loading Parquet files requires pyarrow (pip install pyarrow)")
+        return pq.read_table(fp, columns=columns).to_pydict()
+    if np is None:
+        raise ImportError("Loading npz files requires numpy (pip install numpy)")
+    loaded = dict()
+    with np.load(fp) as npz:
+        names = {k.split(".")[0] for k in npz.files}
+        for col in sorted(names) if columns is None else columns:
+            if col in npz.files:
+                values = npz[col].tolist()
+                if col in int_columns:
+                    values = [None if v == -1 else v for v in values]
+                loaded[col] = values
+            elif col+".offsets" in npz.files:
+                distinct = npz[col+".values"].tolist()
+                codes = npz[col+".codes"].tolist()
+                offsets = npz[col+".offsets"].tolist()
+                loaded[col] = [[distinct[c] for c in codes[offsets[i]:offsets[i+1]]]
+                               for i in range(len(offsets)-1)]
+            else:
+                distinct = npz[col+".values"].tolist()
+                loaded[col] = [distinct[c] for c in npz[col+".codes"].tolist()]
+    return loaded
@@ -36,6 +36,21 @@ meta_yml_fp = None
 meta_json_fp = None
 meta_header_fp = None
 
+# path to the extraction cache file (metadata extracted from files that
+# did not change since the previous run will be taken from this cache):
+extraction_cache_fp = "./cache/extraction_cache.json"
+
+# path to the header index file (position of the end of the metadata header
+# in every text file):
+header_index_fp = "./cache/header_index.json"
+
+# path to the local store of the GitHub issues (only issues that were updated
+# since the previous run are downloaded from GitHub):
+issue_store_fp = "./cache/github_issues.sqlite"
+
+# path to the srt index file (links to the passim srt folders of every text):
+srt_index_fp = "./cache/srt_index.json"
+
 # List of lists (description, run_id on server):  
 passim_runs = [['2017 (V1)', 'passim1017'],
                ['2019.1.1', 'passim01022019'],
@@ -42,6 +42,81 @@ meta_yml_fp = None
 meta_json_fp = None
 meta_header_fp = None
 
+# path to the extraction cache file (metadata extracted from files that
+# did not change since the previous run will be taken from this cache;
+# e.g., "./cache/extraction_cache.json"). Set to None to disable the cache:
+extraction_cache_fp = None
+
+# number of processes used to collect the metadata
+# (the 25-years repos / author folders are processed in parallel):
+n_processes = 1
+
+# path to the header index file (position of the end of the metadata header
+# in every text file, so that headers and text bodies can be read without
+# searching for the end of the header; e.g., "./cache/header_index.json").
+# Set to None to disable the header index:
+header_index_fp = None
+
+# Set to True to measure the peak memory use of every phase of the run
+# in the run report (using tracemalloc; this makes the run considerably slower):
+trace_memory = False
+
+# path to the local store of the GitHub issues (only issues that were updated
+# since the previous run are downloaded from GitHub;
+# e.g., "./cache/github_issues.sqlite"). Set to None to download all issues:
+issue_store_fp = None
+
+# path to the srt index file (links to the passim srt folders of every text,
+# rebuilt only if the html files in utility/srt or the passim runs change;
+# e.g., "./cache/srt_index.json"). Set to None to read the html files every run:
+srt_index_fp = None
+
+# path to the SQLite database into which all metadata is written
+# (e.g., "./output/metadata.sqlite"). Set to None to skip the SQLite output:
+sqlite_fp = None
+
+# path to the columnar export of the metadata_light rows, with typed columns
+# (".parquet": requires pyarrow; ".npz": requires numpy;
+# e.g., "./output/metadata_light.parquet"). Set to None to skip this export:
+columnar_fp = None
+
+# format of the json output files: "json", "jsonl" (JSON Lines: one record
+# per line, sorted by URI) or "jsonl.gz" (gzip-compressed JSON Lines).
+# This applies to all json output files; NB: the JSON Lines version
+# of the metadata_light json file contains only the records,
+# without the date and time of the run:
+json_format = "json"
+
+# Set to True to write the yml data of every author, book, location and
+# manuscript only once in the master yml file (the version and transcription
+# records refer to it by URI; see utility/master_yml.py):
+compact_yml = False
+
+# number of versions whose yml files and text file headers are read ahead
+# in background threads while the current version is processed
+# (useful if the corpus is on a network file system). 0: no prefetching:
+prefetch_depth = 0
+
+# Set to True to save the book relations also as a compact edge list
+# (a tsv file with one relation per line: source, main_rel_type,
+# sec_rel_type, dest; next to the _book_relations.json file):
+book_rel_edges = False
+
+# path to the conversion cache file (names and titles converted from betaCode
+# into Arabic script in previous runs; discarded if the conversion tables change;
+# e.g., "./cache/conversion_cache.json"). Set to None to keep it only in memory:
+conversion_cache_fp = None
+
+# list of collection IDs (the letters at the start of the version IDs;
+# e.g., ["Noorlib"]) whose texts should be excluded from the metadata:
+exclude_collections = []
+
+# config files of additional profiles: the metadata of every profile is built
+# from a single scan of the corpus, with the profile's own exclude,
+# exclude_collections, split_ar_lat, output_files_path, output files, ...
+# (see utility/profiles.py; e.g., ["utility/config_RELEASE_2021_wo_Noorlib.py"]):
+profiles = []
+
 # List of lists (description, run_id on server):  
 passim_runs = [['2017 (V1)', 'passim1017'],
                ['2019.1.1', 'passim01022019'],
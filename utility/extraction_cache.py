@@ -0,0 +1,259 @@
+"""Persistent cache for the metadata extracted from the corpus files.
+
+The metadata of most text versions does not change between two runs
+of generate-metadata.py. The ExtractionCache stores the result of every
+extraction step on disk, together with a fingerprint
+(size, modification time, md5 hash) of each file the step has read.
+In the next run, a stored result is only reused if none of these files
+has changed; the metadata of all other files is extracted again.
+
+Files are only hashed if their size is unchanged but their modification
+time is not (e.g., because a git command has rewritten them);
+the hash is stored with the new extraction result, so that the next
+rewrite of an unchanged file does not invalidate the result.
+
+Usage example:
+    cache = ExtractionCache("./cache/extraction_cache.json")
+    meta = cache.get("header", fp, [fp])
+    if meta is None:
+        meta = extract_metadata_from_header(fp)
+        cache.set("header", fp, [fp], meta)
+    cache.save()
+    cache.print_stats()
+"""
+
+import copy
+import hashlib
+import json
+import os
+
+
+class ExtractionCache:
+    """An on-disk store of extraction results, keyed by kind and key.
+
+    Args:
+        cache_fp (str): path to the json file in which the cache is stored
+            (None: the cache is only kept in memory, e.g., to share
+            the extraction results between several profiles of a run)
+        salt_fps (list): paths to files on which all cached results depend
+            (e.g., the script itself and the conversion tables).
+            If any of these files changes, the whole cache is discarded.
+        stat (function): function used to get the size and modification
+            time of a file (default: os.stat; e.g., CorpusInventory.stat)
+        salt (str): other data on which all cached results depend
+            (e.g., the version of a library); if it changes,
+            the whole cache is discarded.
+    """
+    def __init__(self, cache_fp, salt_fps=[], stat=os.stat, salt=""):
+        self.cache_fp = cache_fp
+        self.stat = stat
+        self.hashes = dict()
+        self.salt = self.make_salt(salt_fps, salt)
+        self.entries = dict()
+        self.used = dict()
+        self.frozen = dict()
+        self.stats = dict()
+        self.load()
+
+    def make_salt(self, salt_fps, salt=""):
+        """Combine the md5 hashes of all salt files (and the salt string)
+        into a single string"""
+        return "|".join([str(self.md5(fp)) for fp in salt_fps] + [salt])
+
+    def md5(self, fp):
+        """Get the md5 hash of a file's content (None if it does not exist).
+
+        Hashes are stored per (path, size, mtime) so that a file
+        is read only once per run even if it is checked many times."""
+        try:
+            st = self.stat(fp)
+        except OSError:
+            return None
+        k = (fp, st.st_size, st.st_mtime_ns)
+        if k not in self.hashes:
+            h = hashlib.md5()
+            with open(fp, mode="rb") as file:
+                for chunk in iter(lambda: file.read(1<<20), b""):
+                    h.update(chunk)
+            self.hashes[k] = h.hexdigest()
+        return self.hashes[k]
+
+    def fingerprint(self, fp):
+        """Get the fingerprint of a file: [size, mtime, md5] (None if missing).
+
+        The file is not read: the md5 hash is only included if it was
+        computed in this run (see is_fresh); otherwise it is None."""
+        try:
+            st = self.stat(fp)
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns,
+                self.hashes.get((fp, st.st_size, st.st_mtime_ns))]
+
+    def is_fresh(self, files):
+        """Check whether none of the files has changed since it was cached.
+
+        Size and modification time are checked first; the (more expensive)
+        content hash is only computed if the size is the same
+        but the modification time has changed, e.g., because a git command
+        has rewritten an unchanged file. If no hash was stored for the file,
+        it is considered changed (but its hash is kept for the fingerprint
+        of the new extraction result; for this reason, all files are checked
+        even if an earlier file has changed).
+
+        Args:
+            files (dict): key: file path, value: fingerprint of the file
+                at the moment it was cached
+
+        Returns:
+            bool
+        """
+        fresh = True
+        for fp, stored in files.items():
+            try:
+                st = self.stat(fp)
+            except OSError:
+                st = None
+            if st is None or stored is None:
+                if st is not stored:
+                    fresh = False
+                continue
+            if st.st_size != stored[0]:
+                fresh = False
+            elif st.st_mtime_ns != stored[1]:
+                if self.md5(fp) != stored[2] or stored[2] is None:
+                    fresh = False
+                else:
+                    # content unchanged: store new mtime to avoid hashing next time
+                    stored[1] = st.st_mtime_ns
+        return fresh
+
+    def get(self, kind, key, input_fps):
+        """Get a cached extraction result.
+
+        Args:
+            kind (str): the type of extraction (e.g., "author", "header")
+            key (str): the key of the result (usually a file path)
+            input_fps (list): paths of all files the extraction depends on
+
+        Returns:
+            a (deep) copy of the cached result, or None if the result
+            is not in the cache or one of the input files has changed
+            (frozen entries are returned without checking the files;
+            see freeze).
+        """
+        if kind not in self.stats:
+            self.stats[kind] = [0, 0]
+        entry = self.entries.get(kind, dict()).get(key)
+        if entry and sorted(entry["files"]) == sorted(input_fps) \
+           and (key in self.frozen.get(kind, set()) or self.is_fresh(entry["files"])):
+            self.stats[kind][0] += 1
+            self.used.setdefault(kind, set()).add(key)
+            return copy.deepcopy(entry["value"])
+        self.stats[kind][1] += 1
+        return None
+
+    def set(self, kind, key, input_fps, value):
+        """Store an extraction result in the cache.
+
+        NB: the fingerprints of the input files are taken at this moment,
+            so the result must be stored before any of the input files is
+            changed by the script.
+
+        Args:
+            kind (str): the type of extraction (e.g., "author", "header")
+            key (str): the key of the result (usually a file path)
+            input_fps (list): paths of all files the extraction depends on
+            value (json-serializable object): the extraction result
+        """
+        files = {fp: self.fingerprint(fp) for fp in input_fps}
+        if kind not in self.entries:
+            self.entries[kind] = dict()
+        self.entries[kind][key] = {"files": files,
+                                   "value": copy.deepcopy(value)}
+        self.used.setdefault(kind, set()).add(key)
+
+    def freeze(self):
+        """Return the entries used since the last reset without checking
+        their input files from now on.
+
+        The results of a scan of the corpus can then be reused
+        for several outputs, even if the script has changed some of
+        the input files during the scan (e.g., the token counts
+        in the version yml files).
+        """
+        self.frozen = {kind: set(keys) for kind, keys in self.used.items()}
+
+    def reset_usage(self):
+        """Forget which entries were used (and the hit/miss counts),
+        e.g., before a worker process starts on a new part of the corpus"""
+        self.used = dict()
+        self.stats = dict()
+
+    def export_used(self):
+        """Get the entries used since the last reset, and the hit/miss counts
+        (to be merged into the cache of the main process).
+
+        Returns:
+            tuple (entries, stats)
+        """
+        entries = {kind: {k: self.entries[kind][k] for k in keys}
+                   for kind, keys in self.used.items()}
+        return entries, self.stats
+
+    def merge(self, entries, stats):
+        """Add the entries and hit/miss counts exported from another cache
+        (see export_used); the merged entries count as used."""
+        for kind, d in entries.items():
+            if kind not in self.entries:
+                self.entries[kind] = dict()
+            self.entries[kind].update(d)
+            self.used.setdefault(kind, set()).update(d.keys())
+        for kind, (hits, misses) in stats.items():
+            if kind not in self.stats:
+                self.stats[kind] = [0, 0]
+            self.stats[kind][0] += hits
+            self.stats[kind][1] += misses
+
+    def load(self):
+        """Load the cache from disk (start with an empty cache if the file
+        does not exist, cannot be read or was made with other salt files)"""
+        if not self.cache_fp:
+            return
+        try:
+            with open(self.cache_fp, mode="r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get("salt") == self.salt:
+            self.entries = data["entries"]
+        else:
+            print("Extraction cache outdated: all metadata will be extracted")
+
+    def save(self, prune=True):
+        """Write the cache to disk.
+
+        Args:
+            prune (bool): if True, remove all entries that were not used
+                in the current run (e.g., for files that were deleted)
+        """
+        if not self.cache_fp:
+            return
+        if prune:
+            self.entries = {kind: {k: v for k, v in d.items()
+                                   if k in self.used.get(kind, set())}
+                            for kind, d in self.entries.items()}
+        folder = os.path.dirname(self.cache_fp)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        temp_fp = self.cache_fp + ".temp"
+        with open(temp_fp, mode="w", encoding="utf-8") as file:
+            json.dump({"salt": self.salt, "entries": self.entries}, file,
+                      ensure_ascii=False)
+        os.replace(temp_fp, self.cache_fp)
+
+    def print_stats(self):
+        """Print the number of cache hits and misses for each kind"""
+        print("Extraction cache ({}):".format(self.cache_fp or "in memory"))
+        for kind, (hits, misses) in sorted(self.stats.items()):
+            print("    {}: {} hits, {} misses".format(kind, hits, misses))
@@ -14,44 +14,160 @@ Usage example:
 
 from github import Github
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 URI_REGEX = r"\d{4}[A-Z][a-zA-Z]+(?:\.[A-Z][a-zA-Z]+)?(?:\.\w+-[a-z]{3}\d+)?"
+uri_re = re.compile(URI_REGEX)
+old_uri_re = re.compile("OLD URI.+?"+URI_REGEX)
 
 
-def define_text_uris(issues, verbose=False):
+def find_uri(s, regex=uri_re):
+    """Get the first match of a (compiled) URI regex in a string
+    (None if there is no match)"""
+    m = regex.search(s or "")
+    if m:
+        return m.group(0)
+    return None
+
+
+class CommentFetcher:
+    """Download the comments of many issues concurrently.
+
+    The comments of every issue are downloaded in a separate thread
+    (with a maximum of n_threads threads at the same time).
+    If the GitHub API refuses a request because the rate limit
+    was exceeded (status 403 or 429), all threads pause until the time
+    given in the Retry-After or X-RateLimit-Reset header of the response
+    (or, if these headers are missing, with exponential backoff),
+    after which the request is tried again.
+
+    Args:
+        n_threads (int): maximum number of concurrent requests
+        max_retries (int): maximum number of times a request is retried
+        backoff (float): waiting time (in seconds) before the first retry
+            if the response does not contain rate limit headers;
+            doubled for every next retry
+        max_wait (float): maximum waiting time in seconds before a retry
+    """
+    def __init__(self, n_threads=8, max_retries=5, backoff=1.0, max_wait=900):
+        self.n_threads = n_threads
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.resume_at = 0
+        self.lock = threading.Lock()
+        self.n_retries = 0
+
+    def rate_limit_error(self, e):
+        """Get the response headers of a rate limit error
+        (None if the exception is not a rate limit error)"""
+        # PyGithub's GithubException or requests' HTTPError:
+        status = getattr(e, "status", None)
+        headers = getattr(e, "headers", None)
+        response = getattr(e, "response", None)
+        if response is not None:
+            status = response.status_code
+            headers = response.headers
+        if status in (403, 429):
+            return headers or dict()
+        return None
+
+    def retry_delay(self, headers, attempt):
+        """Get the number of seconds to wait before the next attempt"""
+        if headers.get("Retry-After"):
+            delay = float(headers["Retry-After"])
+        elif headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset"):
+            delay = float(headers["X-RateLimit-Reset"]) - time.time()
+        else:
+            delay = self.backoff * 2**attempt
+        return min(max(delay, 0), self.max_wait)
+
+    def pause(self, delay):
+        """Make all threads wait `delay` seconds before their next request"""
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.time() + delay)
+            self.n_retries += 1
+
+    def wait(self):
+        """Wait until the rate limit pause is over"""
+        delay = self.resume_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def get_comments(self, issue):
+        """Get the bodies of all comments of an issue"""
+        for attempt in range(self.max_retries+1):
+            self.wait()
+            try:
+                return [c.body for c in issue.get_comments()]
+            except Exception as e:
+                headers = self.rate_limit_error(e)
+                if headers is None or attempt == self.max_retries:
+                    raise
+                self.pause(self.retry_delay(headers, attempt))
+
+    def fetch(self, issues):
+        """Download the comments of a list of issues.
+
+        Returns:
+            list (for every issue, the list of its comment bodies)
+        """
+        if self.n_threads < 2 or len(issues) < 2:
+            return [self.get_comments(issue) for issue in issues]
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            return list(executor.map(self.get_comments, issues))
+
+
+def define_text_uris(issues, verbose=False, n_threads=8, title_suffix=""):
     """Define which text uri the issue pertains to.
     Store the uri in the issue object (issue.uri).
 
+    The uri is taken from the title of the issue; if it is not found there,
+    from the body of the issue (preferably after "OLD URI"), and only then
+    from the comments of the issue. The comments of all issues that need
+    them are downloaded concurrently (see CommentFetcher).
+
     Args:
         issues (list): a list of github issue objects.
         verbose (bool): if verbose, print issues for which no uris were found.
+        n_threads (int): maximum number of concurrent requests
+            for downloading comments
+        title_suffix (str): string added to the stripped title
+            before looking for a uri in it. Issue titles often contain
+            a version uri without its language code
+            (e.g., "0255Jahiz.Hayawan.Sham19Y0023775"), of which URI_REGEX
+            only matches the book uri; with title_suffix="-ara1",
+            the complete version uri is found (as in the openiti library)
 
     Returns:
         issues (list): the list of updated github issue objects
     """
+    issues = list(issues)
+    with_comments = []
     for issue in issues:
-        if re.findall(URI_REGEX, issue.title):
-            issue.uri = re.findall(URI_REGEX, issue.title)[0]
-        elif re.findall("OLD URI.+?"+URI_REGEX, issue.body):
-            issue.uri = re.findall("OLD URI.+?"+URI_REGEX, issue.body)[0]
-        elif re.findall(URI_REGEX, issue.body):
-            issue.uri = re.findall(URI_REGEX, issue.body)[0]
-        elif issue.comments:
-            for c in issue.get_comments():
-                if re.findall(URI_REGEX, c.body):
-                    issue.uri = re.findall(URI_REGEX, c.body)[0]
-                    break
-                issue.uri = ""
-        else:
-            issue.uri = ""
-            if verbose:
-                print("no uri found")
-                print("    number:", issue.number)
-                print("    title:", issue.title)
-                print("    body:", issue.body)
-                print("    comments:", [x.body for x in issue.get_comments()])
-                input("Press enter to continue")
-        #print("issue.uri:", issue.uri)
+        title = issue.title.strip()+title_suffix if title_suffix else issue.title
+        issue.uri = find_uri(title) or find_uri(issue.body, old_uri_re) \
+                    or find_uri(issue.body) or ""
+        if issue.uri:
+            continue
+        if issue.comments:
+            with_comments.append(issue)
+        elif verbose:
+            print("no uri found")
+            print("    number:", issue.number)
+            print("    title:", issue.title)
+            print("    body:", issue.body)
+            print("    comments:", [x.body for x in issue.get_comments()])
+            input("Press enter to continue")
+    comments = CommentFetcher(n_threads=n_threads).fetch(with_comments)
+    for issue, bodies in zip(with_comments, comments):
+        for body in bodies:
+            uri = find_uri(body)
+            if uri:
+                issue.uri = uri
+                break
     return issues
 
 
@@ -0,0 +1,207 @@
+"""Persistent index of the position of the metadata header in text files.
+
+Both the extraction of the metadata from the text file header and
+the token count of the text body need to know where the OpenITI header
+(which ends with the line containing "#META#Header#End#") ends;
+normally, this is found by reading the file line by line from the start.
+The HeaderIndex stores the byte offsets of the header end line of every
+text file in a sidecar json file, together with the size and modification
+time of the file, so that in the next run the header can be read
+as a single block of bytes and the body can be read directly from
+the end of the header. The offsets are looked up again only
+for files that were changed.
+
+Usage example:
+    header_index = HeaderIndex("./cache/header_index.json")
+    header = header_index.read_header(fp)
+    body = header_index.read_body(fp)
+    header_index.save()
+"""
+
+import io
+import os
+
+try:
+    from utility.extraction_cache import ExtractionCache
+except ImportError:
+    from extraction_cache import ExtractionCache
+
+
+header_splitter = "#META#Header#End"
+
+
+class HeaderIndex(ExtractionCache):
+    """An on-disk index of the header end of text files.
+
+    The entries are stored (and shared between worker processes)
+    in the same way as those of the ExtractionCache, but the fingerprint
+    of a file does not include its md5 hash (which would require reading
+    the whole file): an entry is discarded as soon as the size or
+    modification time of the file changes.
+
+    Args:
+        index_fp (str): path to the json file in which the index is stored
+        max_lines (int): maximum number of lines read to find the header end;
+            if it is not found in these lines, no offsets are stored
+        stat (function): function used to get the size and modification
+            time of a file (default: os.stat; e.g., CorpusInventory.stat)
+
+    Examples:
+        >>> import shutil, tempfile
+        >>> tmp = tempfile.mkdtemp()
+        >>> def write(fn, text):
+        ...     fp = os.path.join(tmp, fn)
+        ...     with open(fp, mode="w", encoding="utf-8", newline="") as file:
+        ...         file.write(text)
+        ...     return fp
+        >>> fp = write("a.txt", "######OpenITIArabic\\n#META# 000.SortField :: Shamela\\n"
+        ...                     "#META#Header#End#\\n\\nbody text\\n")
+        >>> index = HeaderIndex(os.path.join(tmp, "header_index.json"))
+        >>> index.read_header(fp)
+        ['######OpenITIArabic\\n', '#META# 000.SortField :: Shamela\\n']
+        >>> index.read_body(fp)
+        '\\nbody text\\n'
+
+        If the header end is missing (or the splitter is incomplete),
+        None is returned, and the caller reads the file line by line
+        (see read_header and read_body in generate-metadata.py):
+
+        >>> no_end = write("b.txt", "######OpenITIArabic\\n#META# 000.SortField :: Shamela\\n\\nbody\\n")
+        >>> print(index.read_header(no_end), index.read_body(no_end))
+        None None
+        >>> incomplete = write("c.txt", "######OpenITIArabic\\n#META#Header#End\\nbody\\n")
+        >>> print(index.read_header(incomplete), index.read_body(incomplete))
+        ['######OpenITIArabic\\n'] None
+
+        The missing header end is stored in the index as well,
+        until the file is changed:
+
+        >>> index.save()
+        >>> index = HeaderIndex(os.path.join(tmp, "header_index.json"))
+        >>> print(index.locate(no_end), index.stats)
+        None {'header_end': [1, 0]}
+        >>> no_end = write("b.txt", "######OpenITIArabic\\n#META#Header#End#\\nbody\\n")
+        >>> index.read_body(no_end), index.stats
+        ('body\\n', {'header_end': [1, 1]})
+        >>> shutil.rmtree(tmp)
+    """
+    def __init__(self, index_fp, max_lines=300, stat=os.stat):
+        self.max_lines = max_lines
+        super().__init__(index_fp, salt_fps=[], stat=stat)
+
+    def fingerprint(self, fp):
+        """Get the fingerprint of a file: [size, mtime, None] (None if missing)"""
+        try:
+            st = self.stat(fp)
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns, None]
+
+    def is_fresh(self, files):
+        """Check whether the size and modification time of the files
+        are still the same as when they were indexed"""
+        for fp, stored in files.items():
+            if self.fingerprint(fp) != stored:
+                return False
+        return True
+
+    def find_header_end(self, fp):
+        """Find the header end line of a text file by reading it line by line.
+
+        Returns:
+            dict (keys: "line": index of the header end line,
+                  "start": byte offset of the start of the header end line,
+                  "end": byte offset of the end of the header end line,
+                  "complete": whether the line contains the complete
+                      header splitter, "#META#Header#End#"),
+            or None if the header end was not found in the first
+            max_lines+1 lines, or if the header contains carriage returns
+            that are not followed by a newline character
+            (which are counted as line endings in text mode)
+        """
+        offset = 0
+        with open(fp, mode="rb") as file:
+            for i in range(self.max_lines+1):
+                line = file.readline()
+                if not line:
+                    return None
+                if b"\r" in line.replace(b"\r\n", b""):
+                    return None
+                if header_splitter.encode("utf-8") in line:
+                    return {"line": i, "start": offset, "end": offset+len(line),
+                            "complete": (header_splitter+"#").encode("utf-8") in line}
+                offset += len(line)
+        return None
+
+    def locate(self, fp):
+        """Get the position of the header end line in a text file
+        (from the index if the file did not change; see find_header_end)"""
+        cached = self.get("header_end", fp, [fp])
+        if cached is None:
+            cached = {"pos": self.find_header_end(fp)}
+            self.set("header_end", fp, [fp], cached)
+        return cached["pos"]
+
+    def read_header(self, fp, max_lines=100):
+        """Read the lines of the metadata header (without the header end line).
+
+        Args:
+            fp (str): path to the text file
+            max_lines (int): only return the header if the header end line
+                is found within the first max_lines+1 lines
+
+        Returns:
+            list of lines (with universal newlines, as in text mode),
+            or None if the header end was not found
+        """
+        pos = self.locate(fp)
+        if pos is None or pos["line"] > max_lines:
+            return None
+        with open(fp, mode="rb") as file:
+            b = file.read(pos["start"])
+        return io.StringIO(b.decode("utf-8"), newline=None).readlines()
+
+    def read_body(self, fp, max_lines=300):
+        """Read the text after the header end line.
+
+        Args:
+            fp (str): path to the text file
+            max_lines (int): only return the body if the header end line
+                is found within the first max_lines+1 lines
+
+        Returns:
+            str (with universal newlines, as in text mode),
+            or None if the header end was not found
+        """
+        pos = self.locate(fp)
+        if pos is None or pos["line"] > max_lines or not pos["complete"]:
+            return None
+        with open(fp, mode="rb") as file:
+            file.seek(pos["end"])
+            with io.TextIOWrapper(file, encoding="utf-8", newline=None) as text:
+                return text.read()
+
+    def save(self, prune=True):
+        """Write the index to disk.
+
+        Args:
+            prune (bool): if True, remove the entries of files
+                that no longer exist (entries of files that were not
+                read in the current run are kept)
+        """
+        if prune:
+            for kind, d in self.entries.items():
+                self.used[kind] = {fp for fp in d if self.fingerprint(fp) is not None}
+        super().save(prune=prune)
+
+    def print_stats(self):
+        """Print the number of index hits and misses"""
+        print("Header index ({}):".format(self.cache_fp))
+        for kind, (hits, misses) in sorted(self.stats.items()):
+            print("    {}: {} hits, {} misses".format(kind, hits, misses))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    print("passed doctests")
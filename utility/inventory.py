@@ -0,0 +1,157 @@
+"""In-memory inventory of all files in the corpus.
+
+Collecting the metadata requires many checks of which files exist
+for a text version (e.g., whether a .mARkdown, .completed or .inProgress
+file exists next to the version yml file). On a network file system,
+these checks (and repeated walks through the corpus) are slow.
+The CorpusInventory walks the corpus only once (using os.scandir),
+stores the size and modification time of every file, and answers
+all later questions about the corpus from memory.
+
+Usage example:
+    inventory = CorpusInventory("../25Y_repos", exclude=[".git"])
+    for root, dirs, files in inventory.walk():
+        for fn in files:
+            fp = os.path.join(root, fn)
+            if inventory.isfile(fp[:-4] + ".mARkdown"):
+                ...
+
+NB: the inventory is not aware of files that are created, changed
+    or removed by other programs after the scan. Files written by the
+    script itself should be registered with the update method.
+"""
+
+import os
+
+
+text_file_exts = [".mARkdown", ".completed", ".inProgress", ""]
+
+
+class CorpusInventory:
+    """An index of all folders and files in the corpus.
+
+    Args:
+        start_folder (str): path to the parent folder of the corpus
+        exclude (list): names of directories that should not be indexed
+    """
+    def __init__(self, start_folder, exclude=[]):
+        self.start_folder = start_folder
+        self.exclude = exclude
+        self.folders = dict()  # key: folder path, value: (subfolders, files)
+        self.indexed = dict()  # key: normalized folder path, value: folder path
+        self.stats = dict()    # key: normalized file path, value: os.stat_result
+        self.scan()
+
+    def scan(self):
+        """Index all folders and files in the corpus (one os.scandir per folder)"""
+        self.folders = dict()
+        self.indexed = dict()
+        self.stats = dict()
+        todo = [self.start_folder]
+        while todo:
+            folder = todo.pop()
+            dirs = []
+            files = []
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    # like os.walk, do not follow symbolic links to folders:
+                    if entry.name not in self.exclude and not entry.is_symlink():
+                        dirs.append(entry.name)
+                else:
+                    try:
+                        fp = os.path.normpath(os.path.join(folder, entry.name))
+                        self.stats[fp] = entry.stat()
+                    except OSError:
+                        continue
+                    files.append(entry.name)
+            dirs = sorted(dirs)
+            self.folders[folder] = (dirs, files)
+            self.indexed[os.path.normpath(folder)] = folder
+            todo += [os.path.join(folder, d) for d in reversed(dirs)]
+        print("Corpus inventory: {} files in {} folders".format(len(self.stats),
+                                                               len(self.folders)))
+
+    def walk(self, folder=None, recursive=True):
+        """Walk through the indexed folders, like os.walk (top-down, sorted).
+
+        As in os.walk, the subfolders that are removed from the `dirs` list
+        in the loop will not be visited.
+
+        Args:
+            folder (str): the folder to start from (default: start_folder)
+            recursive (bool): if False, only the folder itself is visited
+
+        Yields:
+            tuple (root, dirs, files)
+        """
+        if folder is None:
+            folder = self.start_folder
+        if folder not in self.folders:
+            return
+        dirs, files = self.folders[folder]
+        dirs = list(dirs)
+        yield folder, dirs, list(files)
+        if recursive:
+            for d in dirs:
+                for t in self.walk(os.path.join(folder, d)):
+                    yield t
+
+    def covers(self, fp):
+        """Check whether the folder of a file path is in the inventory"""
+        return os.path.dirname(os.path.normpath(fp)) in self.indexed
+
+    def stat(self, fp):
+        """Get the os.stat_result of a file (raises OSError if it does not exist)"""
+        if os.path.normpath(fp) in self.stats:
+            return self.stats[os.path.normpath(fp)]
+        if self.covers(fp):
+            raise FileNotFoundError(fp)
+        return os.stat(fp)
+
+    def isfile(self, fp):
+        """Check whether a file exists (without accessing the disk
+        if the file path is in one of the indexed folders)"""
+        if self.covers(fp):
+            return os.path.normpath(fp) in self.stats
+        return os.path.isfile(fp)
+
+    def getsize(self, fp):
+        """Get the size of a file in bytes"""
+        return self.stat(fp).st_size
+
+    def text_files(self, pth):
+        """List the text files that exist for a version/transcription.
+
+        Args:
+            pth (str): path to the version file without extension
+                (i.e., the path to the version yml file without ".yml")
+
+        Returns:
+            list of file paths, from most to least advanced extension
+        """
+        return [pth + ext for ext in text_file_exts if self.isfile(pth + ext)]
+
+    def update(self, fp):
+        """Register a file that was created, changed or removed by the script"""
+        if not self.covers(fp):
+            return
+        norm_fp = os.path.normpath(fp)
+        folder, fn = os.path.split(norm_fp)
+        files = self.folders[self.indexed[folder]][1]
+        try:
+            self.stats[norm_fp] = os.stat(fp)
+        except OSError:
+            self.stats.pop(norm_fp, None)
+            if fn in files:
+                files.remove(fn)
+            return
+        if fn not in files:
+            files.append(fn)
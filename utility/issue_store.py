@@ -0,0 +1,239 @@
+"""Local store of the GitHub issues of a repository, updated incrementally.
+
+Downloading all issues of the OpenITI/Annotation repository from GitHub
+(and scanning their titles, bodies and comments for URIs) on every run
+takes a long time. The IssueStore keeps the issues (number, title,
+state, labels, the URI the issue pertains to and the date of the last
+update of the issue) in a local SQLite database. In every run,
+only the issues that were updated since the previous sync are downloaded
+(through the GitHub REST API); the other issues are taken from the store.
+
+The base URL of the API can be changed, so that the sync can be tested
+against a local stand-in for the GitHub API (see test/mock_github_api.py).
+
+Usage example:
+    store = IssueStore("./cache/issues.sqlite")
+    store.sync("OpenITI/Annotation", access_token=token)
+    issues = store.get_issues(issue_labels=["text quality"])
+    uri_dict = sort_issues_by_uri(issues)
+    store.close()
+"""
+
+import json
+import sqlite3
+from collections import namedtuple
+
+import requests
+
+try:
+    from utility.get_issues import define_text_uris
+except ImportError:
+    from get_issues import define_text_uris
+
+
+Label = namedtuple("Label", ["name"])
+Comment = namedtuple("Comment", ["body"])
+
+
+class StoredIssue:
+    """A GitHub issue with the attributes of a PyGithub Issue object
+    that are used in generate-metadata.py (number, title, body, state,
+    labels, comments, get_comments, uri).
+
+    Args:
+        d (dict): the issue as returned by the GitHub REST API
+            or as stored in the IssueStore
+        session (requests.Session): session used to download the comments
+            (None for issues loaded from the store)
+    """
+    def __init__(self, d, session=None):
+        self.number = d["number"]
+        self.title = d["title"] or ""
+        self.body = d.get("body") or ""
+        self.state = d["state"]
+        self.labels = [Label(x["name"]) if isinstance(x, dict) else Label(x)
+                       for x in d["labels"]]
+        self.updated_at = d["updated_at"]
+        self.comments = d.get("comments", 0)
+        self.comments_url = d.get("comments_url")
+        self.session = session
+        self.uri = d.get("uri", "")
+
+    def get_comments(self):
+        """Download the comments of the issue"""
+        if self.session is None or not self.comments_url:
+            return []
+        return [Comment(c["body"] or "")
+                for c in get_pages(self.session, self.comments_url, {"per_page": 100})]
+
+
+def get_pages(session, url, params):
+    """Get all items from a paginated GitHub API endpoint
+    (following the "next" links in the Link header).
+
+    Args:
+        session (requests.Session): session with the authentication headers
+        url (str): url of the first page
+        params (dict): parameters of the first request
+
+    Yields:
+        dict (one item of the API response)
+    """
+    while url:
+        r = session.get(url, params=params, timeout=60)
+        r.raise_for_status()
+        for item in r.json():
+            yield item
+        url = r.links.get("next", {}).get("url")
+        params = None  # the next url contains all parameters
+
+
+class IssueStore:
+    """An SQLite store of GitHub issues.
+
+    Args:
+        db_fp (str): path to the SQLite database file
+    """
+    def __init__(self, db_fp):
+        self.db_fp = db_fp
+        self.conn = sqlite3.connect(db_fp)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS issues (
+                               repo TEXT, number INTEGER, title TEXT,
+                               state TEXT, labels TEXT, uri TEXT, updated_at TEXT,
+                               PRIMARY KEY (repo, number))""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS syncs (
+                               repo TEXT PRIMARY KEY, last_updated_at TEXT)""")
+        self.conn.commit()
+
+    def last_sync(self, repo_name):
+        """Get the update time of the most recently updated issue
+        in the previous sync (None if the repo was never synced)"""
+        row = self.conn.execute("SELECT last_updated_at FROM syncs WHERE repo=?",
+                                (repo_name,)).fetchone()
+        return row[0] if row else None
+
+    def sync(self, repo_name, access_token=None, api_url="https://api.github.com",
+             n_threads=8):
+        """Download the issues that were updated since the previous sync
+        (all issues, open and closed, with and without labels)
+        and store them with the URI they pertain to.
+
+        Args:
+            repo_name (str): name of the GitHub repository (e.g., "OpenITI/Annotation")
+            access_token (str): GitHub access token
+            api_url (str): base URL of the GitHub API
+            n_threads (int): maximum number of concurrent requests
+                for downloading the comments of issues
+
+        Returns:
+            int (number of new or updated issues)
+
+        Examples:
+            >>> import os, sys, tempfile
+            >>> test_folder = os.path.join(os.path.dirname(os.path.dirname(
+            ...     os.path.abspath(__file__))), "test")
+            >>> sys.path.insert(0, test_folder)
+            >>> from mock_github_api import MockGitHubAPI, make_mock_issues
+            >>> store = IssueStore(os.path.join(tempfile.mkdtemp(), "issues.sqlite"))
+            >>> api = MockGitHubAPI(make_mock_issues(5)).start()
+            >>> store.sync(api.repo_name, access_token="", api_url=api.url)
+            getting all issues from GitHub...
+            5 new or updated issues
+            5
+            >>> store.last_sync(api.repo_name)
+            '2023-01-01T00:00:05Z'
+
+            Only the issues updated since the previous sync are downloaded
+            (GitHub also returns the issues updated at that exact time):
+
+            >>> api.update_issue(3, state="closed", updated_at="2023-01-02T00:00:00Z")
+            >>> api.update_issue(1, title="0255Jahiz.Hayawan Issue 1",
+            ...                  updated_at="2023-01-02T00:00:01Z")
+            >>> n_requests = len(api.requests)
+            >>> store.sync(api.repo_name, access_token="", api_url=api.url)
+            getting issues updated since 2023-01-01T00:00:05Z from GitHub...
+            3 new or updated issues
+            3
+            >>> api.requests[n_requests]
+            '/repos/OpenITI/Annotation/issues?state=all&per_page=100&since=2023-01-01T00%3A00%3A05Z'
+            >>> store.last_sync(api.repo_name)
+            '2023-01-02T00:00:01Z'
+            >>> [(i.number, i.state, i.uri, i.updated_at)
+            ...  for i in store.get_issues(api.repo_name, state="all") if i.number in (1, 3)]
+            [(3, 'closed', '0193Authorda.Bookdaa.Shamela0000003-ara1', '2023-01-02T00:00:00Z'), (1, 'open', '0255Jahiz.Hayawan', '2023-01-02T00:00:01Z')]
+            >>> [i.number for i in store.get_issues(api.repo_name)]
+            [5, 1]
+            >>> api.stop()
+            >>> store.close()
+        """
+        if access_token == None:
+            access_token = input("Insert your GitHub Access token: ")
+        session = requests.Session()
+        session.headers.update({"Accept": "application/vnd.github+json"})
+        if access_token:
+            session.headers["Authorization"] = "token " + access_token
+        since = self.last_sync(repo_name)
+        params = {"state": "all", "per_page": 100}
+        if since:
+            params["since"] = since
+            print("getting issues updated since {} from GitHub...".format(since))
+        else:
+            print("getting all issues from GitHub...")
+        url = "{}/repos/{}/issues".format(api_url.rstrip("/"), repo_name)
+        issues = [StoredIssue(d, session=session) for d in get_pages(session, url, params)]
+        # add a language code to version URIs in the titles (see define_text_uris):
+        define_text_uris(issues, n_threads=n_threads, title_suffix="-ara1")
+        last_updated_at = since
+        for issue in issues:
+            self.conn.execute("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (repo_name, issue.number, issue.title, issue.state,
+                               json.dumps([label.name for label in issue.labels]),
+                               issue.uri, issue.updated_at))
+            if not last_updated_at or issue.updated_at > last_updated_at:
+                last_updated_at = issue.updated_at
+        if last_updated_at:
+            self.conn.execute("INSERT OR REPLACE INTO syncs VALUES (?, ?)",
+                              (repo_name, last_updated_at))
+        self.conn.commit()
+        print("{} new or updated issues".format(len(issues)))
+        return len(issues)
+
+    def get_issues(self, repo_name="OpenITI/Annotation", issue_labels=None, state="open"):
+        """Get the stored issues of a repository
+        (in the same order as the GitHub API returns them: newest first).
+
+        Args:
+            repo_name (str): name of the GitHub repository
+            issue_labels (list; default: None): a list of github issue label names;
+                only the issues with an issue label name in this
+                list will be returned; if None, all issues will be returned
+            state (str; default: "open"): only the issues with this state
+                (open/closed/all) will be returned.
+
+        Returns:
+            list of StoredIssue objects
+        """
+        query = "SELECT number, title, state, labels, uri, updated_at FROM issues WHERE repo=?"
+        params = [repo_name]
+        if state and state != "all":
+            query += " AND state=?"
+            params.append(state)
+        query += " ORDER BY number DESC"
+        issues = []
+        for number, title, state, labels, uri, updated_at in self.conn.execute(query, params):
+            labels = json.loads(labels)
+            if issue_labels != None and not set(labels).intersection(issue_labels):
+                continue
+            issues.append(StoredIssue({"number": number, "title": title,
+                                       "state": state, "labels": labels,
+                                       "uri": uri, "updated_at": updated_at}))
+        return issues
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    print("passed doctests")
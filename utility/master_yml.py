@@ -0,0 +1,159 @@
+"""Compact (deduplicated) master yml file, and a reader that expands it.
+
+In the master yml file (_metadata_complete.yml), every record contains
+the yml data of a version (or transcription), followed by the yml data
+of its book (manuscript) and author (location). The book and author data
+are therefore repeated for every version of the book / every version
+of all books of the author.
+
+In the compact format, the yml data of every book, author, manuscript
+and location is written only once, in a shared record that precedes
+the first record that refers to it:
+
+    ##SHARED#0255Jahiz.Hayawan
+    <yml data of the book>
+
+and the version and transcription records refer to the shared records
+by their URI (the name of the yml file, without extension):
+
+    ##RECORD################################################################
+
+    <yml data of the version>
+    ##REFS#0255Jahiz.Hayawan|0255Jahiz
+
+The expanded view (identical to the master yml file in the normal format)
+can be reconstructed with expand_master_yml / iter_expanded_records.
+
+Usage example:
+    with CompactYmlWriter("metadata_complete.yml") as writer:
+        writer.append(make_shared_record(book_uri, book_yml))
+        writer.append(make_shared_record(auth_uri, auth_yml))
+        writer.append(make_compact_record(vers_yml, [book_uri, auth_uri]))
+    expand_master_yml("metadata_complete.yml", "metadata_expanded.yml")
+"""
+
+import re
+
+try:
+    from utility.stream_writer import JoinedWriter
+except ImportError:
+    from stream_writer import JoinedWriter
+
+
+record_splitter = "##RECORD"+"#"*64+"\n"
+shared_prefix = "##SHARED#"
+refs_prefix = "##REFS#"
+record_start_regex = re.compile(r"\n(?={}|{})".format(re.escape(record_splitter),
+                                                       re.escape(shared_prefix)))
+
+
+def make_shared_record(ref, yml_str):
+    """Create a shared record for the yml data of a book/author/manuscript/location"""
+    return "{}{}\n{}\n".format(shared_prefix, ref, yml_str)
+
+def make_compact_record(yml_str, refs):
+    """Create a version/transcription record that refers to shared records"""
+    return "{}\n{}\n{}{}\n".format(record_splitter, yml_str, refs_prefix, "|".join(refs))
+
+def make_expanded_record(yml_strings):
+    """Create a record in the normal (expanded) format"""
+    return record_splitter + "\n" + "".join(s + "\n" for s in yml_strings)
+
+
+class CompactYmlWriter(JoinedWriter):
+    """A writer for compact master yml files that writes
+    every shared record only once (shared records for the same URI
+    can be produced in different worker processes)."""
+    def __init__(self, fp, sep="\n", buffering=1<<20):
+        super().__init__(fp, sep=sep, buffering=buffering)
+        self.shared = set()
+
+    def append(self, s):
+        if s.startswith(shared_prefix):
+            ref = s[len(shared_prefix):s.index("\n")]
+            if ref in self.shared:
+                return
+            self.shared.add(ref)
+        super().append(s)
+
+
+def iter_expanded_records(fp):
+    """Read a (compact or expanded) master yml file and yield its records
+    in the expanded format (see make_expanded_record)"""
+    with open(fp, mode="r", encoding="utf-8") as file:
+        text = file.read()
+    if not text:
+        return
+    shared = dict()
+    for record in record_start_regex.split("\n"+text)[1:]:
+        if record.startswith(shared_prefix):
+            header_end = record.index("\n")
+            shared[record[len(shared_prefix):header_end]] = record[header_end+1:-1]
+            continue
+        refs_start = record.rfind("\n"+refs_prefix)
+        if refs_start == -1:  # expanded record
+            yield record
+            continue
+        yml_str = record[len(record_splitter)+1:refs_start]
+        refs = record[refs_start+1+len(refs_prefix):-1].split("|")
+        yield make_expanded_record([yml_str] + [shared[ref] for ref in refs])
+
+def expand_master_yml(fp, out_fp=None):
+    """Reconstruct the expanded master yml file from a compact master yml file.
+
+    Args:
+        fp (str): path to the compact master yml file
+        out_fp (str): path to the output file; if None,
+            the expanded text is returned instead
+
+    Returns:
+        str (the expanded text) or None
+
+    Examples:
+        >>> import os, tempfile
+        >>> tmp = tempfile.mkdtemp()
+        >>> compact_fp = os.path.join(tmp, "compact.yml")
+        >>> normal_fp = os.path.join(tmp, "normal.yml")
+        >>> book = "10#BOOK#URI######: 0255Jahiz.Hayawan"
+        >>> auth = "00#AUTH#URI######: 0255Jahiz"
+        >>> versions = ["00#VERS#URI######: 0255Jahiz.Hayawan.Sham19Y0023775-ara1",
+        ...             "00#VERS#URI######: 0255Jahiz.Hayawan.Shamela0001-ara1"]
+        >>> with CompactYmlWriter(compact_fp) as writer:
+        ...     for vers in versions:
+        ...         writer.append(make_shared_record("0255Jahiz.Hayawan", book))
+        ...         writer.append(make_shared_record("0255Jahiz", auth))
+        ...         writer.append(make_compact_record(vers, ["0255Jahiz.Hayawan", "0255Jahiz"]))
+        >>> with JoinedWriter(normal_fp, sep="\\n") as writer:
+        ...     for vers in versions:
+        ...         writer.append(make_expanded_record([vers, book, auth]))
+
+        The shared records are written only once:
+
+        >>> with open(compact_fp, encoding="utf-8") as file:
+        ...     file.read().count(shared_prefix)
+        2
+
+        and the expanded file is identical to the file in the normal format:
+
+        >>> with open(normal_fp, encoding="utf-8") as file:
+        ...     normal = file.read()
+        >>> expand_master_yml(compact_fp) == normal
+        True
+        >>> expand_master_yml(compact_fp, os.path.join(tmp, "expanded.yml"))
+        >>> with open(os.path.join(tmp, "expanded.yml"), encoding="utf-8") as file:
+        ...     file.read() == normal
+        True
+        >>> expand_master_yml(normal_fp) == normal
+        True
+        >>> import shutil; shutil.rmtree(tmp)
+    """
+    if out_fp is None:
+        return "\n".join(iter_expanded_records(fp))
+    with JoinedWriter(out_fp, sep="\n") as writer:
+        writer.extend(iter_expanded_records(fp))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    print("passed doctests")
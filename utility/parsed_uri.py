@@ -0,0 +1,222 @@
+"""Interned, immutable parsed OpenITI URIs.
+
+The metadata collection builds URI objects (see openiti.helper.uri)
+for the same URI strings many times: for every yml file, again from the
+fullTextURL of every version when the tsv rows are built, and twice for
+every row of the json file. Every URI object splits and validates
+the URI string again, and every build_uri("book") or build_uri("author")
+call rebuilds the string recursively from its components.
+
+A ParsedURI is a lightweight, read-only alternative for code that only
+needs to read the components and derived forms of a URI:
+
+* it is created only once for every URI string (parse_uri looks it up
+  in a cache of interned objects), with the validation of the URI class
+* its author, book, version (or location, manuscript, transcription)
+  URIs and yml file names are built once and stored as attributes
+* it is hashable and cannot be changed (use the URI class to change
+  components of a URI or to build paths)
+
+It can be used instead of a URI object wherever a URI is only read:
+it has the same component attributes, uri_type, build_uri() and __call__.
+
+Usage example:
+    uri = parse_uri("./0275AH/data/0255Jahiz/0255Jahiz.Hayawan/0255Jahiz.Hayawan.Sham19Y0023775-ara1.yml")
+    uri.book_uri               # "0255Jahiz.Hayawan"
+    uri.author_yml             # "0255Jahiz.yml"
+    uri("version", ext="")     # "0255Jahiz.Hayawan.Sham19Y0023775-ara1"
+    parse_uri("0255Jahiz.Hayawan.Sham19Y0023775-ara1") is parse_uri(uri.version_uri)  # True
+"""
+
+import os
+import re
+from types import MappingProxyType
+
+from openiti.helper.uri import URI
+
+
+components = ["date", "author", "title", "version", "language", "edition_no",
+              "country", "institution", "shelfmark", "transcription",
+              "languages", "extension"]
+
+# key: uri_type (see URI.build_uri), value: name of the ParsedURI attribute
+derived_forms = {"author": "author_uri", "author_yml": "author_yml",
+                 "book": "book_uri", "book_yml": "book_yml",
+                 "version": "version_uri", "version_yml": "version_yml",
+                 "location": "location_uri", "location_yml": "location_yml",
+                 "manuscript": "manuscript_uri", "manuscript_yml": "manuscript_yml",
+                 "transcription": "transcription_uri",
+                 "transcription_yml": "transcription_yml"}
+
+
+class ParsedURI:
+    """An immutable, hashable OpenITI URI with precomputed derived forms.
+
+    Use parse_uri to get the (interned) ParsedURI of a URI string.
+
+    Args:
+        uri (URI): the URI object from which the components are taken
+
+    Examples:
+        >>> uri = parse_uri("./0275AH/data/0255Jahiz/0255Jahiz.Hayawan/0255Jahiz.Hayawan.Sham19Y0023775-ara1.completed")
+        >>> uri
+        ParsedURI('0255Jahiz.Hayawan.Sham19Y0023775-ara1.completed')
+        >>> uri.author_uri, uri.book_uri, uri.version_uri
+        ('0255Jahiz', '0255Jahiz.Hayawan', '0255Jahiz.Hayawan.Sham19Y0023775-ara1')
+        >>> uri.author_yml, uri.version_yml
+        ('0255Jahiz.yml', '0255Jahiz.Hayawan.Sham19Y0023775-ara1.yml')
+        >>> uri("version_file", ext="yml")
+        '0255Jahiz.Hayawan.Sham19Y0023775-ara1.yml'
+        >>> uri.uri_type, uri.extension, uri.location_uri is None
+        ('version', 'completed', True)
+
+        The derived forms are those built by the URI class:
+
+        >>> u = URI("0255Jahiz.Hayawan.Sham19Y0023775-ara1.completed")
+        >>> all(u.build_uri(t) == uri.build_uri(t) for t in
+        ...     [None, "author", "book_yml", "version", "version_file"])
+        True
+
+        Equal URI strings (and paths) share the same object,
+        which cannot be changed:
+
+        >>> book = parse_uri("0255Jahiz.Hayawan.yml")
+        >>> book is parse_uri("0255Jahiz.Hayawan") is parse_uri(uri.book_uri)
+        True
+        >>> book.build_uri("version")
+        Traceback (most recent call last):
+        ...
+        Exception: Error: the version component of the URI was not defined
+        >>> book.title = "Bayan"
+        Traceback (most recent call last):
+        ...
+        AttributeError: ParsedURI objects cannot be changed (use the URI class)
+    """
+    __slots__ = ["uri_string", "uri_type", "default_type"] \
+                + components + list(derived_forms.values())
+
+    def __init__(self, uri):
+        set_attr = object.__setattr__
+        for c in components:
+            set_attr(self, c, getattr(uri, c))
+        set_attr(self, "languages", MappingProxyType(dict(uri.languages)))
+        set_attr(self, "uri_type", uri.uri_type)
+        for uri_type, attr in derived_forms.items():
+            try:
+                set_attr(self, attr, uri.build_uri(uri_type))
+            except Exception:  # component not defined
+                set_attr(self, attr, None)
+        # the uri_type that build_uri() builds without uri_type argument:
+        default_type = None
+        if self.version and self.language:
+            default_type = "version_file" if self.extension else "version"
+        elif self.title:
+            default_type = "book"
+        elif self.author:
+            default_type = "author"
+        elif self.date:
+            default_type = "date"
+        elif self.transcription and self.languages:
+            default_type = "transcription_file" if self.extension else "transcription"
+        elif self.shelfmark:
+            default_type = "manuscript"
+        elif self.country and self.institution:
+            default_type = "location"
+        set_attr(self, "default_type", default_type)
+        set_attr(self, "uri_string", uri.build_uri())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ParsedURI objects cannot be changed (use the URI class)")
+
+    def __delattr__(self, name):
+        raise AttributeError("ParsedURI objects cannot be changed (use the URI class)")
+
+    def __eq__(self, other):
+        if isinstance(other, ParsedURI):
+            return self.uri_string == other.uri_string
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.uri_string)
+
+    def __reduce__(self):
+        return (parse_uri, (self.uri_string,))
+
+    def __str__(self):
+        return self.uri_string
+
+    def __repr__(self):
+        return "ParsedURI({!r})".format(self.uri_string)
+
+    def __call__(self, uri_type=None, ext=None):
+        return self.build_uri(uri_type, ext)
+
+    def build_uri(self, uri_type=None, ext=None):
+        """Get a (derived) form of the URI, as URI.build_uri does.
+
+        Args:
+            uri_type (str): the uri type to be returned
+                (e.g., "author", "book_yml", "version_file";
+                see URI.build_uri); if None, the fullest URI
+            ext (str): extension for the version_file/transcription_file
+                uri string (if None, the extension of the URI is used)
+
+        Returns:
+            str
+        """
+        if not uri_type:
+            if self.default_type is None:
+                return ""
+            uri_type = self.default_type
+        if uri_type == "date":
+            form = self.date
+        elif uri_type.endswith("_file"):
+            form = self.build_uri(uri_type[:-5])
+            if ext is None:
+                ext = self.extension
+            if ext:
+                form += "." + ext
+        else:
+            form = getattr(self, derived_forms[uri_type])
+        if not form:
+            raise Exception("Error: the {} component of the URI was not defined".format(uri_type))
+        return form
+
+
+interned = dict()  # key: URI string (or path), value: ParsedURI
+
+def parse_uri(uri_string):
+    """Get the ParsedURI object for a URI string (or a path to a file
+    named after a URI); the string is split and validated
+    only the first time it is parsed.
+
+    Raises:
+        the exception raised by the URI class for invalid URIs
+    """
+    try:
+        return interned[uri_string]
+    except KeyError:
+        pass
+    fn = uri_string
+    if len(re.split(r"[\\/]", uri_string)) > 1:  # path (as in URI.__init__)
+        fn = os.path.split(uri_string)[1]
+    if fn in interned:
+        parsed = interned[fn]
+    else:
+        parsed = ParsedURI(URI(fn))
+        # equal URIs (e.g., "0255Jahiz.Hayawan.yml" and "0255Jahiz.Hayawan")
+        # share the same object:
+        parsed = interned.setdefault(parsed.uri_string, parsed)
+        interned[fn] = parsed
+    interned[uri_string] = parsed
+    return parsed
+
+def clear_interned():
+    """Remove all ParsedURI objects from the cache"""
+    interned.clear()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    print("passed doctests")
@@ -0,0 +1,199 @@
+"""Read files in background threads, ahead of the code that parses them.
+
+While the metadata is collected, every version blocks on reading
+its version, book and author yml files and the header of its text file,
+one after another; on a network file system, most of the run time
+is spent waiting for these reads. The Prefetcher reads the files
+of the next versions in a pool of threads (optionally announcing
+the reads to the operating system with posix_fadvise), so that
+the reading overlaps with the parsing of the current version.
+
+The prefetched bytes are kept in memory until they are used (once)
+or until too many files were prefetched; files that were not
+prefetched (or only partly, e.g. the start of a long header)
+are read normally,
+so the order in which the files are processed does not change.
+
+Usage example:
+    prefetcher = Prefetcher(n_threads=4)
+    prefetcher.schedule(yml_fp)
+    prefetcher.schedule(text_fp, n_bytes=65536)
+    ...
+    yml_str = prefetcher.get_text(yml_fp)  # None if not prefetched
+    lines, complete = prefetcher.get_lines(text_fp)
+
+    # keep the files of the next 16 versions scheduled
+    # (version_files: list of (fp, n_bytes) tuples for every version):
+    read_ahead = ReadAhead(prefetcher, 16)
+    for files in version_files:
+        read_ahead.add(files)
+    for files in version_files:
+        read_ahead.next()
+        ...
+    prefetcher.close()
+"""
+
+import io
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Prefetcher:
+    """Read (the start of) files in a pool of threads.
+
+    Args:
+        n_threads (int): number of reading threads
+        max_files (int): maximum number of prefetched files kept in memory;
+            if more files are scheduled, the oldest unused ones are dropped
+        fadvise (bool): if True (and supported by the operating system),
+            announce every read with posix_fadvise(POSIX_FADV_WILLNEED)
+    """
+    def __init__(self, n_threads=4, max_files=256, fadvise=True):
+        self.executor = ThreadPoolExecutor(max_workers=n_threads)
+        self.max_files = max_files
+        self.fadvise = fadvise and hasattr(os, "posix_fadvise")
+        self.futures = OrderedDict()  # key: file path, value: (n_bytes, future)
+        self.stats = {"hits": 0, "misses": 0}
+
+    def read(self, fp, n_bytes=None):
+        """Read a file, or its first n_bytes (None if it cannot be read)"""
+        try:
+            with open(fp, mode="rb") as file:
+                if self.fadvise:
+                    os.posix_fadvise(file.fileno(), 0, n_bytes or 0,
+                                     os.POSIX_FADV_WILLNEED)
+                if n_bytes is None:
+                    return file.read()
+                return file.read(n_bytes)
+        except OSError:
+            return None
+
+    def schedule(self, fp, n_bytes=None):
+        """Start reading a file (or its first n_bytes) in the background.
+
+        Args:
+            fp (str): path to the file
+            n_bytes (int): number of bytes to be read (None: the whole file)
+        """
+        if fp in self.futures:
+            self.futures.move_to_end(fp)
+            return
+        self.futures[fp] = (n_bytes, self.executor.submit(self.read, fp, n_bytes))
+        while len(self.futures) > self.max_files:
+            self.futures.popitem(last=False)[1][1].cancel()
+
+    def discard(self, fp):
+        """Drop the prefetched bytes of a file (e.g., because it was changed)"""
+        if fp in self.futures:
+            self.futures.pop(fp)[1].cancel()
+
+    def get(self, fp):
+        """Get the prefetched bytes of a file (the prefetched bytes
+        can only be used once).
+
+        Returns:
+            tuple (b, complete): the bytes and whether they are
+                the complete file, or None if the file was not prefetched
+        """
+        if fp not in self.futures:
+            self.stats["misses"] += 1
+            return None
+        n_bytes, future = self.futures.pop(fp)
+        b = future.result()
+        if b is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return b, n_bytes is None or len(b) < n_bytes
+
+    def get_text(self, fp):
+        """Get the complete prefetched file as a string
+        (decoded in the same way as a file opened in text mode),
+        or None if the complete file was not prefetched"""
+        prefetched = self.get(fp)
+        if prefetched is None or not prefetched[1]:
+            return None
+        try:
+            return decode(prefetched[0])
+        except UnicodeDecodeError:
+            return None
+
+    def get_lines(self, fp):
+        """Get the complete lines of the prefetched start of a file.
+
+        Returns:
+            tuple (lines, complete): the lines (with universal newlines,
+                as in text mode) and whether they are all lines of the file,
+                or None if the file was not prefetched
+        """
+        prefetched = self.get(fp)
+        if prefetched is None:
+            return None
+        b, complete = prefetched
+        if not complete:
+            # drop the last (incomplete) line:
+            b = b[:b.rfind(b"\n")+1]
+        try:
+            return io.StringIO(decode(b), newline=None).readlines(), complete
+        except UnicodeDecodeError:
+            return None
+
+    def close(self):
+        """Stop the reading threads and drop all prefetched bytes"""
+        for n_bytes, future in self.futures.values():
+            future.cancel()
+        self.futures.clear()
+        self.executor.shutdown(wait=True)
+
+    def print_stats(self):
+        """Print the number of files that were (not) prefetched"""
+        print("Prefetcher:")
+        print("    {} hits, {} misses".format(self.stats["hits"], self.stats["misses"]))
+
+
+class ReadAhead:
+    """Keep the files of the next `depth` items of an ordered stream
+    (e.g., the versions in a corpus) scheduled in a Prefetcher.
+
+    Args:
+        prefetcher (Prefetcher): the prefetcher that reads the files
+        depth (int): number of items whose files are read ahead
+    """
+    def __init__(self, prefetcher, depth):
+        self.prefetcher = prefetcher
+        self.depth = depth
+        self.pending = deque()  # files of items that are not yet scheduled
+        self.n_scheduled = 0    # scheduled items whose processing did not yet start
+
+    def add(self, files):
+        """Add the files of the next item of the stream.
+
+        Args:
+            files (list): (path, n_bytes) tuples (see Prefetcher.schedule)
+        """
+        self.pending.append(files)
+        self.fill()
+
+    def fill(self):
+        """Schedule the files of the next items, up to `depth` items ahead"""
+        while self.pending and self.n_scheduled < self.depth:
+            for fp, n_bytes in self.pending.popleft():
+                self.prefetcher.schedule(fp, n_bytes)
+            self.n_scheduled += 1
+
+    def next(self):
+        """Move on to the next item of the stream
+        (call this when the processing of an item starts)"""
+        if self.n_scheduled:
+            self.n_scheduled -= 1
+        self.fill()
+
+    def __len__(self):
+        """Number of items that were added but not yet processed"""
+        return len(self.pending) + self.n_scheduled
+
+
+def decode(b):
+    """Decode utf-8 bytes with universal newlines (as in text mode)"""
+    return io.StringIO(b.decode("utf-8"), newline=None).read()
@@ -0,0 +1,115 @@
+"""Profiles: several variants of the metadata output from a single run.
+
+A release of the corpus is often published in more than one variant:
+with and without the texts of a collection (e.g.,
+config_RELEASE_2021_w_Noorlib.py and config_RELEASE_2021_wo_Noorlib.py),
+with Arabic and Latin script in the same or in separate columns,
+or with the paths to the text files rewritten for another location.
+Running generate-metadata.py once for every variant extracts the same
+metadata from the same corpus files every time.
+
+A profile is the set of config variables that only define which texts
+are in the output files and how these files are written
+(see profile_variables). All other variables (the corpus path,
+the yml check, the caches, the number of processes, ...) are shared
+by all profiles of a run: the corpus is scanned only once (see scan_corpus
+in generate-metadata.py), and the outputs of every profile are built
+from the metadata that was extracted in this scan.
+
+Every profile is defined in a config file. The first config file
+(-c option, or utility/config.py) defines the main profile; the config files
+of the other profiles are passed with additional -c options,
+or listed in the `profiles` variable of the main config file.
+Variables that are not in the config file of a profile are taken from
+the main profile, except for the paths to the output files (which are
+put in the profile's output_path folder if they are not defined).
+
+Usage example:
+    main_profile = make_profile("utility/config.py", cfg_dict)
+    profiles = [main_profile]
+    for fp in cfg_dict["profiles"]:
+        profiles.append(make_profile(fp, read_config(fp), main_profile))
+    scan_exclude = shared_exclude(profiles)
+"""
+
+
+# config variables that can be different in every profile:
+profile_variables = ["exclude", "exclude_collections", "split_ar_lat",
+                     "output_files_path", "remove_from_path", "output_path",
+                     "meta_tsv_fp", "meta_yml_fp", "meta_json_fp",
+                     "meta_header_fp", "sqlite_fp", "columnar_fp",
+                     "passim_runs", "json_format", "compact_yml",
+                     "book_rel_edges"]
+
+# profile variables that are not taken from the main profile:
+output_fp_variables = ["meta_tsv_fp", "meta_yml_fp", "meta_json_fp",
+                       "meta_header_fp", "sqlite_fp", "columnar_fp"]
+
+# config variables that are shared by all profiles:
+shared_variables = ["corpus_path", "data_in_25_year_repos",
+                    "perform_yml_check", "check_token_counts",
+                    "incl_char_length", "extraction_cache_fp", "n_processes",
+                    "header_index_fp", "conversion_cache_fp", "prefetch_depth"]
+
+
+def make_profile(name, cfg_dict, main_profile=None):
+    """Build a profile from the variables in a config file.
+
+    Args:
+        name (str): name of the profile (e.g., the path to its config file)
+        cfg_dict (dict): the variables in the config file (see read_config)
+        main_profile (dict): the profile from which the variables
+            that are not in cfg_dict are taken (None: these variables
+            are set to None)
+
+    Returns:
+        dict (key: "name" or name of a profile variable, value: its value)
+    """
+    profile = {"name": name}
+    for v in profile_variables:
+        if v in cfg_dict:
+            profile[v] = cfg_dict[v]
+        elif main_profile is not None and v not in output_fp_variables:
+            profile[v] = main_profile[v]
+        else:
+            profile[v] = None
+    return profile
+
+def ignored_variables(cfg_dict, shared_values):
+    """List the shared variables in the config file of a profile
+    whose value is different from the value used in the run
+    (these values are not used).
+
+    Args:
+        cfg_dict (dict): the variables in the config file of the profile
+        shared_values (dict): the values of the shared variables in the run
+    """
+    return [v for v in shared_variables
+            if v in cfg_dict and cfg_dict[v] != shared_values.get(v)]
+
+def shared_exclude(profiles):
+    """List the folders that are excluded by all profiles
+    (only these can be excluded from the corpus scan)"""
+    exclude = list(profiles[0]["exclude"] or [])
+    for profile in profiles[1:]:
+        exclude = [d for d in exclude if d in (profile["exclude"] or [])]
+    return exclude
+
+def duplicate_output_fps(profiles, fp_keys):
+    """Find the output files that would be written by more than one profile.
+
+    Args:
+        profiles (list): list of profile dictionaries
+        fp_keys (list): the keys of the output file paths in the profiles
+
+    Returns:
+        dict (key: file path, value: list of the names of the profiles
+              that write to it)
+    """
+    written = dict()
+    for profile in profiles:
+        for k in fp_keys:
+            fp = profile.get(k)
+            if fp:
+                written.setdefault(fp, []).append(profile["name"])
+    return {fp: names for fp, names in written.items() if len(names) > 1}
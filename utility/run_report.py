@@ -0,0 +1,193 @@
+"""Per-phase timing and memory report of a generate-metadata.py run.
+
+The RunReport measures the wall clock time, CPU time, number of files
+and bytes processed, memory use and the slowest individual files
+of every phase of the run (e.g., the yml check, the yml parsing,
+the token counting, the GitHub fetch), and writes them
+to a machine-readable json file.
+
+A phase can be measured once (e.g., the GitHub fetch) or many times
+(e.g., the parsing of every single yml file): all measurements
+with the same phase name are added up.
+
+Usage example:
+    report = RunReport()
+    with report.measure("yml_check"):
+        check_yml_files(...)
+    report.add_files("yml_check", n_files, n_bytes)
+    for fp in files:
+        with report.measure("token_counting", fp=fp, n_bytes=os.path.getsize(fp)):
+            count_toks(fp)
+    report.save("output/run_report.json")
+
+Memory use is only recorded for the outermost phases, not for phases
+measured within another phase:
+- peak_traced_mb: the peak memory allocated by Python during the phase,
+  as measured by tracemalloc (only if trace_memory is True;
+  this slows down the run considerably).
+- rss_high_water_mb: the high-water mark of the resident set size (RSS)
+  of the whole process at the end of the phase (not available on Windows).
+  This is the highest RSS since the start of the process, not the memory
+  used by the phase itself: a phase that uses less memory than an
+  earlier phase reports the high-water mark of that earlier phase.
+"""
+
+import heapq
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Get the high-water mark of the resident set size of the process
+    (since its start) in MB (None if unknown)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # in bytes on macOS, in kilobytes on Linux
+        return round(peak / 1e6, 1)
+    return round(peak / 1e3, 1)
+
+
+class RunReport:
+    """A collection of timing and memory measurements per phase.
+
+    Args:
+        trace_memory (bool): if True, the peak memory allocated
+            in every outermost phase is measured with tracemalloc
+        n_slowest (int): number of slowest files kept for every phase
+    """
+    def __init__(self, trace_memory=False, n_slowest=10):
+        self.trace_memory = trace_memory
+        self.n_slowest = n_slowest
+        self.phases = dict()
+        self.depth = 0
+        self.started = datetime.now()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.info = dict()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def new_phase(self):
+        """Create an empty record for a phase"""
+        return {"wall": 0.0, "cpu": 0.0, "calls": 0, "files": 0, "bytes": 0,
+                "rss_high_water_mb": None, "peak_traced_mb": None, "slowest": []}
+
+    @contextmanager
+    def measure(self, phase, fp=None, n_bytes=0):
+        """Measure the code within the `with` block as (part of) a phase.
+
+        Args:
+            phase (str): name of the phase
+            fp (str): path to the file processed in the block (if any)
+            n_bytes (int): number of bytes processed in the block
+        """
+        outermost = self.depth == 0
+        self.depth += 1
+        if outermost and self.trace_memory:
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self.depth -= 1
+            if phase not in self.phases:
+                self.phases[phase] = self.new_phase()
+            d = self.phases[phase]
+            d["wall"] += wall
+            d["cpu"] += cpu
+            d["calls"] += 1
+            d["bytes"] += n_bytes
+            if fp is not None:
+                d["files"] += 1
+                self.add_slowest(d, [[round(wall, 6), fp]])
+            if outermost:
+                rss = peak_rss_mb()
+                if rss is not None:
+                    d["rss_high_water_mb"] = max(rss, d["rss_high_water_mb"] or 0)
+                if self.trace_memory:
+                    traced = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+                    d["peak_traced_mb"] = max(traced, d["peak_traced_mb"] or 0)
+
+    def add_files(self, phase, n_files, n_bytes=0):
+        """Add the number of files and bytes processed in a phase
+        that was measured as a whole (e.g., by a function that does not
+        measure its files one by one)"""
+        if phase not in self.phases:
+            self.phases[phase] = self.new_phase()
+        self.phases[phase]["files"] += n_files
+        self.phases[phase]["bytes"] += n_bytes
+
+    def add_slowest(self, d, slowest):
+        """Add files to the list of slowest files of a phase"""
+        d["slowest"] = heapq.nlargest(self.n_slowest, d["slowest"] + slowest)
+
+    def total(self, phase):
+        """Get the total wall clock time of all measurements
+        of a phase (0 if it was not measured)"""
+        return self.phases.get(phase, {}).get("wall", 0.0)
+
+    def reset(self):
+        """Remove all measurements (e.g., in a worker process
+        before it starts on a new part of the corpus)"""
+        self.phases = dict()
+
+    def export(self):
+        """Get the measurements, to be merged into the report of the main process"""
+        return self.phases
+
+    def merge(self, phases):
+        """Add the measurements exported from another report (see export)"""
+        for phase, other in phases.items():
+            if phase not in self.phases:
+                self.phases[phase] = self.new_phase()
+            d = self.phases[phase]
+            for k in ["wall", "cpu", "calls", "files", "bytes"]:
+                d[k] += other[k]
+            for k in ["rss_high_water_mb", "peak_traced_mb"]:
+                if other[k] is not None:
+                    d[k] = max(other[k], d[k] or 0)
+            self.add_slowest(d, other["slowest"])
+
+    def to_dict(self):
+        """Convert the report into a json-serializable dictionary"""
+        phases = dict()
+        for phase, d in self.phases.items():
+            phases[phase] = dict(d)
+            phases[phase]["wall"] = round(d["wall"], 4)
+            phases[phase]["cpu"] = round(d["cpu"], 4)
+        return {"started": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+                "finished": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "total_wall": round(time.perf_counter() - self.start_wall, 4),
+                "total_cpu": round(time.process_time() - self.start_cpu, 4),
+                "rss_high_water_mb": peak_rss_mb(),
+                "info": self.info,
+                "phases": phases}
+
+    def save(self, report_fp):
+        """Write the report to a json file"""
+        folder = os.path.dirname(report_fp)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(report_fp, mode="w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2, ensure_ascii=False)
+
+    def print_summary(self):
+        """Print the wall clock time, CPU time and file count of every phase"""
+        print("Run report:")
+        for phase, d in self.phases.items():
+            print("    {:<20} {:>10.2f} sec (CPU: {:.2f} sec), {} files".format(
+                phase, d["wall"], d["cpu"], d["files"]))
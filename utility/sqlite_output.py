@@ -0,0 +1,227 @@
+"""Write all metadata collected by generate-metadata.py into a single
+SQLite database.
+
+Tools that only need the metadata of a few texts (e.g., the website)
+can query this database instead of loading the large json files
+(all_author_meta.json, all_book_meta.json, all_version_meta.json,
+metadata_light.json, ...) in full.
+
+Every metadata level gets its own table, with the most important
+fields as separate (indexed) columns and the complete record
+as a json string in the `data` column:
+
+* authors (uri, date, data)
+* books (uri, author_uri, date, data)
+* versions (uri, book_uri, author_uri, date, language, status,
+  collection, tok_length, char_length, data)
+* transcriptions (uri, language, status, collection, tok_length,
+  char_length, data)
+* manuscripts (uri, data)
+* locations (uri, country, data)
+* texts (one row per record of metadata_light.json; one column per field,
+  the srts and issues as json strings; plus the collection column)
+* book_relations (source, dest, main_rel_type, sec_rel_type)
+* name_elements (uri, data)
+* header_meta (folder, book_uri, data): one row per book folder
+* issues (uri, number, label, state)
+
+The collection of a version or transcription is the alphabetic
+prefix of its id (e.g., "Shamela" for "Shamela0001234").
+
+The database is rebuilt from scratch in every run; all rows of a table
+are inserted in a single transaction, and the indexes are created
+after the rows have been inserted.
+
+Usage example:
+    save_as_sqlite("output/metadata.sqlite", meta, json_records=records,
+                   header_meta=all_header_meta, issues_uri_dict=issues_uri_dict)
+
+    conn = sqlite3.connect("output/metadata.sqlite")
+    conn.execute("SELECT data FROM versions WHERE book_uri=?", ("0255Jahiz.Hayawan",))
+"""
+
+import json
+import os
+import re
+import sqlite3
+
+
+tables = {
+    "authors": ["uri TEXT PRIMARY KEY", "date TEXT", "data TEXT"],
+    "books": ["uri TEXT PRIMARY KEY", "author_uri TEXT", "date TEXT", "data TEXT"],
+    "versions": ["uri TEXT PRIMARY KEY", "book_uri TEXT", "author_uri TEXT",
+                 "date TEXT", "language TEXT", "status TEXT", "collection TEXT",
+                 "tok_length INTEGER", "char_length INTEGER", "data TEXT"],
+    "transcriptions": ["uri TEXT PRIMARY KEY", "language TEXT", "status TEXT",
+                       "collection TEXT", "tok_length INTEGER",
+                       "char_length INTEGER", "data TEXT"],
+    "manuscripts": ["uri TEXT PRIMARY KEY", "data TEXT"],
+    "locations": ["uri TEXT PRIMARY KEY", "country TEXT", "data TEXT"],
+    "book_relations": ["source TEXT", "dest TEXT", "main_rel_type TEXT",
+                       "sec_rel_type TEXT"],
+    "name_elements": ["uri TEXT PRIMARY KEY", "data TEXT"],
+    "header_meta": ["folder TEXT PRIMARY KEY", "book_uri TEXT", "data TEXT"],
+    "issues": ["uri TEXT", "number INTEGER", "label TEXT", "state TEXT"],
+}
+
+indexes = {
+    "authors": ["date"],
+    "books": ["author_uri", "date"],
+    "versions": ["book_uri", "author_uri", "date", "language", "status", "collection"],
+    "transcriptions": ["language", "status", "collection"],
+    "locations": ["country"],
+    "texts": ["versionUri", "book", "date", "language", "status", "collection"],
+    "book_relations": ["source", "dest", "main_rel_type"],
+    "header_meta": ["book_uri"],
+    "issues": ["uri", "number"],
+}
+
+
+def to_json(d):
+    return json.dumps(d, ensure_ascii=False, sort_keys=True)
+
+def to_int(s):
+    """Convert a length string to an integer (None if it is not a number)"""
+    try:
+        return int(s)
+    except (TypeError, ValueError):
+        return None
+
+def get_language(uri):
+    """Get the language code from a version or transcription uri
+    (e.g., "ara" from "0255Jahiz.Hayawan.Shamela0001234-ara1")"""
+    m = re.search(r"-([a-z]{3})\d*(?:\.\w+)?$", uri)
+    return m.group(1) if m else ""
+
+def get_collection(text_id):
+    """Get the collection of a text from its id
+    (e.g., "Shamela" from "Shamela0001234Vols")"""
+    m = re.match(r"[A-Za-z]+", text_id or "")
+    return m.group(0) if m else ""
+
+
+class SqliteWriter:
+    """Bulk writer for a new SQLite database.
+
+    Args:
+        db_fp (str): path to the database file (an existing file
+            at this path is replaced)
+    """
+    def __init__(self, db_fp):
+        self.db_fp = db_fp
+        folder = os.path.dirname(db_fp)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        if os.path.exists(db_fp):
+            os.remove(db_fp)
+        self.conn = sqlite3.connect(db_fp)
+        # the database is rebuilt from scratch if the run fails,
+        # so the journal is not needed:
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.tables = []
+
+    def write_table(self, table, columns, rows):
+        """Create a table and insert all its rows in a single transaction.
+
+        Args:
+            table (str): name of the table
+            columns (list): column definitions (name and type)
+            rows (iterable): tuples of column values
+        """
+        self.conn.execute("CREATE TABLE {} ({})".format(table, ", ".join(columns)))
+        placeholders = ", ".join(["?"]*len(columns))
+        with self.conn:
+            self.conn.executemany("INSERT INTO {} VALUES ({})".format(table, placeholders),
+                                  rows)
+        self.tables.append(table)
+
+    def create_indexes(self, indexes):
+        """Create the indexes of all tables that were written
+
+        Args:
+            indexes (dict): key: table name, value: list of column names
+        """
+        with self.conn:
+            for table in self.tables:
+                for column in indexes.get(table, []):
+                    self.conn.execute("CREATE INDEX idx_{0}_{1} ON {0} ({1})".format(
+                        table, column))
+
+    def close(self):
+        self.conn.execute("ANALYZE")
+        self.conn.close()
+
+
+def save_as_sqlite(db_fp, meta, json_records=None, header_meta=None,
+                   issues_uri_dict=None):
+    """Write the metadata into a new SQLite database.
+
+    Args:
+        db_fp (str): path to the database file
+        meta (dict): metadata dictionaries returned by collectMetadata
+            (all_auth_meta_d, all_book_meta_d, all_vers_meta_d,
+            all_transcr_meta_d, all_manuscr_meta_d, all_loc_meta_d,
+            book_rel_d, name_elements_d)
+        json_records (list): records of the metadata_light.json file
+        header_meta (dict): metadata from the text file headers
+            (key: path to the book folder)
+        issues_uri_dict (dict): GitHub issues for every URI
+
+    Returns:
+        None
+    """
+    writer = SqliteWriter(db_fp)
+
+    writer.write_table("authors", tables["authors"],
+        ((uri, uri[:4], to_json(d))
+         for uri, d in meta["all_auth_meta_d"].items()))
+    writer.write_table("books", tables["books"],
+        ((uri, uri.split(".")[0], uri[:4], to_json(d))
+         for uri, d in meta["all_book_meta_d"].items()))
+    writer.write_table("versions", tables["versions"],
+        ((uri, ".".join(uri.split(".")[:2]), uri.split(".")[0], uri[:4],
+          get_language(uri), d.get("status"), get_collection(d.get("id")),
+          to_int(d.get("tok_length")), to_int(d.get("char_length")), to_json(d))
+         for uri, d in meta["all_vers_meta_d"].items()))
+    writer.write_table("transcriptions", tables["transcriptions"],
+        ((uri, get_language(uri), d.get("status"), get_collection(d.get("id")),
+          to_int(d.get("tok_length")), to_int(d.get("char_length")), to_json(d))
+         for uri, d in meta["all_transcr_meta_d"].items()))
+    writer.write_table("manuscripts", tables["manuscripts"],
+        ((uri, to_json(d)) for uri, d in meta["all_manuscr_meta_d"].items()))
+    writer.write_table("locations", tables["locations"],
+        ((uri, d.get("country"), to_json(d))
+         for uri, d in meta["all_loc_meta_d"].items()))
+
+    # every relation is stored for both the source and the destination book:
+    rels = []
+    seen = set()
+    for book_uri, book_rels in meta.get("book_rel_d", dict()).items():
+        for rel in book_rels:
+            row = (rel["source"], rel["dest"], rel["main_rel_type"], rel["sec_rel_type"])
+            if row not in seen:
+                seen.add(row)
+                rels.append(row)
+    writer.write_table("book_relations", tables["book_relations"], rels)
+    writer.write_table("name_elements", tables["name_elements"],
+        ((uri, to_json(d)) for uri, d in meta.get("name_elements_d", dict()).items()))
+
+    if json_records:
+        columns = list(json_records[0].keys())
+        col_defs = ['"{}" TEXT'.format(col) for col in columns] + ["collection TEXT"]
+        writer.write_table("texts", col_defs,
+            ([to_json(r[col]) if isinstance(r.get(col), (list, dict)) else r.get(col)
+              for col in columns] + [get_collection(r.get("id"))]
+             for r in json_records))
+    if header_meta:
+        writer.write_table("header_meta", tables["header_meta"],
+            ((folder, os.path.basename(folder), to_json(d))
+             for folder, d in header_meta.items()))
+    if issues_uri_dict:
+        writer.write_table("issues", tables["issues"],
+            ((uri, issue.number, issue.labels[0].name if issue.labels else "", issue.state)
+             for uri, issues in issues_uri_dict.items() for issue in issues))
+
+    writer.create_indexes(indexes)
+    writer.close()
@@ -0,0 +1,215 @@
+"""Persistent index of the links to the passim srt folders of every text.
+
+The html files in the utility/srt folder (one per passim run) list
+the folders containing the srt files of all texts in that run.
+Instead of reading and scanning these files in every run, the SrtIndex
+stores the links per text id, already sorted by the date of the passim
+run, in a compact json file; the index is only rebuilt
+if one of the html files or the list of passim runs has changed.
+
+Texts that were split into parts (ids with "Vols", "VolsA", "BK1", ...)
+also get the links of the text before it was split; these combined
+lists are precomputed as well, so that finding the links
+for a text id is a single dictionary lookup.
+
+Usage example:
+    srt_index = SrtIndex.load("./utility/srt/", passim_runs,
+                              index_fp="./cache/srt_index.json")
+    srts = srt_index.lookup("Shamela0001234Vols")
+"""
+
+import json
+import os
+import re
+
+
+kitab_url = "http://dev.kitab-project.org"
+link_regex = re.compile(r'<a href="(?:http://dev.kitab-project.org/passim\d+/)?([^\-"]+-[^"]+)"')
+year_regex = re.compile(r"(?<=passim\d{4})\d{4}")
+month_regex = re.compile(r"(?<=passim\d{2})\d{2}")
+alias_regex = re.compile(r"Vols[A-Z]*|BK\d+")
+
+
+def build_srt_dict(srt_folder, passim_runs):
+    """Create a dictionary for all existing srt files for every OpenITI text
+    (see load_srt_meta in generate-metadata.py).
+
+    Returns:
+        dict (key: bare id of a text;
+              value: list of [date of the passim run, link to the srt folder],
+                     sorted by the year and month of the passim run)
+    """
+    srt_d = dict()
+    runs = {item[1]: item[0] for item in passim_runs}
+    for fn in os.listdir(srt_folder):
+        if fn[:-5] in runs:
+            fp = os.path.join(srt_folder, fn)
+            with open(fp, mode="r", encoding="utf-8") as file:
+                html = file.read()
+            for id_ in link_regex.findall(html):
+                bare_id = id_.split("-")[0]
+                if not bare_id in srt_d:
+                    srt_d[bare_id] = []
+                srt_d[bare_id].append([runs[fn[:-5]], "/".join([kitab_url, fn[:-5], id_])])
+
+    # sort by year and month (the sort key is computed only once per run id):
+    keys = dict()
+    for run_id in runs:
+        link = "/".join([kitab_url, run_id, ""])
+        keys[run_id] = (year_regex.findall(link), month_regex.findall(link))
+    def sort_key(x):
+        return keys[x[1][len(kitab_url)+1:].split("/")[0]]
+    return {k: sorted(v, key=sort_key) for k, v in srt_d.items()}
+
+
+class SrtIndex:
+    """Links to the srt folders for every text id.
+
+    Args:
+        ids (dict): key: bare id, value: sorted list of
+            [date of the passim run, link to the srt folder]
+            (see build_srt_dict)
+    """
+    def __init__(self, ids):
+        self.ids = ids
+        self.combined = self.combine(ids)
+
+    @staticmethod
+    def combine(ids):
+        """Precompute the links of ids of texts that were split into parts:
+        the links of the text before it was split (without duplicates),
+        followed by the links of the part itself"""
+        combined = dict()
+        for bare_id, srts in ids.items():
+            alias = alias_regex.sub("", bare_id)
+            if alias != bare_id and alias in ids:
+                seen = {tuple(x) for x in srts}
+                combined[bare_id] = [x for x in ids[alias] if tuple(x) not in seen] + srts
+        return combined
+
+    def lookup(self, bare_id):
+        """Get the links to the srt folders of a text id
+        (without language code and extension).
+
+        Returns:
+            list of [date of the passim run, link to the srt folder]
+        """
+        if bare_id in self.combined:
+            return list(self.combined[bare_id])
+        if bare_id in self.ids:
+            return list(self.ids[bare_id])
+        return list(self.ids.get(alias_regex.sub("", bare_id), []))
+
+    @staticmethod
+    def fingerprint(srt_folder, passim_runs):
+        """Get the size and modification time of the html files
+        of the passim runs, and the passim runs themselves"""
+        run_ids = {item[1] for item in passim_runs}
+        files = dict()
+        for fn in sorted(os.listdir(srt_folder)):
+            if fn[:-5] in run_ids:
+                st = os.stat(os.path.join(srt_folder, fn))
+                files[fn] = [st.st_size, st.st_mtime_ns]
+        return {"passim_runs": [list(item) for item in passim_runs], "files": files}
+
+    @classmethod
+    def load(cls, srt_folder, passim_runs, index_fp=None):
+        """Load the index from the index file, or (if the index file
+        does not exist or is outdated) build it from the html files.
+
+        Args:
+            srt_folder (str): path to the folder containing the html files
+                of the passim runs
+            passim_runs (list): a list of 2-item lists
+                (description, run id) of the passim runs
+            index_fp (str): path to the index file; if None, the index
+                is built from the html files and not stored
+
+        Returns:
+            SrtIndex
+
+        Examples:
+            >>> import shutil, tempfile
+            >>> srt_folder = tempfile.mkdtemp()
+            >>> def write_html(run_id, ids):
+            ...     with open(os.path.join(srt_folder, run_id+".html"), mode="w",
+            ...                encoding="utf-8") as file:
+            ...         file.write("".join('<a href="{}-ara1">'.format(i) for i in ids))
+            >>> write_html("passim01022021", ["Shamela0001234", "Shamela0001234Vols"])
+            >>> write_html("passim01102019", ["Shamela0001234"])
+            >>> runs = [["2021.1.4", "passim01022021"], ["2019.1.1", "passim01102019"]]
+            >>> index_fp = os.path.join(srt_folder, "srt_index.json")
+            >>> srt_index = SrtIndex.load(srt_folder, runs, index_fp=index_fp)
+            >>> [descr for descr, link in srt_index.lookup("Shamela0001234Vols")]
+            ['2019.1.1', '2021.1.4', '2021.1.4']
+            >>> srt_index.lookup("Shamela0001234Vols")[-1][1]
+            'http://dev.kitab-project.org/passim01022021/Shamela0001234Vols-ara1'
+
+            The index file is not rewritten if nothing changed:
+
+            >>> mtime = os.stat(index_fp).st_mtime_ns
+            >>> SrtIndex.load(srt_folder, runs, index_fp=index_fp).ids == srt_index.ids
+            True
+            >>> os.stat(index_fp).st_mtime_ns == mtime
+            True
+
+            but the index is rebuilt if an html file or the list
+            of passim runs changes:
+
+            >>> write_html("passim01022021", ["Shamela0001234", "JK000001"])
+            >>> srt_index = SrtIndex.load(srt_folder, runs, index_fp=index_fp)
+            >>> [descr for descr, link in srt_index.lookup("JK000001")]
+            ['2021.1.4']
+            >>> srt_index = SrtIndex.load(srt_folder, runs[1:], index_fp=index_fp)
+            >>> [descr for descr, link in srt_index.lookup("Shamela0001234")]
+            ['2019.1.1']
+            >>> shutil.rmtree(srt_folder)
+        """
+        fingerprint = cls.fingerprint(srt_folder, passim_runs)
+        if index_fp and os.path.exists(index_fp):
+            try:
+                with open(index_fp, mode="r", encoding="utf-8") as file:
+                    stored = json.load(file)
+                if stored["fingerprint"] == fingerprint:
+                    return cls.from_compact(stored)
+            except (ValueError, KeyError):
+                print("Srt index {} could not be read; rebuilding".format(index_fp))
+        srt_index = cls(build_srt_dict(srt_folder, passim_runs))
+        if index_fp:
+            srt_index.save(index_fp, fingerprint)
+        return srt_index
+
+    def save(self, index_fp, fingerprint):
+        """Write the index to a json file. To keep the file small,
+        every link is stored as [index of the passim run, text id]."""
+        runs = []
+        run_indices = dict()
+        ids = dict()
+        for bare_id, srts in self.ids.items():
+            ids[bare_id] = []
+            for descr, link in srts:
+                run_id, id_ = link[len(kitab_url)+1:].split("/", 1)
+                if (descr, run_id) not in run_indices:
+                    run_indices[(descr, run_id)] = len(runs)
+                    runs.append([descr, run_id])
+                ids[bare_id].append([run_indices[(descr, run_id)], id_])
+        folder = os.path.dirname(index_fp)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(index_fp, mode="w", encoding="utf-8") as file:
+            json.dump({"fingerprint": fingerprint, "runs": runs, "ids": ids},
+                      file, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_compact(cls, stored):
+        """Create the index from the contents of an index file (see save)"""
+        runs = [[descr, "/".join([kitab_url, run_id])] for descr, run_id in stored["runs"]]
+        ids = {bare_id: [[runs[i][0], runs[i][1] + "/" + id_] for i, id_ in srts]
+               for bare_id, srts in stored["ids"].items()}
+        return cls(ids)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    print("passed doctests")
@@ -0,0 +1,116 @@
+"""Write large text outputs to disk while they are being produced.
+
+Instead of collecting all rows/records of an output file in a list
+and writing `sep.join(rows)` at the end, a JoinedWriter writes every
+row to a buffered file handle as soon as it is appended, so that
+the memory use does not grow with the size of the output.
+The resulting file is identical to the one written by `sep.join(rows)`.
+
+The json outputs can also be written as JSON Lines files
+(one json object per line, optionally gzip-compressed),
+which can be written and read one record at a time:
+a dictionary is written as one {"key": key, "value": value} object
+per line, sorted by key; a list of records as one record per line.
+
+Usage example:
+    with JoinedWriter("metadata_light.csv", sep="\\n") as writer:
+        writer.append(header)
+        for row in rows:
+            writer.append(row)
+
+    fp = write_jsonl(dict_lines(all_book_meta_d), "all_book_meta.json",
+                     compress=True)   # => all_book_meta.jsonl.gz
+    for line in read_jsonl(fp):
+        print(line["key"], line["value"])
+"""
+
+import gzip
+import json
+
+
+class JoinedWriter:
+    """A file writer with the interface of a list of strings.
+
+    Args:
+        fp (str): path to the output file
+        sep (str): separator written between two strings
+        buffering (int): size of the write buffer in bytes
+    """
+    def __init__(self, fp, sep="\n", buffering=1<<20):
+        self.fp = fp
+        self.sep = sep
+        self.file = open(fp, mode="w", encoding="utf-8", buffering=buffering)
+        self.n = 0
+
+    def append(self, s):
+        """Write a string to the file (preceded by the separator,
+        except for the first string)"""
+        if self.n:
+            self.file.write(self.sep)
+        self.file.write(s)
+        self.n += 1
+
+    def extend(self, strings):
+        """Write a sequence of strings to the file"""
+        for s in strings:
+            self.append(s)
+
+    def __len__(self):
+        return self.n
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_text(fp, mode="r", compress=None):
+    """Open a text file, compressed with gzip if compress is True
+    (or, if compress is None, if the file name ends with .gz)"""
+    if compress is None:
+        compress = fp.endswith(".gz")
+    if compress:
+        return gzip.open(fp, mode=mode+"t", encoding="utf-8", compresslevel=6)
+    return open(fp, mode=mode, encoding="utf-8", buffering=1<<20)
+
+def jsonl_path(fp, compress=False):
+    """Get the path of the JSON Lines variant of a json file path
+    (e.g., "meta.json" => "meta.jsonl" or "meta.jsonl.gz")"""
+    if fp.endswith(".json"):
+        fp = fp[:-5]
+    return fp + ".jsonl" + (".gz" if compress else "")
+
+def dict_lines(d):
+    """Convert a dictionary into JSON Lines objects, sorted by key"""
+    for k in sorted(d):
+        yield {"key": k, "value": d[k]}
+
+def write_jsonl(lines, fp, compress=False):
+    """Write json objects to a JSON Lines file, one object per line.
+
+    Args:
+        lines (iterable): json-serializable objects
+        fp (str): path to the json output file; the extension
+            is replaced (see jsonl_path)
+        compress (bool): if True, the file is compressed with gzip
+
+    Returns:
+        str (path to the JSON Lines file)
+    """
+    fp = jsonl_path(fp, compress)
+    with open_text(fp, mode="w", compress=compress) as file:
+        for line in lines:
+            file.write(json.dumps(line, ensure_ascii=False, sort_keys=True))
+            file.write("\n")
+    return fp
+
+def read_jsonl(fp):
+    """Read the json objects in a (gzipped) JSON Lines file one by one"""
+    with open_text(fp) as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,90 @@
+"""An insertion-ordered set that can be used like a list.
+
+While the metadata is collected, elements are added (only once)
+to lists in the metadata dictionaries for every version: the books
+of an author, the genre tags of a book, the manuscripts of a location, ...
+Checking whether an element is already in a list compares it with
+every element of the list, which becomes slow for authors with
+many books and books with many versions.
+
+A UniqueList keeps the elements in the order in which they were added
+(so the output does not change), and uses a set for membership tests;
+elements that are already in the list are not appended again.
+Because it is a subclass of list, it can be written to json files,
+concatenated with other lists, pickled and copied like a normal list.
+
+Usage example:
+    tags = UniqueList(["src@adab"])
+    if "src@tarikh" not in tags:   # set lookup
+        tags.append("src@tarikh")
+    tags.append("src@adab")        # ignored: already in the list
+    json.dumps(tags)               # '["src@adab", "src@tarikh"]'
+"""
+
+
+class UniqueList(list):
+    """A list to which every (hashable) element is added only once.
+
+    NB: only append, extend and += keep the set of elements up to date;
+        do not change a UniqueList in any other way (e.g., lst[0] = x,
+        lst.remove(x)).
+
+    Args:
+        items (iterable): the first elements of the list (these are kept
+            as they are, including duplicates, so that the list is equal
+            to the list it replaces)
+
+    Examples:
+        >>> tags = UniqueList(["src@adab", "src@adab"])
+        >>> tags
+        ['src@adab', 'src@adab']
+        >>> tags.append("src@tarikh")
+        >>> tags.append("src@adab")
+        >>> tags.extend(["src@tarikh", "src@fiqh"])
+        >>> tags += ["src@fiqh", "src@shicr"]
+        >>> tags
+        ['src@adab', 'src@adab', 'src@tarikh', 'src@fiqh', 'src@shicr']
+        >>> "src@fiqh" in tags, "src@nahw" in tags
+        (True, False)
+        >>> tags == ['src@adab', 'src@adab', 'src@tarikh', 'src@fiqh', 'src@shicr']
+        True
+
+        A pickled or copied UniqueList is still a UniqueList:
+
+        >>> import copy
+        >>> c = copy.deepcopy(tags)
+        >>> c.append("src@tarikh")
+        >>> type(c).__name__, c == tags
+        ('UniqueList', True)
+    """
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.members = set(self)
+
+    def __contains__(self, el):
+        return el in self.members
+
+    def append(self, el):
+        """Add an element at the end of the list, if it is not yet in the list"""
+        if el not in self.members:
+            self.members.add(el)
+            super().append(el)
+
+    def extend(self, items):
+        """Add all elements that are not yet in the list"""
+        for el in items:
+            self.append(el)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __reduce__(self):
+        # pickle and copy the elements, and rebuild the set from them:
+        return (self.__class__, (list(self),))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    print("passed doctests")
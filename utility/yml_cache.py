@@ -0,0 +1,126 @@
+"""Memoized loading and serialization of yml files.
+
+In collectMetadata, the author yml file and the book yml file
+are loaded (and converted back to a yml string for the master yml file)
+for every version of the book/every book of the author.
+The YmlCache keeps the most recently used yml dictionaries and
+yml strings in memory, so that each yml file is parsed and serialized
+only once per run (unless it is changed on disk in the meantime:
+the cache is keyed by the path, size and modification time of the file).
+
+Usage example:
+    yml_cache = YmlCache(maxsize=1000)
+    yml_d = yml_cache.load(yml_pth, load_yml)
+    yml_str = yml_cache.serialize(yml_pth, yml_d, dicToYML)
+    yml_cache.print_stats()
+"""
+
+import os
+from collections import OrderedDict
+
+
+class YmlCache:
+    """A bounded (least recently used) in-memory cache of yml files.
+
+    Args:
+        maxsize (int): maximum number of yml files kept in memory
+        stat (function): function used to get the size and modification
+            time of a file (default: os.stat; e.g., CorpusInventory.stat)
+    """
+    def __init__(self, maxsize=1000, stat=os.stat):
+        self.maxsize = maxsize
+        self.stat = stat
+        self.entries = OrderedDict()  # key: (path, size, mtime), value: dict
+        self.stats = {"load": [0, 0], "serialize": [0, 0]}
+
+    def get_entry(self, yml_pth, load_func=None):
+        """Get the cache entry of a yml file, loading the file if needed.
+
+        Args:
+            yml_pth (str): path to the yml file
+            load_func (function): function that loads the yml file
+                if it is not in the cache (if None, it will not be loaded)
+
+        Returns:
+            tuple (entry, hit):
+                entry (dict): keys "yml_d", "yml_str"; None if the file
+                    does not exist or is not in the cache and was not loaded
+                hit (bool): True if the entry was found in the cache
+        """
+        try:
+            st = self.stat(yml_pth)
+        except OSError:
+            return None, False
+        key = (yml_pth, st.st_size, st.st_mtime_ns)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key], True
+        if load_func is None:
+            return None, False
+        entry = {"yml_d": load_func(yml_pth), "yml_str": None}
+        self.entries[key] = entry
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return entry, False
+
+    def load(self, yml_pth, load_func):
+        """Load a yml file into a dictionary.
+
+        Args:
+            yml_pth (str): path to the yml file
+            load_func (function): function that loads the yml file
+                (called only if the file is not in the cache)
+
+        Returns:
+            dict (a copy of the cached dictionary, which can safely be changed)
+        """
+        entry, hit = self.get_entry(yml_pth, load_func)
+        self.count("load", hit)
+        if entry is None:
+            return load_func(yml_pth)
+        return dict(entry["yml_d"])
+
+    def serialize(self, yml_pth, yml_d, serialize_func):
+        """Get the yml string representation of a yml file's dictionary.
+
+        Args:
+            yml_pth (str): path to the yml file
+            yml_d (dict): the (unchanged) dictionary loaded from the yml file;
+                only used if the yml file is not in the cache
+            serialize_func (function): function that converts
+                the yml dictionary into a string
+
+        Returns:
+            str
+        """
+        entry, hit = self.get_entry(yml_pth)
+        if entry is None:
+            self.count("serialize", False)
+            return serialize_func(yml_d)
+        self.count("serialize", entry["yml_str"] is not None)
+        if entry["yml_str"] is None:
+            entry["yml_str"] = serialize_func(entry["yml_d"])
+        return entry["yml_str"]
+
+    def count(self, kind, hit):
+        """Add a hit (if `hit` is True) or a miss to the stats"""
+        if hit:
+            self.stats[kind][0] += 1
+        else:
+            self.stats[kind][1] += 1
+
+    def reset_stats(self):
+        """Set the hit/miss counts to zero"""
+        self.stats = {kind: [0, 0] for kind in self.stats}
+
+    def add_stats(self, stats):
+        """Add the hit/miss counts of another YmlCache (e.g., of a worker process)"""
+        for kind, (hits, misses) in stats.items():
+            self.stats[kind][0] += hits
+            self.stats[kind][1] += misses
+
+    def print_stats(self):
+        """Print the number of cache hits and misses"""
+        print("Yml cache:")
+        for kind, (hits, misses) in sorted(self.stats.items()):
+            print("    {}: {} hits, {} misses".format(kind, hits, misses))
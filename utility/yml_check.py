@@ -0,0 +1,365 @@
+"""Check the yml files of all texts in the corpus before the metadata is collected.
+
+This is a port of check_yml_file and check_yml_files from
+openiti.helper.uri: for every text file, the yml files of the
+version, book and author (or transcription, manuscript and location)
+are created if they are missing or empty, repaired if they cannot be read
+(yml.fix_broken_yml), cleaned of keys with a wrong prefix, and their URI
+is replaced with the URI in the filename; changed yml files are written
+in the same way as in the openiti library (without reflowing the lines).
+
+Only the token count check is different: instead of counting the tokens
+and characters of every text file while the corpus is walked
+(which reads every text file twice), the text files of all version
+and transcription yml files are counted after the walk, in a pool
+of worker processes, largest files first (so that a single large file
+that is started late does not keep the other workers idle).
+The yml files whose counts are checked are saved only after this count,
+so that every yml file is written only once, as in the openiti library.
+
+The corpus is walked, and the existence and size of the files are checked,
+in a CorpusInventory (see utility/inventory.py), which can be passed on
+to the metadata collection after the check: the yml files that are
+created or changed by the check are registered in it.
+
+Usage example:
+    inventory = CorpusInventory("../25Y_repos", exclude=[".git"])
+    failed = check_yml_files("../25Y_repos", exclude=[".git"],
+                             execute=True, check_token_counts=True,
+                             inventory=inventory, n_processes=4)
+"""
+
+import multiprocessing
+import os
+import re
+
+from openiti.helper import yml
+from openiti.helper.ara import ar_cnt_file
+from openiti.helper.funcs import exclude_files
+from openiti.helper.uri import URI, new_yml
+
+try:
+    from utility.inventory import CorpusInventory
+except ImportError:
+    from inventory import CorpusInventory
+
+
+# text files, as in openiti.helper.funcs.get_all_text_files_in_folder:
+text_file_regex = re.compile(r"-(?:\w\w\w\d)+(?:.inProgress|.completed|.mARkdown)?\Z")
+
+
+def get_all_text_files(inventory, start_folder, exclude=[]):
+    """Get the paths to all OpenITI text files in a folder
+    and its subfolders, from the inventory
+    (see openiti.helper.funcs.get_all_text_files_in_folder)"""
+    folder = inventory.indexed.get(os.path.normpath(start_folder), start_folder)
+    for root, dirs, files in inventory.walk(folder):
+        dirs[:] = [d for d in dirs if d not in exclude]
+        for fn in files:
+            if fn not in exclude_files and text_file_regex.findall(fn):
+                yield os.path.join(root, fn)
+
+def find_text_file(text_fp, inventory):
+    """Get the path to the most developed version of a text file
+    (mARkdown > completed > no extension > inProgress),
+    as check_token_count in openiti.helper.uri does"""
+    text_fp = re.sub(r"\.mARkdown|\.completed|\.inProgress", "", text_fp)
+    for ext in [".mARkdown", ".completed", "", ".inProgress"]:
+        fp = text_fp + ext
+        if inventory.isfile(fp):
+            break
+    return fp
+
+def count_tokens_in_file(fp):
+    """Count the Arabic tokens and characters in a text file.
+
+    Returns:
+        tuple (fp, tok_count, char_count)
+    """
+    tok_count = ar_cnt_file(fp, mode="token")
+    char_count = ar_cnt_file(fp, mode="char")
+    return fp, tok_count, char_count
+
+def compare_token_count(uri, yml_dic, tok_count, char_count):
+    """Compare the token and character counts of a text file
+    with the counts in its version/transcription yml file.
+
+    Returns:
+        (tok_count, char_count) if the counts in the yml file
+        must be replaced, None otherwise
+    """
+    len_key = [k for k in yml_dic.keys() if "#LENGTH#" in k][0]
+    char_len_key = [k for k in yml_dic.keys() if "#CLENGTH#" in k][0]
+    yml_tok_count = yml_dic[len_key].strip()
+    try:
+        yml_char_count = yml_dic[char_len_key].strip()
+    except:
+        yml_char_count = ""
+    replace_tok_count = False
+    for cnt, yml_cnt in [(tok_count, yml_tok_count),
+                         (char_count, yml_char_count)]:
+        if yml_cnt == "":
+            print("NO TOKEN COUNT", uri)
+            replace_tok_count = True
+        else:
+            try:
+                if int(yml_cnt) != cnt:
+                    replace_tok_count = True
+            except:
+                print("TOKEN COUNT {} IS NOT A NUMBER".format(yml_cnt), uri)
+                replace_tok_count = True
+    if replace_tok_count:
+        return tok_count, char_count
+
+def check_token_count(uri, yml_dic, text_fp, inventory):
+    """Check whether the token count in the version yml file agrees with the
+    actual token count of (the most developed version of) the text file.
+
+    Returns:
+        (tok_count, char_count) if the counts in the yml file
+        must be replaced, None otherwise
+    """
+    fp = find_text_file(text_fp, inventory)
+    fp, tok_count, char_count = count_tokens_in_file(fp)
+    return compare_token_count(uri, yml_dic, tok_count, char_count)
+
+def recount_tokens(text_fps, inventory, n_processes=None):
+    """Count the tokens and characters of many text files in parallel,
+    largest files first.
+
+    Args:
+        text_fps (list): paths to the text files
+        inventory (CorpusInventory): used to get the size of the files
+        n_processes (int): number of worker processes
+            (None: the number of CPUs; 1: no parallel processing)
+
+    Returns:
+        dict (key: path to the text file, value: (tok_count, char_count))
+    """
+    sizes = dict()
+    for fp in set(text_fps):
+        try:
+            sizes[fp] = inventory.getsize(fp)
+        except OSError:
+            sizes[fp] = 0
+    by_size = sorted(sizes, key=lambda fp: sizes[fp], reverse=True)
+
+    counts = dict()
+    if n_processes == 1 or len(by_size) < 2:
+        for fp in by_size:
+            counts[fp] = count_tokens_in_file(fp)[1:]
+    else:
+        with multiprocessing.Pool(n_processes) as pool:
+            for fp, tok_count, char_count in pool.imap_unordered(count_tokens_in_file,
+                                                                 by_size):
+                counts[fp] = (tok_count, char_count)
+    return counts
+
+def replace_token_count(yml_fp, yml_dic, tok_count, char_count, execute=False):
+    """Replace the token and character counts in a yml dictionary
+    (if execute is False, the user is asked first).
+
+    Returns:
+        bool (False if the user did not accept the change)
+    """
+    if execute or input("Change token count? Y/N? ").lower() == "y":
+        len_key = [k for k in yml_dic.keys() if "#LENGTH#" in k][0]
+        yml_dic[len_key] = str(tok_count)
+        char_len_key = [k for k in yml_dic.keys() if "#CLENGTH#" in k][0]
+        yml_dic[char_len_key] = str(char_count)
+        print(yml_fp)
+        print("-> token and character counts changed")
+        return True
+    return False
+
+def save_yml(yml_fp, yml_dic, inventory):
+    """Write a yml dictionary to a yml file (without reflowing the lines)"""
+    with open(yml_fp, mode="w", encoding="utf-8") as file:
+        file.write(yml.dicToYML(yml_dic, reflow=False))
+    inventory.update(yml_fp)
+
+def check_yml_file(yml_fp, yml_type, inventory, text_fp=None, execute=False,
+                   check_token_counts=True, recount=None):
+    """Check whether a yml file exist, is valid, and contains no foreign keys
+
+    Args:
+        yml_fp (str): path to the yml file
+        yml_type (str): either "author", "book", "version",
+            "location", "manuscript" or "transcription"
+        inventory (CorpusInventory): index of the files in the corpus
+            (the yml files that are created or changed are registered in it)
+        text_fp (str): path to the text file of the version/transcription
+            (only relevant for version/transcription yml files; default = None)
+        execute (bool): if False, the user will be prompted
+            before any changes are made to the yml file
+        check_token_counts (bool): if True, the script will check
+            the number of tokens (and characters) in the text
+        recount (list): if a list is provided, the token count of
+            version/transcription yml files is not checked immediately:
+            a tuple (yml_fp, yml_dic, text_fp, yml_changed) is appended
+            to the list, and the yml file is only saved after the count
+            (see check_yml_files)
+
+    Returns:
+        None or yml_fp (if the yml file could not be fixed)
+    """
+    yml_changed = False
+
+    # Check if yml file exists:
+    if not inventory.isfile(yml_fp):
+        print(yml_fp, "DOES NOT EXIST")
+        # create a new yml file:
+        if execute or input("Create yml file? Y/N? ").lower() == "y":
+            new_yml(yml_fp, yml_type+"_yml", True)
+            inventory.update(yml_fp)
+            print("New yml file created.")
+        else:
+            print("No new yml file created. Check manually!")
+            return yml_fp
+
+    # Check if yml is valid:
+    try:
+        yml_dic = yml.readYML(yml_fp)
+        if yml_dic == {}:
+            print("Empty yml file")
+            if execute or input("Create yml file? Y/N? ").lower() == "y":
+                new_yml(yml_fp, yml_type+"_yml", True)
+                inventory.update(yml_fp)
+                print("New yml file created.")
+                yml_dic = yml.readYML(yml_fp)
+            else:
+                print("No new file created. Check manually!")
+                return yml_fp
+
+        yml_dic.keys()
+    except Exception as e:
+        print("invalid YML file structure:", yml_fp)
+        print("Error message:", e)
+        yml_dic = yml.fix_broken_yml(yml_fp, execute)
+        inventory.update(yml_fp)
+        if yml_dic:
+            yml_changed = True
+        else:
+            return yml_fp
+    key_d = {"author": "AUTH", "book": "BOOK", "version": "VERS",
+             "location": "LOC", "manuscript": "MS", "transcription": "TRNS"}
+    for key in list(yml_dic.keys()):  # NB: list needed because otherwise keys cannot be deleted!
+
+        # check if all keys have the prefix of the yml type (..#AUTH, ..#BOOK, ..#VERS):
+        if key_d[yml_type.split("_")[0]] not in key:
+            print("wrong key in yml file", yml_fp, ":", key)
+            if execute or input("Delete yml key {}? Y/N: ".format(key)).lower() == "y":
+                del yml_dic[key]
+                yml_changed = True
+                print("-> deleted yml key", key)
+            else:
+                return yml_fp
+
+        # check whether the URI in the yml file is identical with that in the filename:
+        if "URI" in key:
+            fn = os.path.splitext(os.path.split(yml_fp)[-1])[0]
+            fn = re.sub(r"\.inProgress|\.mARkdown|\.completed", "", fn)
+            if yml_dic[key].strip() != fn:
+                print("URI", yml_dic[key], "!= filename", fn)
+                if execute or input("Replace URI with filename? Y/N: ").lower() == "y":
+                    yml_dic[key] = fn
+                    yml_changed = True
+                    print("-> URI replaced with", fn)
+                else:
+                    return yml_fp
+
+    # check whether version/transcription yml files contain token and character length values:
+    if yml_type in ["version", "transcription"] and check_token_counts:
+        if recount is not None:
+            recount.append((yml_fp, yml_dic, text_fp, yml_changed))
+            return
+        res = check_token_count(URI(yml_fp), yml_dic, text_fp, inventory)
+        if res:
+            if replace_token_count(yml_fp, yml_dic, *res, execute=execute):
+                yml_changed = True
+            else:
+                return yml_fp
+
+    # save changes to yml file if anything has changed:
+    if yml_changed:
+        save_yml(yml_fp, yml_dic, inventory)
+
+def check_yml_files(start_folder, exclude=[],
+                    execute=False, check_token_counts=True,
+                    flat_folder=False, inventory=None, n_processes=None):
+    """Check whether yml files are missing or have faulty data in them.
+
+    Every yml file is checked only once, even if it belongs
+    to more than one text file (e.g., the author yml file).
+
+    Args:
+        start_folder (str): path to the parent folder of the folders
+            that need to be checked.
+        exclude (list): a list of directory names that should be excluded.
+        execute (bool): if False, the user will be prompted
+            before any changes are made to a yml file
+        check_token_counts (bool): if True, the token counts
+            in the version/transcription yml files are checked
+            against the text files
+        flat_folder (bool): if True, the author/location yml files are
+            in the same folder as the text files (instead of in
+            the parent folder)
+        inventory (CorpusInventory): index of the files in start_folder
+            (if None, the start_folder will be scanned once);
+            the yml files that are created or changed are registered in it,
+            so that it can be passed on to the metadata collection
+        n_processes (int): number of processes used to count the tokens
+            (None: the number of CPUs; 1: no parallel processing)
+
+    Returns:
+        list (of paths to yml files that could not be fixed)
+    """
+    failed = []
+    checked = set()
+    recount = []
+    if inventory is None:
+        inventory = CorpusInventory(start_folder, exclude=exclude)
+    for fp in get_all_text_files(inventory, start_folder, exclude=exclude):
+        uri = URI(fp)
+        if "version" in uri.uri_type:
+            yml_types = ("author", "book", "version")
+        else:
+            yml_types = ("location", "manuscript", "transcription")
+        for yml_type in yml_types:
+            yml_fn = uri.build_uri(uri_type="{}_yml".format(yml_type))
+            if yml_type in ("author", "location") and not flat_folder:
+                yml_fp = os.path.join(os.path.dirname(os.path.dirname(fp)), yml_fn)
+            else:
+                yml_fp = os.path.join(os.path.dirname(fp), yml_fn)
+            if yml_fp in checked:
+                continue
+            checked.add(yml_fp)
+            r = check_yml_file(yml_fp, yml_type, inventory, text_fp=fp, execute=execute,
+                               check_token_counts=check_token_counts,
+                               recount=recount)
+            if r:
+                failed.append(r)
+
+    # count the tokens of all text files at once, and save the yml files:
+    if recount:
+        print("Checking token counts in {} files...".format(len(recount)))
+        text_fps = [find_text_file(text_fp, inventory)
+                    for yml_fp, yml_dic, text_fp, yml_changed in recount]
+        counts = recount_tokens(text_fps, inventory, n_processes=n_processes)
+        for (yml_fp, yml_dic, text_fp, yml_changed), fp in zip(recount, text_fps):
+            res = compare_token_count(URI(yml_fp), yml_dic, *counts[fp])
+            if res:
+                if replace_token_count(yml_fp, yml_dic, *res, execute=execute):
+                    yml_changed = True
+                else:
+                    failed.append(yml_fp)
+                    continue
+            if yml_changed:
+                save_yml(yml_fp, yml_dic, inventory)
+
+    if failed:
+        print("The following yml files could not be read. Please correct them manually:")
+        for yml_fp in failed:
+            print("*", yml_fp)
+        print()
+    return failed